@@ -1,9 +1,257 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Iterator, Callable, Tuple
 import sqlite3
 import hashlib
+import hmac
+import argparse
+import csv
+import gzip
+import json
+import logging
+import os
+import queue
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from difflib import SequenceMatcher
+
+# Optional: vectorized analytics
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+# Password hashing, tunable per deployment through RETAIL_* environment variables
+PASSWORD_SCHEME = os.environ.get("RETAIL_PASSWORD_SCHEME", "pbkdf2_sha256")
+PBKDF2_ITER = int(os.environ.get("RETAIL_PBKDF2_ITER", 150_000))
+SCRYPT_N = int(os.environ.get("RETAIL_SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.environ.get("RETAIL_SCRYPT_R", 8))
+SCRYPT_P = int(os.environ.get("RETAIL_SCRYPT_P", 1))
+SALT_LEN = 16
+HASH_LEN = 32
+LOGIN_CACHE_SECONDS = int(os.environ.get("RETAIL_LOGIN_CACHE_SECONDS", 15 * 60))
+
+CUSTOMER_CATEGORIES = ("Regular", "Student", "VIP")
+IMPORT_CHUNK_SIZE = 5000
+
+DISCOUNT_RATES = {
+    "Regular": 0.0,
+    "Student": 0.10,
+    "VIP": 0.15
+}
+
+HISTORY_PAGE_SIZE = 100
+
+RFM_BINS = 5
+COHORT_MAX_MONTHS = 12
+
+ARCHIVE_BATCH_SIZE = 1000
+
+POINTS_EXPIRY_MONTHS = 12
+EXPIRY_BATCH_SIZE = 5000
+
+DUPLICATE_THRESHOLD = 0.85
+DUPLICATE_MAX_BLOCK = 50  # larger blocks are compared in a sorted window of this many records
+
+SESSION_SWITCH_BUDGET_MS = 100
+
+CHANGE_POLL_MS = 1000
+CHANGE_FEED_MAX_ROWS = 500
+
+REPORT_CHUNK_SIZE = 500
+REPORT_RECENT_TRANSACTIONS = 5
+
+EXPORT_BATCH_SIZE = 10000
+EXPORT_FORMATS = ("csv", "csv.gz", "jsonl")
+
+# Exportable tables and their column order
+EXPORT_TABLES = {
+    "customers": ("customer_id", "name", "contact", "address", "category",
+                  "loyalty_points", "registration_date"),
+    "transactions": ("transaction_id", "customer_id", "amount", "description", "transaction_date"),
+}
+
+CUSTOMER_COLUMNS = ", ".join(EXPORT_TABLES["customers"])
+TRANSACTION_COLUMNS = ", ".join(EXPORT_TABLES["transactions"])
+
+_CATEGORY_LOOKUP = {category.lower(): category for category in CUSTOMER_CATEGORIES}
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("BFPV", "1"), **dict.fromkeys("CGJKQSXZ", "2"), **dict.fromkeys("DT", "3"),
+    "L": "4", **dict.fromkeys("MN", "5"), "R": "6"
+}
+
+
+def hash_password(password: str, scheme: str = PASSWORD_SCHEME) -> str:
+    """Hash a password with a fresh salt as 'scheme$params$salt$hash' (hex)"""
+    salt = secrets.token_bytes(SALT_LEN)
+    if scheme == "scrypt":
+        pwd_hash = hashlib.scrypt(password.encode(), salt=salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P,
+                                  maxmem=256 * SCRYPT_N * SCRYPT_R, dklen=HASH_LEN)
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${pwd_hash.hex()}"
+    if scheme == "pbkdf2_sha256":
+        pwd_hash = hashlib.pbkdf2_hmac("sha256", password.encode(), salt, PBKDF2_ITER, dklen=HASH_LEN)
+        return f"pbkdf2_sha256${PBKDF2_ITER}${salt.hex()}${pwd_hash.hex()}"
+    raise ValueError(f"Unknown password scheme: {scheme}")
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """Check a password against a stored hash, including legacy unsalted SHA-256 hex digests"""
+    parts = stored.split("$")
+    if len(parts) == 1:
+        test = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(test.encode(), stored.encode())
+    
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            expected = bytes.fromhex(parts[5])
+            test = hashlib.scrypt(password.encode(), salt=bytes.fromhex(parts[4]), n=n, r=r, p=p,
+                                  maxmem=256 * n * r, dklen=len(expected))
+        elif parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            expected = bytes.fromhex(parts[3])
+            test = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(parts[2]), int(parts[1]),
+                                       dklen=len(expected))
+        else:
+            return False
+    except (ValueError, OverflowError):
+        # Corrupt parameters, salt or hash: a failed login, not an error
+        return False
+    return hmac.compare_digest(test, expected)
+
+
+def dummy_password_hash(scheme: str = PASSWORD_SCHEME) -> str:
+    """A hash no password matches that costs as much to check as a real one (for unknown users)"""
+    salt, pwd_hash = secrets.token_hex(SALT_LEN), secrets.token_hex(HASH_LEN)
+    if scheme == "scrypt":
+        return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt}${pwd_hash}"
+    return f"pbkdf2_sha256${PBKDF2_ITER}${salt}${pwd_hash}"
+
+
+def password_needs_rehash(stored: str) -> bool:
+    """True when a stored hash is legacy or uses other parameters than this deployment's"""
+    if PASSWORD_SCHEME == "scrypt":
+        return not stored.startswith(f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$")
+    return not stored.startswith(f"pbkdf2_sha256${PBKDF2_ITER}$")
+
+
+def normalize_contact(contact: str) -> str:
+    """Normalize a contact value so formatting differences don't hide duplicates"""
+    contact = contact.strip().lower()
+    if "@" in contact:
+        return contact
+    
+    # Phone numbers compare on their digits only
+    digits = "".join(ch for ch in contact if ch.isdigit())
+    return digits or contact
+
+
+def iter_customer_rows(path: str) -> Iterator[Optional[Dict]]:
+    """Stream raw customer rows from a CSV or JSONL file (None for unreadable lines)"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith((".jsonl", ".json")):
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield row if isinstance(row, dict) else None
+        else:
+            yield from csv.DictReader(f)
+
+
+def validate_customer_row(row: Optional[Dict]) -> Optional[Tuple[str, str, str, str]]:
+    """Validate an imported row and return (name, contact, address, category)"""
+    if not row:
+        return None
+    
+    fields = {str(k).strip().lower(): str(v or "").strip() for k, v in row.items() if k}
+    name = fields.get("name", "")
+    contact = fields.get("contact", "")
+    address = fields.get("address", "")
+    category = _CATEGORY_LOOKUP.get(fields.get("category", "").lower() or "regular")
+    
+    if not name or not contact or not address or category is None:
+        return None
+    return name, contact, address, category
+
+
+class Record(tuple):
+    """Tuple-backed row that also answers dict-style lookups by column name"""
+    
+    __slots__ = ()
+    FIELDS: Tuple[str, ...] = ()
+    _INDEX: Dict[str, int] = {}
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._INDEX = {name: i for i, name in enumerate(cls.FIELDS)}
+        for i, name in enumerate(cls.FIELDS):
+            setattr(cls, name, property(lambda self, i=i: tuple.__getitem__(self, i)))
+    
+    @classmethod
+    def row_factory(cls, cursor, row):
+        """sqlite3 row factory building this record straight from the row tuple"""
+        return tuple.__new__(cls, row)
+    
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return tuple.__getitem__(self, self._INDEX[key])
+        return tuple.__getitem__(self, key)
+    
+    def __contains__(self, key):
+        return key in self._INDEX
+    
+    def get(self, key, default=None):
+        index = self._INDEX.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+    
+    def keys(self):
+        return self.FIELDS
+    
+    def items(self):
+        return zip(self.FIELDS, self)
+    
+    def to_dict(self) -> Dict:
+        return dict(zip(self.FIELDS, self))
+    
+    def __repr__(self):
+        fields = ", ".join(f"{name}={value!r}" for name, value in self.items())
+        return f"{type(self).__name__}({fields})"
+
+
+class Customer(Record):
+    """Customer row"""
+    
+    __slots__ = ()
+    FIELDS = EXPORT_TABLES["customers"]
+
+
+class Transaction(Record):
+    """Transaction row"""
+    
+    __slots__ = ()
+    FIELDS = EXPORT_TABLES["transactions"]
+
+
+class HistoryRow(Record):
+    """Transaction row with running total and month subtotal"""
+    
+    __slots__ = ()
+    FIELDS = EXPORT_TABLES["transactions"] + ("running_total", "month_total")
 
 
 class DatabaseManager:
@@ -11,6 +259,12 @@ class DatabaseManager:
     
     def __init__(self, db_name: str = "retail_management.db"):
         self.db_name = db_name
+        self.cohort_cache = {}  # month -> (change_version, result)
+        
+        # username -> (stored hash, keyed digest of the password, expiry); never holds the password itself
+        self.login_cache: Dict[str, Tuple[str, bytes, float]] = {}
+        self._login_cache_key = secrets.token_bytes(32)
+        self._dummy_hash = dummy_password_hash()
         self.init_database()
     
     def get_connection(self):
@@ -59,10 +313,100 @@ class DatabaseManager:
             )
         ''')
         
+        # Change log filled by triggers, read by ChangeFeed to patch other workstations' views
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_log (
+                change_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                row_id INTEGER NOT NULL,
+                operation TEXT NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_change_log_changed_at ON change_log (changed_at)")
+        
+        for table, key in (("customers", "customer_id"), ("transactions", "transaction_id")):
+            for operation, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_{operation.lower()}_log
+                    AFTER {operation} ON {table}
+                    BEGIN
+                        INSERT INTO change_log (table_name, row_id, operation)
+                        VALUES ('{table}', {row}.{key}, '{operation}');
+                    END
+                ''')
+        
+        # RFM segments table (rewritten by compute_rfm_segments)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS customer_segments (
+                customer_id INTEGER PRIMARY KEY,
+                recency_score INTEGER,
+                frequency_score INTEGER,
+                monetary_score INTEGER,
+                segment TEXT NOT NULL,
+                scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (customer_id) REFERENCES customers (customer_id)
+            )
+        ''')
+        
+        # One row per transaction whose points have expired, so the expiry job never counts one twice
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS expired_points (
+                transaction_id INTEGER PRIMARY KEY,
+                customer_id INTEGER NOT NULL,
+                points INTEGER NOT NULL,
+                expired_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Customers the 1000-point rule promoted to VIP and their category before that, so point
+        # expiry only demotes those customers and gives them their own category back
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS loyalty_promotions (
+                customer_id INTEGER PRIMARY KEY,
+                previous_category TEXT NOT NULL,
+                promoted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # Archive tables: deleted or inactive customers are moved here instead of being lost
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archived_customers (
+                customer_id INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                contact TEXT NOT NULL,
+                address TEXT NOT NULL,
+                category TEXT,
+                loyalty_points INTEGER,
+                registration_date TIMESTAMP,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS archived_transactions (
+                transaction_id INTEGER PRIMARY KEY,
+                customer_id INTEGER,
+                amount REAL NOT NULL,
+                description TEXT,
+                transaction_date TIMESTAMP,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_archived_transactions_customer "
+            "ON archived_transactions (customer_id, transaction_id)"
+        )
+        
+        # Transaction history is paged per customer in (date, id) order; amount makes it covering
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_transactions_customer_date
+            ON transactions (customer_id, transaction_date, transaction_id, amount)
+        ''')
+        
         # Insert default user if not exists
         cursor.execute("SELECT * FROM users WHERE username = ?", ("sumi",))
         if cursor.fetchone() is None:
-            password_hash = hashlib.sha256("sumi123".encode()).hexdigest()
+            password_hash = hash_password("sumi123")
             cursor.execute(
                 "INSERT INTO users (username, password_hash, full_name, role) VALUES (?, ?, ?, ?)",
                 ("sumi", password_hash, "Sumi Administrator", "admin")
@@ -72,20 +416,41 @@ class DatabaseManager:
         conn.close()
     
     def verify_login(self, username: str, password: str) -> bool:
-        """Verify user login credentials"""
+        """Verify user login credentials, upgrading legacy or outdated hashes on success"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        password_hash = hashlib.sha256(password.encode()).hexdigest()
-        cursor.execute(
-            "SELECT * FROM users WHERE username = ? AND password_hash = ?",
-            (username, password_hash)
-        )
-        
-        user = cursor.fetchone()
-        conn.close()
-        
-        return user is not None
+        try:
+            cursor.execute("SELECT password_hash FROM users WHERE username = ?", (username,))
+            row = cursor.fetchone()
+            if row is None:
+                # Same key derivation as a wrong password, so timing doesn't reveal which usernames exist
+                verify_password(password, self._dummy_hash)
+                return False
+            stored = row[0]
+            
+            # A recent successful login against the same stored hash skips the slow key derivation
+            digest = hmac.new(self._login_cache_key, password.encode(), "sha256").digest()
+            cached = self.login_cache.get(username)
+            if cached and cached[0] == stored and cached[2] > time.monotonic() \
+                    and hmac.compare_digest(cached[1], digest):
+                return True
+            
+            if not verify_password(password, stored):
+                self.login_cache.pop(username, None)
+                return False
+            
+            if password_needs_rehash(stored):
+                stored = hash_password(password)
+                with conn:
+                    cursor.execute(
+                        "UPDATE users SET password_hash = ? WHERE username = ?", (stored, username)
+                    )
+            
+            self.login_cache[username] = (stored, digest, time.monotonic() + LOGIN_CACHE_SECONDS)
+            return True
+        finally:
+            conn.close()
     
     def add_customer(self, name: str, contact: str, address: str, category: str) -> int:
         """Add a new customer"""
@@ -103,6 +468,55 @@ class DatabaseManager:
         
         return customer_id
     
+    def import_customers(self, path: str, chunk_size: int = IMPORT_CHUNK_SIZE,
+                         progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Bulk import customers from a CSV or JSONL file, skipping duplicate contacts"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        # Seed the duplicate set with contacts that are already registered
+        cursor.execute("SELECT contact FROM customers")
+        seen = {normalize_contact(row[0]) for row in cursor}
+        
+        stats = {"imported": 0, "duplicates": 0, "invalid": 0}
+        chunk = []
+        
+        def flush():
+            # One transaction per chunk keeps commits cheap and memory bounded
+            with conn:
+                conn.executemany(
+                    "INSERT INTO customers (name, contact, address, category) VALUES (?, ?, ?, ?)",
+                    chunk
+                )
+            stats["imported"] += len(chunk)
+            chunk.clear()
+            if progress:
+                progress(dict(stats))
+        
+        try:
+            for row in iter_customer_rows(path):
+                record = validate_customer_row(row)
+                if record is None:
+                    stats["invalid"] += 1
+                    continue
+                
+                key = normalize_contact(record[1])
+                if key in seen:
+                    stats["duplicates"] += 1
+                    continue
+                seen.add(key)
+                
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    flush()
+            
+            if chunk:
+                flush()
+        finally:
+            conn.close()
+        
+        return stats
+    
     def update_customer(self, customer_id: int, name: str, contact: str, 
                        address: str, category: str) -> bool:
         """Update existing customer"""
@@ -117,94 +531,221 @@ class DatabaseManager:
         )
         
         rows_affected = cursor.rowcount
+        if category != "VIP":
+            # A category set by hand replaces a points promotion
+            cursor.execute("DELETE FROM loyalty_promotions WHERE customer_id = ?", (customer_id,))
         conn.commit()
         conn.close()
         
         return rows_affected > 0
     
     def delete_customer(self, customer_id: int) -> bool:
-        """Delete a customer"""
+        """Delete a customer (moved to the archive tables, see restore_customer)"""
+        return self.archive_customer(customer_id)
+    
+    def _move_rows(self, conn, source: str, target: str, key: str, columns: str,
+                   where: str, params: tuple = (), batch_size: int = ARCHIVE_BATCH_SIZE,
+                   progress: Optional[Callable[[int], None]] = None) -> int:
+        """Move matching rows from source to target, one bounded transaction per batch"""
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (row_id INTEGER PRIMARY KEY)")
+        moved = 0
+        
+        while True:
+            # Each batch commits on its own, so an interrupted run resumes where it stopped
+            with conn:
+                conn.execute("DELETE FROM archive_batch")
+                conn.execute(
+                    f"INSERT INTO archive_batch SELECT {key} FROM {source} WHERE {where} LIMIT ?",
+                    (*params, batch_size)
+                )
+                conn.execute(
+                    f"INSERT INTO {target} ({columns}) SELECT {columns} FROM {source} "
+                    f"WHERE {key} IN (SELECT row_id FROM archive_batch)"
+                )
+                count = conn.execute(
+                    f"DELETE FROM {source} WHERE {key} IN (SELECT row_id FROM archive_batch)"
+                ).rowcount
+            if count == 0:
+                return moved
+            moved += count
+            if progress:
+                progress(moved)
+    
+    def archive_customer(self, customer_id: int, batch_size: int = ARCHIVE_BATCH_SIZE) -> bool:
+        """Move a customer and their transactions to the archive tables"""
         conn = self.get_connection()
-        cursor = conn.cursor()
         
-        # Delete transactions first
-        cursor.execute("DELETE FROM transactions WHERE customer_id = ?", (customer_id,))
+        try:
+            self._move_rows(
+                conn, "transactions", "archived_transactions", "transaction_id", TRANSACTION_COLUMNS,
+                "customer_id = ?", (customer_id,), batch_size
+            )
+            with conn:
+                conn.execute("DELETE FROM customer_segments WHERE customer_id = ?", (customer_id,))
+            moved = self._move_rows(
+                conn, "customers", "archived_customers", "customer_id", CUSTOMER_COLUMNS,
+                "customer_id = ?", (customer_id,)
+            )
+        finally:
+            conn.close()
         
-        # Delete customer
-        cursor.execute("DELETE FROM customers WHERE customer_id = ?", (customer_id,))
+        return moved > 0
+    
+    def archive_inactive_customers(self, before: str, batch_size: int = ARCHIVE_BATCH_SIZE,
+                                   progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Archive customers registered before a date with no transactions since then"""
+        start = time.perf_counter()
+        conn = self.get_connection()
+        stats = {"customers": 0, "transactions": 0}
         
-        rows_affected = cursor.rowcount
-        conn.commit()
-        conn.close()
+        def report(table):
+            def update(moved):
+                stats[table] = moved
+                if progress:
+                    progress(dict(stats))
+            return update
         
-        return rows_affected > 0
+        try:
+            conn.execute("CREATE TEMP TABLE archive_queue (customer_id INTEGER PRIMARY KEY)")
+            with conn:
+                conn.execute(
+                    """INSERT INTO archive_queue
+                       SELECT c.customer_id FROM customers c
+                       WHERE c.registration_date < ?
+                         AND NOT EXISTS (
+                             SELECT 1 FROM transactions t
+                             WHERE t.customer_id = c.customer_id AND t.transaction_date >= ?
+                         )""",
+                    (before, before)
+                )
+                conn.execute(
+                    "DELETE FROM customer_segments WHERE customer_id IN (SELECT customer_id FROM archive_queue)"
+                )
+            
+            queued = "customer_id IN (SELECT customer_id FROM archive_queue)"
+            self._move_rows(
+                conn, "transactions", "archived_transactions", "transaction_id", TRANSACTION_COLUMNS,
+                queued, batch_size=batch_size, progress=report("transactions")
+            )
+            self._move_rows(
+                conn, "customers", "archived_customers", "customer_id", CUSTOMER_COLUMNS,
+                queued, batch_size=batch_size, progress=report("customers")
+            )
+        finally:
+            conn.close()
+        
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+    
+    def restore_customer(self, customer_id: int, batch_size: int = ARCHIVE_BATCH_SIZE) -> bool:
+        """Move an archived customer and their transactions back to the live tables"""
+        conn = self.get_connection()
+        
+        try:
+            # Customer first, so restored transactions never point at a missing customer
+            self._move_rows(
+                conn, "archived_customers", "customers", "customer_id", CUSTOMER_COLUMNS,
+                "customer_id = ?", (customer_id,)
+            )
+            self._move_rows(
+                conn, "archived_transactions", "transactions", "transaction_id", TRANSACTION_COLUMNS,
+                "customer_id = ?", (customer_id,), batch_size
+            )
+            restored = conn.execute(
+                "SELECT 1 FROM customers WHERE customer_id = ?", (customer_id,)
+            ).fetchone() is not None
+        finally:
+            conn.close()
+        
+        return restored
     
-    def get_customer(self, customer_id: int) -> Optional[Dict]:
+    def merge_customers(self, keep_id: int, duplicate_id: int) -> bool:
+        """Merge a duplicate into another customer: move transactions, add points, delete the duplicate"""
+        if keep_id == duplicate_id:
+            return False
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(
+                "SELECT COUNT(*) FROM customers WHERE customer_id IN (?, ?)", (keep_id, duplicate_id)
+            )
+            if cursor.fetchone()[0] != 2:
+                return False
+            
+            cursor.execute(
+                "UPDATE transactions SET customer_id = ? WHERE customer_id = ?", (keep_id, duplicate_id)
+            )
+            cursor.execute(
+                """UPDATE customers
+                   SET loyalty_points = loyalty_points + (
+                       SELECT loyalty_points FROM customers WHERE customer_id = ?
+                   )
+                   WHERE customer_id = ?""",
+                (duplicate_id, keep_id)
+            )
+            
+            # Same VIP rule as add_transaction
+            cursor.execute(
+                """INSERT OR REPLACE INTO loyalty_promotions (customer_id, previous_category)
+                   SELECT customer_id, COALESCE(category, 'Regular') FROM customers
+                   WHERE customer_id = ? AND category != 'VIP' AND loyalty_points >= 1000""",
+                (keep_id,)
+            )
+            cursor.execute(
+                "UPDATE customers SET category = 'VIP' WHERE customer_id = ? AND loyalty_points >= 1000",
+                (keep_id,)
+            )
+            cursor.execute("DELETE FROM loyalty_promotions WHERE customer_id = ?", (duplicate_id,))
+            cursor.execute("DELETE FROM customer_segments WHERE customer_id = ?", (duplicate_id,))
+            cursor.execute("DELETE FROM customers WHERE customer_id = ?", (duplicate_id,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        return True
+    
+    def get_customer(self, customer_id: int) -> Optional[Customer]:
         """Get customer by ID"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        cursor.execute("SELECT * FROM customers WHERE customer_id = ?", (customer_id,))
-        row = cursor.fetchone()
+        cursor.row_factory = Customer.row_factory
+        cursor.execute(f"SELECT {CUSTOMER_COLUMNS} FROM customers WHERE customer_id = ?", (customer_id,))
+        customer = cursor.fetchone()
         conn.close()
         
-        if row:
-            return {
-                "customer_id": row[0],
-                "name": row[1],
-                "contact": row[2],
-                "address": row[3],
-                "category": row[4],
-                "loyalty_points": row[5],
-                "registration_date": row[6]
-            }
-        return None
+        return customer
     
-    def search_customers(self, query: str) -> List[Dict]:
+    def search_customers(self, query: str) -> List[Customer]:
         """Search customers by name, contact, or ID"""
         conn = self.get_connection()
         cursor = conn.cursor()
+        cursor.row_factory = Customer.row_factory
         
         cursor.execute(
-            """SELECT * FROM customers 
+            f"""SELECT {CUSTOMER_COLUMNS} FROM customers 
                WHERE name LIKE ? OR contact LIKE ? OR CAST(customer_id AS TEXT) = ?
                ORDER BY name""",
             (f"%{query}%", f"%{query}%", query)
         )
         
-        customers = []
-        for row in cursor.fetchall():
-            customers.append({
-                "customer_id": row[0],
-                "name": row[1],
-                "contact": row[2],
-                "address": row[3],
-                "category": row[4],
-                "loyalty_points": row[5],
-                "registration_date": row[6]
-            })
-        
+        customers = cursor.fetchall()
         conn.close()
         return customers
     
-    def get_all_customers(self) -> List[Dict]:
+    def get_all_customers(self) -> List[Customer]:
         """Get all customers"""
         conn = self.get_connection()
         cursor = conn.cursor()
+        cursor.row_factory = Customer.row_factory
         
-        cursor.execute("SELECT * FROM customers ORDER BY name")
-        
-        customers = []
-        for row in cursor.fetchall():
-            customers.append({
-                "customer_id": row[0],
-                "name": row[1],
-                "contact": row[2],
-                "address": row[3],
-                "category": row[4],
-                "loyalty_points": row[5],
-                "registration_date": row[6]
-            })
+        cursor.execute(f"SELECT {CUSTOMER_COLUMNS} FROM customers ORDER BY name")
+        customers = cursor.fetchall()
         
         conn.close()
         return customers
@@ -237,6 +778,10 @@ class DatabaseManager:
         row = cursor.fetchone()
         
         if row and row[0] >= 1000 and row[1] != "VIP":
+            cursor.execute(
+                "INSERT OR REPLACE INTO loyalty_promotions (customer_id, previous_category) VALUES (?, ?)",
+                (customer_id, row[1] or "Regular")
+            )
             cursor.execute(
                 "UPDATE customers SET category = 'VIP' WHERE customer_id = ?",
                 (customer_id,)
@@ -247,29 +792,551 @@ class DatabaseManager:
         
         return transaction_id
     
-    def get_transactions(self, customer_id: int) -> List[Dict]:
+    def add_transactions_bulk(self, transactions: List[Tuple[int, float, str]]) -> int:
+        """Add a batch of (customer_id, amount, description) transactions in one database transaction"""
+        if not transactions:
+            return 0
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        try:
+            # Stage the batch with its per-sale points (1 point per $10, truncated like add_transaction)
+            cursor.execute(
+                """CREATE TEMP TABLE IF NOT EXISTS bulk_transactions (
+                       seq INTEGER PRIMARY KEY,
+                       customer_id INTEGER,
+                       amount REAL,
+                       description TEXT,
+                       points INTEGER
+                   )"""
+            )
+            cursor.execute("DELETE FROM bulk_transactions")
+            cursor.executemany(
+                "INSERT INTO bulk_transactions (customer_id, amount, description, points) VALUES (?, ?, ?, ?)",
+                ((customer_id, amount, description, int(amount / 10))
+                 for customer_id, amount, description in transactions)
+            )
+            
+            cursor.execute(
+                """INSERT INTO transactions (customer_id, amount, description)
+                   SELECT customer_id, amount, description FROM bulk_transactions ORDER BY seq"""
+            )
+            
+            # add_transaction checks for VIP after every sale, so promote anyone whose balance
+            # reached 1000 at any point in the batch, not just at the end
+            promoted = """category != 'VIP'
+                     AND customer_id IN (
+                         SELECT b.customer_id
+                         FROM (
+                             SELECT customer_id,
+                                    SUM(points) OVER (
+                                        PARTITION BY customer_id ORDER BY seq
+                                        ROWS UNBOUNDED PRECEDING
+                                    ) AS earned
+                             FROM bulk_transactions
+                             WHERE customer_id IS NOT NULL
+                         ) b
+                         JOIN customers c ON c.customer_id = b.customer_id
+                         WHERE c.loyalty_points + b.earned >= 1000
+                     )"""
+            cursor.execute(
+                f"""INSERT OR REPLACE INTO loyalty_promotions (customer_id, previous_category)
+                    SELECT customer_id, COALESCE(category, 'Regular') FROM customers WHERE {promoted}"""
+            )
+            cursor.execute(f"UPDATE customers SET category = 'VIP' WHERE {promoted}")
+            
+            # Apply every customer's points for the batch in one grouped update; sales without a
+            # customer earn nothing (a NULL key would become a fresh rowid in bulk_points)
+            cursor.execute(
+                """CREATE TEMP TABLE IF NOT EXISTS bulk_points (
+                       customer_id INTEGER PRIMARY KEY,
+                       points INTEGER
+                   )"""
+            )
+            cursor.execute("DELETE FROM bulk_points")
+            cursor.execute(
+                """INSERT INTO bulk_points (customer_id, points)
+                   SELECT customer_id, SUM(points) FROM bulk_transactions
+                   WHERE customer_id IS NOT NULL
+                   GROUP BY customer_id"""
+            )
+            cursor.execute(
+                """UPDATE customers
+                   SET loyalty_points = loyalty_points + (
+                       SELECT points FROM bulk_points b WHERE b.customer_id = customers.customer_id
+                   )
+                   WHERE customer_id IN (SELECT customer_id FROM bulk_points)"""
+            )
+            
+            cursor.execute("DELETE FROM bulk_transactions")
+            cursor.execute("DELETE FROM bulk_points")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        
+        return len(transactions)
+    
+    def expire_loyalty_points(self, as_of: Optional[str] = None, months: int = POINTS_EXPIRY_MONTHS,
+                              batch_size: int = EXPIRY_BATCH_SIZE,
+                              progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Expire points earned more than `months` before as_of, then recompute VIP status for everyone"""
+        start = time.perf_counter()
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        as_of = as_of or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cutoff = cursor.execute("SELECT datetime(?, ?)", (as_of, f"-{months} months")).fetchone()[0]
+        stats = {"transactions": 0, "points": 0, "customers": 0, "promoted": 0, "demoted": 0}
+        # A customer's expired transactions can span several batches, so count them once
+        debited = set()
+        
+        try:
+            cursor.execute(
+                """CREATE TEMP TABLE IF NOT EXISTS expiry_batch (
+                       transaction_id INTEGER PRIMARY KEY,
+                       customer_id INTEGER,
+                       points INTEGER
+                   )"""
+            )
+            cursor.execute(
+                """CREATE TEMP TABLE IF NOT EXISTS expiry_totals (
+                       customer_id INTEGER PRIMARY KEY,
+                       points INTEGER
+                   )"""
+            )
+            
+            last_id = 0
+            while True:
+                # Each batch records its transactions in expired_points and debits the customers in
+                # the same commit, so a rerun after an interruption skips exactly what was done
+                with conn:
+                    cursor.execute("DELETE FROM expiry_batch")
+                    cursor.execute("DELETE FROM expiry_totals")
+                    cursor.execute(
+                        """INSERT INTO expiry_batch (transaction_id, customer_id, points)
+                           SELECT t.transaction_id, t.customer_id, MAX(CAST(t.amount / 10 AS INTEGER), 0)
+                           FROM transactions t
+                           WHERE t.transaction_id > ?
+                             AND t.transaction_date < ?
+                             AND t.customer_id IS NOT NULL
+                             AND NOT EXISTS (
+                                 SELECT 1 FROM expired_points e WHERE e.transaction_id = t.transaction_id
+                             )
+                           ORDER BY t.transaction_id
+                           LIMIT ?""",
+                        (last_id, cutoff, batch_size)
+                    )
+                    count, max_id = cursor.execute(
+                        "SELECT COUNT(*), MAX(transaction_id) FROM expiry_batch"
+                    ).fetchone()
+                    if count == 0:
+                        break
+                    
+                    cursor.execute(
+                        """INSERT INTO expired_points (transaction_id, customer_id, points, expired_at)
+                           SELECT transaction_id, customer_id, points, ? FROM expiry_batch""",
+                        (as_of,)
+                    )
+                    cursor.execute(
+                        """INSERT INTO expiry_totals (customer_id, points)
+                           SELECT customer_id, SUM(points) FROM expiry_batch
+                           GROUP BY customer_id HAVING SUM(points) > 0"""
+                    )
+                    cursor.execute(
+                        """UPDATE customers
+                           SET loyalty_points = MAX(loyalty_points - (
+                               SELECT points FROM expiry_totals e WHERE e.customer_id = customers.customer_id
+                           ), 0)
+                           WHERE customer_id IN (SELECT customer_id FROM expiry_totals)"""
+                    )
+                    debited.update(row[0] for row in cursor.execute(
+                        """SELECT customer_id FROM expiry_totals
+                           WHERE customer_id IN (SELECT customer_id FROM customers)"""
+                    ))
+                    points = cursor.execute("SELECT COALESCE(SUM(points), 0) FROM expiry_totals").fetchone()[0]
+                
+                last_id = max_id
+                stats["transactions"] += count
+                stats["points"] += points
+                stats["customers"] = len(debited)
+                if progress:
+                    progress(dict(stats))
+            
+            # Same 1000-point VIP rule as add_transaction, now applied in both directions. Only
+            # customers the rule promoted are demoted, back to the category they had before.
+            with conn:
+                cursor.execute(
+                    """INSERT OR REPLACE INTO loyalty_promotions (customer_id, previous_category)
+                       SELECT customer_id, COALESCE(category, 'Regular') FROM customers
+                       WHERE category != 'VIP' AND loyalty_points >= 1000"""
+                )
+                stats["promoted"] = cursor.execute(
+                    "UPDATE customers SET category = 'VIP' WHERE category != 'VIP' AND loyalty_points >= 1000"
+                ).rowcount
+                stats["demoted"] = cursor.execute(
+                    """UPDATE customers
+                       SET category = (
+                           SELECT previous_category FROM loyalty_promotions p
+                           WHERE p.customer_id = customers.customer_id
+                       )
+                       WHERE category = 'VIP' AND loyalty_points < 1000
+                         AND customer_id IN (SELECT customer_id FROM loyalty_promotions)"""
+                ).rowcount
+                cursor.execute(
+                    """DELETE FROM loyalty_promotions
+                       WHERE customer_id IN (SELECT customer_id FROM customers WHERE category != 'VIP')"""
+                )
+        finally:
+            conn.close()
+        
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+    
+    def get_transactions(self, customer_id: int) -> List[Transaction]:
         """Get all transactions for a customer"""
         conn = self.get_connection()
         cursor = conn.cursor()
+        cursor.row_factory = Transaction.row_factory
         
         cursor.execute(
-            "SELECT * FROM transactions WHERE customer_id = ? ORDER BY transaction_date DESC",
+            f"SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE customer_id = ? ORDER BY transaction_date DESC",
             (customer_id,)
         )
+        transactions = cursor.fetchall()
         
-        transactions = []
-        for row in cursor.fetchall():
-            transactions.append({
-                "transaction_id": row[0],
-                "customer_id": row[1],
-                "amount": row[2],
-                "description": row[3],
-                "transaction_date": row[4]
-            })
+        conn.close()
+        return transactions
+    
+    def iter_customer_summaries(self, month: Optional[str] = None) -> Iterator[tuple]:
+        """Stream (customer, transaction count, total spent, recent transactions) for every customer"""
+        date_filter = ""
+        params: tuple = ()
+        if month:
+            # Month-end statements only cover transactions inside the month
+            start = datetime.strptime(month, "%Y-%m")
+            end = start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+            date_filter = "AND t.transaction_date >= ? AND t.transaction_date < ?"
+            params = (start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d"))
+        
+        summaries = self.iter_rows(
+            f"""SELECT c.customer_id, c.name, c.contact, c.address, c.category,
+                       c.loyalty_points, c.registration_date,
+                       COUNT(t.transaction_id), COALESCE(SUM(t.amount), 0)
+                FROM customers c
+                LEFT JOIN transactions t ON t.customer_id = c.customer_id {date_filter}
+                GROUP BY c.customer_id
+                ORDER BY c.customer_id""",
+            params
+        )
+        recent_rows = self.iter_rows(
+            f"""SELECT customer_id, amount, description, transaction_date FROM (
+                    SELECT t.customer_id, t.amount, t.description, t.transaction_date,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY t.customer_id
+                               ORDER BY t.transaction_date DESC, t.transaction_id DESC
+                           ) AS rn
+                    FROM transactions t
+                    WHERE t.customer_id IS NOT NULL {date_filter}
+                )
+                WHERE rn <= ?
+                ORDER BY customer_id, rn""",
+            params + (REPORT_RECENT_TRANSACTIONS,)
+        )
+        
+        # Both streams are ordered by customer_id, so merge them in a single pass
+        pending = next(recent_rows, None)
+        for row in summaries:
+            customer = Customer(row[:7])
+            recent = []
+            while pending is not None and pending[0] <= customer["customer_id"]:
+                if pending[0] == customer["customer_id"]:
+                    recent.append({
+                        "amount": pending[1],
+                        "description": pending[2],
+                        "transaction_date": pending[3]
+                    })
+                pending = next(recent_rows, None)
+            yield customer, row[7], row[8], recent
+    
+    def iter_rows(self, query: str, params: tuple = (),
+                  batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[tuple]:
+        """Stream query results in fixed-size batches without building a list"""
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+    
+    def iter_table(self, table: str) -> Iterator[tuple]:
+        """Stream every row of an exportable table in primary key order"""
+        columns = EXPORT_TABLES[table]
+        return self.iter_rows(f"SELECT {', '.join(columns)} FROM {table} ORDER BY {columns[0]}")
+    
+    def export_table(self, table: str, path: str, fmt: Optional[str] = None,
+                     progress: Optional[Callable[[int], None]] = None) -> Dict:
+        """Stream a table to CSV, gzip-compressed CSV or JSONL with constant memory"""
+        fmt = fmt or export_format_for(path)
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        
+        columns = EXPORT_TABLES[table]
+        counter = {"rows": 0}
+        
+        def counted(rows):
+            for row in rows:
+                counter["rows"] += 1
+                if progress and counter["rows"] % EXPORT_BATCH_SIZE == 0:
+                    progress(counter["rows"])
+                yield row
+        
+        start = time.perf_counter()
+        opener = gzip.open if fmt == "csv.gz" else open
+        with opener(path, "wt", newline="", encoding="utf-8") as raw:
+            f = _CountingWriter(raw)
+            rows = counted(self.iter_table(table))
+            if fmt == "jsonl":
+                f.writelines(json.dumps(dict(zip(columns, row))) + "\n" for row in rows)
+            else:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                writer.writerows(rows)
+        elapsed = time.perf_counter() - start
+        
+        # Throughput is measured on uncompressed output so formats compare fairly
+        return {
+            "table": table,
+            "format": fmt,
+            "rows": counter["rows"],
+            "bytes": os.path.getsize(path),
+            "raw_bytes": f.bytes_written,
+            "seconds": elapsed,
+            "mb_per_sec": (f.bytes_written / 1_048_576) / elapsed if elapsed else 0.0
+        }
+    
+    def get_transaction_page(self, customer_id: int, before: Optional[Tuple[str, int]] = None,
+                             page_size: int = HISTORY_PAGE_SIZE) -> List[HistoryRow]:
+        """Get one page of a customer's transactions, newest first, older than the (date, id) key"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.row_factory = HistoryRow.row_factory
+        
+        keyset = ""
+        params: tuple = (customer_id,)
+        if before:
+            keyset = "AND (transaction_date < ? OR (transaction_date = ? AND transaction_id < ?))"
+            params += (before[0], before[0], before[1])
+        
+        # The page itself is an index range scan; running totals continue from the sum of
+        # everything older than the page, and month subtotals are summed once per month shown
+        cursor.execute(
+            f"""WITH page AS (
+                    SELECT transaction_id, customer_id, amount, description, transaction_date
+                    FROM transactions
+                    WHERE customer_id = ? {keyset}
+                    ORDER BY transaction_date DESC, transaction_id DESC
+                    LIMIT ?
+                ),
+                oldest AS (
+                    SELECT transaction_date, transaction_id FROM page
+                    ORDER BY transaction_date, transaction_id LIMIT 1
+                ),
+                months AS (
+                    SELECT DISTINCT substr(transaction_date, 1, 7) AS month FROM page
+                ),
+                month_totals AS (
+                    SELECT month, (
+                        SELECT SUM(t.amount) FROM transactions t
+                        WHERE t.customer_id = ?
+                          AND t.transaction_date >= month || '-01'
+                          AND t.transaction_date < date(month || '-01', '+1 month')
+                    ) AS total
+                    FROM months
+                )
+                SELECT p.transaction_id, p.customer_id, p.amount, p.description, p.transaction_date,
+                       COALESCE((
+                           SELECT SUM(t.amount) FROM transactions t, oldest o
+                           WHERE t.customer_id = ?
+                             AND (t.transaction_date < o.transaction_date
+                                  OR (t.transaction_date = o.transaction_date
+                                      AND t.transaction_id < o.transaction_id))
+                       ), 0) + SUM(p.amount) OVER (
+                           ORDER BY p.transaction_date, p.transaction_id
+                           ROWS UNBOUNDED PRECEDING
+                       ) AS running_total,
+                       mt.total AS month_total
+                FROM page p
+                JOIN month_totals mt ON mt.month = substr(p.transaction_date, 1, 7)
+                ORDER BY p.transaction_date DESC, p.transaction_id DESC""",
+            params + (page_size, customer_id, customer_id)
+        )
+        
+        transactions = cursor.fetchall()
         
         conn.close()
         return transactions
     
+    def get_transaction_summary(self, customer_id: int) -> Dict:
+        """Get transaction count and total for a customer"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute(
+            "SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM transactions WHERE customer_id = ?",
+            (customer_id,)
+        )
+        row = cursor.fetchone()
+        conn.close()
+        
+        return {"count": row[0], "total": row[1]}
+    
+    def compute_rfm_segments(self, as_of: Optional[str] = None) -> Dict[str, int]:
+        """Score every customer on recency, frequency and monetary value and store segment labels"""
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is required for RFM segmentation")
+        
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        
+        as_of = as_of or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        cursor.execute(
+            """SELECT c.customer_id,
+                      julianday(?) - julianday(MAX(t.transaction_date)),
+                      COUNT(t.transaction_id),
+                      COALESCE(SUM(t.amount), 0)
+               FROM customers c
+               LEFT JOIN transactions t ON t.customer_id = c.customer_id
+               GROUP BY c.customer_id""",
+            (as_of,)
+        )
+        data = np.array(cursor.fetchall(), dtype=float).reshape(-1, 4)
+        customer_ids = data[:, 0].astype(np.int64)
+        recency, frequency, monetary = data[:, 1], data[:, 2], data[:, 3]
+        
+        # Percentile-rank scores 1..RFM_BINS over customers who have bought something (RFM_BINS = best)
+        active = frequency > 0
+        recency_score = RFM_BINS + 1 - rfm_scores(recency, active)
+        frequency_score = rfm_scores(frequency, active)
+        monetary_score = rfm_scores(monetary, active)
+        
+        segment = np.select(
+            [
+                ~active,
+                (recency_score >= 4) & (frequency_score >= 4),
+                (recency_score >= 3) & (frequency_score >= 3),
+                (recency_score >= 4) & (frequency_score <= 2),
+                (recency_score <= 2) & (frequency_score >= 3),
+                (recency_score <= 2) & (frequency_score <= 2),
+            ],
+            ["No Purchases", "Champions", "Loyal", "New", "At Risk", "Lost"],
+            default="Needs Attention"
+        )
+        recency_score[~active] = frequency_score[~active] = monetary_score[~active] = 0
+        
+        with conn:
+            conn.execute("DELETE FROM customer_segments")
+            conn.executemany(
+                """INSERT INTO customer_segments
+                   (customer_id, recency_score, frequency_score, monetary_score, segment, scored_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                zip(customer_ids.tolist(), recency_score.tolist(), frequency_score.tolist(),
+                    monetary_score.tolist(), segment.tolist(), [as_of] * len(customer_ids))
+            )
+        conn.close()
+        
+        labels, counts = np.unique(segment, return_counts=True)
+        return dict(zip(labels.tolist(), counts.tolist()))
+    
+    def compute_cohort_retention(self, as_of: Optional[str] = None, refresh: bool = False) -> Dict:
+        """Share of each registration-month cohort that bought something N months later, cached per month"""
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is required for cohort retention")
+        
+        month = (as_of or datetime.now().strftime("%Y-%m"))[:7]
+        start = time.perf_counter()
+        conn = self.get_connection()
+        
+        # Any write to customers or transactions (from any connection, including imports,
+        # merges and archiving) advances the change log, which invalidates the cached result
+        version = self.change_version(conn)
+        cached = self.cohort_cache.get(month)
+        if not refresh and cached and cached[0] == version:
+            conn.close()
+            return cached[1]
+        
+        # Cohort sizes (month_offset NULL) and distinct active customers per (cohort, months since)
+        rows = conn.execute(
+            """WITH cohorts AS (
+                   SELECT customer_id, strftime('%Y-%m', registration_date) AS cohort,
+                          CAST(strftime('%Y', registration_date) AS INTEGER) * 12
+                          + CAST(strftime('%m', registration_date) AS INTEGER) AS cohort_index
+                   FROM customers
+                   WHERE strftime('%Y-%m', registration_date) <= ?
+               ),
+               activity AS (
+                   SELECT DISTINCT customer_id,
+                          CAST(strftime('%Y', transaction_date) AS INTEGER) * 12
+                          + CAST(strftime('%m', transaction_date) AS INTEGER) AS month_index
+                   FROM transactions
+                   WHERE strftime('%Y-%m', transaction_date) <= ?
+               )
+               SELECT cohort, NULL, COUNT(*) FROM cohorts GROUP BY cohort
+               UNION ALL
+               SELECT c.cohort, a.month_index - c.cohort_index, COUNT(*)
+               FROM cohorts c
+               JOIN activity a ON a.customer_id = c.customer_id
+               WHERE a.month_index - c.cohort_index BETWEEN 0 AND ?
+               GROUP BY c.cohort, a.month_index - c.cohort_index""",
+            (month, month, COHORT_MAX_MONTHS)
+        ).fetchall()
+        conn.close()
+        
+        sizes = {cohort: count for cohort, offset, count in rows if offset is None}
+        cohorts = sorted(sizes)
+        cohort_index = {cohort: idx for idx, cohort in enumerate(cohorts)}
+        
+        # Pivot the long (cohort, offset, count) rows into a cohort x months-since matrix
+        active = np.zeros((len(cohorts), COHORT_MAX_MONTHS + 1), dtype=np.int64)
+        cells = np.array(
+            [(cohort_index[cohort], offset, count) for cohort, offset, count in rows if offset is not None],
+            dtype=np.int64
+        ).reshape(-1, 3)
+        active[cells[:, 0], cells[:, 1]] = cells[:, 2]
+        
+        size_array = np.array([sizes[cohort] for cohort in cohorts], dtype=np.int64)
+        retention = active / np.maximum(size_array, 1)[:, None]
+        
+        # Months after as_of have not happened yet, so blank them instead of showing 0%
+        year, mon = map(int, month.split("-"))
+        elapsed = np.array([(year - int(c[:4])) * 12 + mon - int(c[5:7]) for c in cohorts], dtype=np.int64)
+        retention[np.arange(COHORT_MAX_MONTHS + 1)[None, :] > elapsed[:, None]] = np.nan
+        
+        result = {
+            "month": month,
+            "cohorts": cohorts,
+            "sizes": size_array.tolist(),
+            "active": active.tolist(),
+            "retention": retention.tolist(),
+            "seconds": time.perf_counter() - start,
+        }
+        self.cohort_cache[month] = (version, result)
+        return result
+    
+    def change_version(self, conn) -> int:
+        """Counter advanced by every insert, update or delete on customers and transactions"""
+        # change_log is AUTOINCREMENT, so its sequence never goes back even after prune()
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+        return row[0] if row else 0
+    
     def get_dashboard_stats(self) -> Dict:
         """Get dashboard statistics"""
         conn = self.get_connection()
@@ -311,29 +1378,507 @@ class DatabaseManager:
         }
 
 
+def soundex(word: str) -> str:
+    """American Soundex code for a word ("" if it has no letters)"""
+    letters = [ch for ch in word.upper() if "A" <= ch <= "Z"]
+    if not letters:
+        return ""
+    
+    code = letters[0]
+    previous = _SOUNDEX_CODES.get(letters[0], "")
+    for ch in letters[1:]:
+        digit = _SOUNDEX_CODES.get(ch, "")
+        if digit and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # H and W don't separate letters with the same code, vowels do
+        if ch not in "HW":
+            previous = digit
+    return code.ljust(4, "0")
+
+
+def name_blocking_key(name: str) -> str:
+    """Phonetic key from the first and last word of a name"""
+    words = name.split()
+    if not words:
+        return ""
+    return soundex(words[0]) + soundex(words[-1])
+
+
+def duplicate_score(a: Customer, b: Customer) -> float:
+    """Similarity between two customers from 0 to 1"""
+    name_a = " ".join(a["name"].lower().split())
+    name_b = " ".join(b["name"].lower().split())
+    name_score = SequenceMatcher(None, name_a, name_b).ratio()
+    
+    contact_a = normalize_contact(a["contact"])
+    contact_b = normalize_contact(b["contact"])
+    contact_score = 1.0 if contact_a == contact_b else SequenceMatcher(None, contact_a, contact_b).ratio()
+    
+    address_score = SequenceMatcher(None, a["address"].lower(), b["address"].lower()).ratio()
+    return 0.6 * name_score + 0.3 * contact_score + 0.1 * address_score
+
+
+def find_duplicate_customers(db_manager: DatabaseManager,
+                             threshold: float = DUPLICATE_THRESHOLD) -> List[Dict]:
+    """Find likely duplicate customers, comparing only customers that share a blocking key"""
+    conn = db_manager.get_connection()
+    cursor = conn.cursor()
+    cursor.row_factory = Customer.row_factory
+    cursor.execute(f"SELECT {CUSTOMER_COLUMNS} FROM customers ORDER BY customer_id")
+    
+    customers = {}
+    blocks: Dict[str, List[int]] = {}
+    for customer in cursor:
+        customers[customer.customer_id] = customer
+        for key in ("p:" + normalize_contact(customer.contact), "n:" + name_blocking_key(customer.name)):
+            if len(key) > 2:
+                blocks.setdefault(key, []).append(customer.customer_id)
+    conn.close()
+    
+    # Each pair is scored once. Oversized blocks (shared placeholder numbers, very common
+    # names) are sorted by name and contact and each record is only compared with its
+    # DUPLICATE_MAX_BLOCK - 1 neighbours, so the work stays close to linear without
+    # leaving any record out
+    def sort_key(customer_id):
+        customer = customers[customer_id]
+        return " ".join(customer.name.lower().split()), normalize_contact(customer.contact)
+    
+    candidates = set()
+    for ids in blocks.values():
+        if len(ids) > DUPLICATE_MAX_BLOCK:
+            ids = sorted(ids, key=sort_key)
+        for i, first in enumerate(ids):
+            for second in ids[i + 1:i + DUPLICATE_MAX_BLOCK]:
+                candidates.add((min(first, second), max(first, second)))
+    
+    duplicates = []
+    for keep_id, duplicate_id in candidates:
+        score = duplicate_score(customers[keep_id], customers[duplicate_id])
+        if score >= threshold:
+            duplicates.append({
+                "keep": customers[keep_id],
+                "duplicate": customers[duplicate_id],
+                "score": score
+            })
+    
+    duplicates.sort(key=lambda pair: -pair["score"])
+    return duplicates
+
+
+def rfm_scores(values: "np.ndarray", mask: "np.ndarray") -> "np.ndarray":
+    """Bucket values into 1..RFM_BINS by percentile rank among the masked values (0 outside the mask)
+
+    Each value is placed at the midpoint of its tie group, (average rank - 1/2) / n, so a value
+    shared by many customers lands mid-way through the buckets it spans instead of the highest
+    one a quantile edge allows, and a value shared by everyone lands in the middle bucket.
+    """
+    scores = np.zeros(len(values), dtype=np.int64)
+    if mask.any():
+        masked = values[mask]
+        ordered = np.sort(masked)
+        left = np.searchsorted(ordered, masked, side="left")
+        right = np.searchsorted(ordered, masked, side="right")
+        # the tie group's midpoint is (left + right) / 2; scale it by RFM_BINS / n and round up,
+        # in integers so bucket edges don't depend on float rounding
+        double_n = 2 * len(masked)
+        scores[mask] = ((left + right) * RFM_BINS + double_n - 1) // double_n
+    return scores
+
+
+def render_customer_report(customer: Dict, total_transactions: int, total_spent: float,
+                           recent_transactions: List[Dict], generated_at: Optional[str] = None) -> str:
+    """Render the plain-text customer report"""
+    average = total_spent / total_transactions if total_transactions else 0
+    generated_at = generated_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    report = f"""
+{'='*60}
+                    CUSTOMER REPORT
+{'='*60}
+
+Customer Information:
+{'─'*60}
+Customer ID        : {customer['customer_id']}
+Name               : {customer['name']}
+Contact            : {customer['contact']}
+Address            : {customer['address']}
+Category           : {customer['category']}
+Registration Date  : {customer['registration_date']}
+
+Loyalty Program:
+{'─'*60}
+Loyalty Points     : {customer['loyalty_points']} points
+Discount Rate      : {DISCOUNT_RATES.get(customer['category'], 0.0) * 100:.0f}%
+Status             : {'🌟 VIP Member' if customer['category'] == 'VIP' else '📋 Active'}
+
+Transaction Summary:
+{'─'*60}
+Total Transactions : {total_transactions}
+Total Amount Spent : ${total_spent:.2f}
+Average Transaction: ${average:.2f}
+
+Recent Transactions:
+{'─'*60}
+"""
+    
+    # Add recent transactions
+    if recent_transactions:
+        for trans in recent_transactions:
+            report += f"\n{trans['transaction_date'][:16]}\n"
+            report += f"  Amount: ${trans['amount']:.2f}\n"
+            report += f"  Description: {trans['description']}\n"
+    else:
+        report += "\nNo transactions yet.\n"
+    
+    report += f"\n{'='*60}\n"
+    report += f"Report Generated: {generated_at}\n"
+    report += f"{'='*60}\n"
+    return report
+
+
+def _write_report_chunk(output_dir: str, generated_at: str, chunk: List[tuple]) -> int:
+    """Render and write one chunk of reports (runs in a worker process)"""
+    for customer, total_transactions, total_spent, recent in chunk:
+        path = os.path.join(output_dir, f"customer_{customer['customer_id']:06d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(render_customer_report(customer, total_transactions, total_spent, recent, generated_at))
+    return len(chunk)
+
+
+def generate_batch_reports(db_manager: "DatabaseManager", output_dir: str, month: Optional[str] = None,
+                           workers: Optional[int] = None, chunk_size: int = REPORT_CHUNK_SIZE) -> Dict:
+    """Write a report for every customer using a process pool for rendering"""
+    os.makedirs(output_dir, exist_ok=True)
+    generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    start = time.perf_counter()
+    total = 0
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Bound the number of chunks in flight so memory stays flat
+        max_pending = 2 * (workers or os.cpu_count() or 1)
+        pending = deque()
+        chunk = []
+        
+        def submit():
+            pending.append(pool.submit(_write_report_chunk, output_dir, generated_at, list(chunk)))
+            chunk.clear()
+        
+        for summary in db_manager.iter_customer_summaries(month):
+            chunk.append(summary)
+            if len(chunk) >= chunk_size:
+                submit()
+            while len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    total += future.result()
+                    pending.remove(future)
+        
+        if chunk:
+            submit()
+        for future in pending:
+            total += future.result()
+    
+    elapsed = time.perf_counter() - start
+    return {
+        "customers": total,
+        "seconds": elapsed,
+        "customers_per_sec": total / elapsed if elapsed else 0.0
+    }
+
+
+class _CountingWriter:
+    """Text file wrapper that counts the encoded bytes written through it"""
+    
+    def __init__(self, f):
+        self.f = f
+        self.encoding = f.encoding
+        self.bytes_written = 0
+    
+    def write(self, text: str) -> int:
+        self.bytes_written += len(text.encode(self.encoding))
+        return self.f.write(text)
+    
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+
+def export_format_for(path: str) -> str:
+    """Pick the export format from a file name"""
+    lower = path.lower()
+    if lower.endswith(".gz"):
+        return "csv.gz"
+    if lower.endswith((".jsonl", ".json")):
+        return "jsonl"
+    return "csv"
+
+
+def benchmark_records(db_manager: DatabaseManager) -> Dict[str, Dict]:
+    """Compare loading all customers as per-row dicts versus Customer records"""
+    def load_dicts():
+        conn = db_manager.get_connection()
+        rows = conn.execute(f"SELECT {CUSTOMER_COLUMNS} FROM customers ORDER BY name").fetchall()
+        conn.close()
+        return [dict(zip(Customer.FIELDS, row)) for row in rows]
+    
+    results = {}
+    for label, load in (("dict", load_dicts), ("record", db_manager.get_all_customers)):
+        start = time.perf_counter()
+        rows = load()
+        elapsed = time.perf_counter() - start
+        del rows
+        
+        # Measure memory on a second run so tracing overhead doesn't skew the timing
+        tracemalloc.start()
+        rows = load()
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[label] = {"rows": len(rows), "seconds": elapsed, "mb": current / 1_048_576}
+        del rows
+    return results
+
+
+def benchmark_export(db_manager: DatabaseManager, output_dir: str) -> List[Dict]:
+    """Export every table in every format and measure throughput"""
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    for table in EXPORT_TABLES:
+        for fmt in EXPORT_FORMATS:
+            path = os.path.join(output_dir, f"{table}.{fmt}")
+            results.append(db_manager.export_table(table, path, fmt))
+    return results
+
+
+class DatabaseWorker:
+    """Runs DatabaseManager calls on a background thread and delivers results on the Tk thread"""
+    
+    def __init__(self, root, poll_ms: int = 50):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        
+        # Latest generation per request key; older results for the same key are stale
+        self.generations: Dict[str, int] = {}
+        self.in_flight = 0
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "stale_dropped": 0}
+        self.on_state_change: Optional[Callable[[Dict], None]] = None
+        self.stopped = False
+        
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self._poll_id = self.root.after(self.poll_ms, self._poll)
+    
+    def submit(self, func: Callable, *args, on_success: Optional[Callable] = None,
+               on_error: Optional[Callable] = None, key: Optional[str] = None):
+        """Queue func(*args); callbacks run on the Tk thread. A newer submit with the same key wins."""
+        generation = None
+        if key is not None:
+            generation = self.generations.get(key, 0) + 1
+            self.generations[key] = generation
+        
+        self.in_flight += 1
+        self.stats["submitted"] += 1
+        self.requests.put((func, args, on_success, on_error, key, generation))
+        self._notify()
+    
+    def metrics(self) -> Dict:
+        """Current queue depth and lifetime counters"""
+        return dict(self.stats, queue_depth=self.requests.qsize(), in_flight=self.in_flight)
+    
+    def stop(self):
+        """Stop the worker thread and result polling"""
+        self.stopped = True
+        self.requests.put(None)
+        try:
+            self.root.after_cancel(self._poll_id)
+        except tk.TclError:
+            pass
+    
+    def _is_stale(self, key, generation) -> bool:
+        return key is not None and self.generations.get(key) != generation
+    
+    def _run(self):
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+            
+            func, args, on_success, on_error, key, generation = request
+            if self._is_stale(key, generation):
+                # Superseded before it started, don't spend a query on it
+                self.results.put(("stale", None, request))
+                continue
+            
+            try:
+                self.results.put(("ok", func(*args), request))
+            except Exception as e:
+                self.results.put(("error", e, request))
+    
+    def _poll(self):
+        changed = False
+        try:
+            while True:
+                status, payload, (func, args, on_success, on_error, key, generation) = self.results.get_nowait()
+                self.in_flight -= 1
+                changed = True
+                
+                if self.stopped:
+                    return
+                if status == "stale" or self._is_stale(key, generation):
+                    self.stats["stale_dropped"] += 1
+                elif status == "ok":
+                    self.stats["completed"] += 1
+                    self._deliver(on_success, payload, func)
+                else:
+                    self.stats["failed"] += 1
+                    if on_error is None:
+                        logger.error("Database call %s failed: %s", getattr(func, "__name__", func), payload)
+                    self._deliver(on_error or self._show_error, payload, func)
+        except queue.Empty:
+            pass
+        finally:
+            # A failing callback must not stop delivery of every later result
+            if changed:
+                self._notify()
+            if not self.stopped:
+                self._poll_id = self.root.after(self.poll_ms, self._poll)
+    
+    def _deliver(self, callback: Optional[Callable], payload, func: Callable):
+        """Run a result callback, logging instead of propagating its errors (e.g. a closed window)"""
+        if callback is None:
+            return
+        try:
+            callback(payload)
+        except Exception:
+            logger.exception("Callback for %s failed", getattr(func, "__name__", func))
+    
+    @staticmethod
+    def _show_error(error):
+        messagebox.showerror("Error", f"Database error:\n{error}")
+    
+    def _notify(self):
+        if self.on_state_change:
+            try:
+                self.on_state_change(self.metrics())
+            except Exception:
+                logger.exception("Worker state listener failed")
+
+
+class ChangeFeed:
+    """Detects commits from any connection with PRAGMA data_version and reads them from change_log"""
+    
+    def __init__(self, db_manager: DatabaseManager):
+        self.db_manager = db_manager
+        self.conn = None
+        self.data_version = None
+        self.last_change_id = 0
+    
+    def poll(self) -> Optional[Dict]:
+        """Return what changed since the last poll, or None if nothing did"""
+        if self.conn is None:
+            # Opened lazily so the connection lives on the thread that polls
+            self.conn = self.db_manager.get_connection()
+            self.data_version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            self.last_change_id = self.conn.execute("SELECT COALESCE(MAX(change_id), 0) FROM change_log").fetchone()[0]
+            return None
+        
+        # data_version only moves when another connection commits, so idle polls cost one pragma
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version:
+            return None
+        self.data_version = version
+        
+        changes = self.conn.execute(
+            "SELECT change_id, table_name, row_id FROM change_log WHERE change_id > ? ORDER BY change_id LIMIT ?",
+            (self.last_change_id, CHANGE_FEED_MAX_ROWS + 1)
+        ).fetchall()
+        if not changes:
+            return None
+        
+        if len(changes) > CHANGE_FEED_MAX_ROWS:
+            # Too much changed (e.g. a bulk import) to patch row by row
+            self.last_change_id = self.conn.execute("SELECT MAX(change_id) FROM change_log").fetchone()[0]
+            return {"reload": True}
+        self.last_change_id = changes[-1][0]
+        
+        customer_ids = list({row_id for _, table, row_id in changes if table == "customers"})
+        transactions_changed = any(table == "transactions" for _, table, _ in changes)
+        
+        # Deleted customers stay None, everything else gets its current row
+        customers = dict.fromkeys(customer_ids)
+        for start in range(0, len(customer_ids), 500):
+            ids = customer_ids[start:start + 500]
+            cursor = self.conn.cursor()
+            cursor.row_factory = Customer.row_factory
+            cursor.execute(
+                f"SELECT {CUSTOMER_COLUMNS} FROM customers WHERE customer_id IN ({', '.join('?' * len(ids))})", ids
+            )
+            for customer in cursor:
+                customers[customer.customer_id] = customer
+        
+        # Only recount the counters whose tables changed
+        counters = {}
+        if customer_ids:
+            counters["total_customers"], counters["vip_customers"] = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(category = 'VIP'), 0) FROM customers"
+            ).fetchone()
+        if transactions_changed:
+            counters["total_transactions"], counters["total_revenue"] = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM transactions"
+            ).fetchone()
+        
+        return {"reload": False, "customers": customers, "counters": counters}
+    
+    def prune(self, max_age_days: int = 1):
+        """Drop change log entries every workstation has had time to see"""
+        if self.conn is not None:
+            with self.conn:
+                self.conn.execute(
+                    "DELETE FROM change_log WHERE changed_at < datetime('now', ?)", (f"-{max_age_days} days",)
+                )
+    
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
 class LoginWindow:
     """Login window class"""
     
-    def __init__(self, root, db_manager, on_success):
+    def __init__(self, root, db_manager, db_worker, on_success):
         self.root = root
         self.db_manager = db_manager
+        # Password hashing is deliberately slow, so it runs on the worker, off the Tk thread
+        self.db_worker = db_worker
         self.on_success = on_success
         
-        self.root.title("Retail Management System - Login")
-        self.root.geometry("500x650")
+        # Built once; AppShell shows and hides this frame on login/logout
+        self.frame = tk.Frame(self.root, bg="#1e3a5f")
+        self.frame.rowconfigure(0, weight=1)
+        self.frame.columnconfigure(0, weight=1)
         
-        # Make window resizable
-        self.root.resizable(True, True)
+        self.setup_ui()
+    
+    def show(self):
+        """Show the login screen with an empty password"""
+        self.root.title("Retail Management System - Login")
         self.root.minsize(400, 550)
+        self.root.geometry("500x650")
         
-        # Configure grid weights for responsive design
-        self.root.rowconfigure(0, weight=1)
-        self.root.columnconfigure(0, weight=1)
+        self.password_var.set("")
+        self.login_btn.config(state=tk.NORMAL, text="LOGIN")
+        self.frame.grid(row=0, column=0, sticky="nsew")
         
         # Center window
         self.center_window()
-        
-        self.setup_ui()
+        (self.password_entry if self.username_var.get() else self.username_entry).focus()
+    
+    def hide(self):
+        self.frame.grid_remove()
     
     def center_window(self):
         """Center the window on screen"""
@@ -347,7 +1892,7 @@ class LoginWindow:
     def setup_ui(self):
         """Setup login UI"""
         # Main container with grid
-        container = tk.Frame(self.root, bg="#1e3a5f")
+        container = tk.Frame(self.frame, bg="#1e3a5f")
         container.grid(row=0, column=0, sticky="nsew")
         container.rowconfigure(0, weight=1)
         container.rowconfigure(1, weight=2)
@@ -411,7 +1956,7 @@ class LoginWindow:
         ).pack(anchor=tk.W, pady=5)
         
         self.username_var = tk.StringVar()
-        username_entry = tk.Entry(
+        self.username_entry = username_entry = tk.Entry(
             username_frame,
             textvariable=self.username_var,
             font=("Arial", 12),
@@ -420,7 +1965,6 @@ class LoginWindow:
             width=30
         )
         username_entry.pack(fill=tk.X, ipady=8)
-        username_entry.focus()
         
         # Password
         password_frame = tk.Frame(form_frame, bg="white")
@@ -435,7 +1979,7 @@ class LoginWindow:
         ).pack(anchor=tk.W, pady=5)
         
         self.password_var = tk.StringVar()
-        password_entry = tk.Entry(
+        self.password_entry = password_entry = tk.Entry(
             password_frame,
             textvariable=self.password_var,
             font=("Arial", 12),
@@ -448,7 +1992,7 @@ class LoginWindow:
         password_entry.bind("<Return>", lambda e: self.login())
         
         # Login button
-        login_btn = tk.Button(
+        self.login_btn = tk.Button(
             form_frame,
             text="LOGIN",
             font=("Arial", 13, "bold"),
@@ -462,7 +2006,7 @@ class LoginWindow:
             width=25,
             height=2
         )
-        login_btn.pack(pady=25, padx=30)
+        self.login_btn.pack(pady=25, padx=30)
         
         # Info label
         info_label = tk.Label(
@@ -493,38 +2037,93 @@ class LoginWindow:
             messagebox.showerror("Login Failed", "Please enter both username and password!")
             return
         
-        if self.db_manager.verify_login(username, password):
-            messagebox.showinfo("Login Successful", f"Welcome, {username}!")
-            self.root.destroy()
-            self.on_success(username)
-        else:
-            messagebox.showerror("Login Failed", "Invalid username or password!")
-            self.password_var.set("")
+        if str(self.login_btn.cget("state")) == tk.DISABLED:
+            return  # Enter pressed again while the previous attempt is verifying
+        
+        self.login_btn.config(state=tk.DISABLED, text="VERIFYING...")
+        
+        def on_verified(valid):
+            self.login_btn.config(state=tk.NORMAL, text="LOGIN")
+            if valid:
+                messagebox.showinfo("Login Successful", f"Welcome, {username}!")
+                self.on_success(username)
+            else:
+                messagebox.showerror("Login Failed", "Invalid username or password!")
+                self.password_var.set("")
+        
+        def on_failed(error):
+            self.login_btn.config(state=tk.NORMAL, text="LOGIN")
+            messagebox.showerror("Login Failed", f"Could not verify login:\n{error}")
+        
+        self.db_worker.submit(
+            self.db_manager.verify_login, username, password,
+            on_success=on_verified, on_error=on_failed
+        )
 
 
 class RetailManagementGUI:
     """Main Retail Management GUI"""
     
-    def __init__(self, root, db_manager, username):
+    def __init__(self, root, db_manager, db_worker, username, on_logout):
         self.root = root
         self.db_manager = db_manager
         self.username = username
+        self.on_logout = on_logout
         self.selected_customer_id = None
         
-        self.root.title("Retail Management System")
-        self.root.geometry("1400x800")
+        # Progress windows of running background jobs, and a counter that changes on every
+        # logout so a job finishing after it doesn't show its result to the next user
+        self.job_windows = set()
+        self.session = 0
         
-        # Make window resizable with minimum size
-        self.root.minsize(1000, 600)
-        self.root.resizable(True, True)
+        # Built once and kept alive across sessions; AppShell shows and hides this frame
+        self.frame = tk.Frame(self.root)
+        self.frame.rowconfigure(1, weight=1)
+        self.frame.columnconfigure(0, weight=1)
         
-        # Configure root grid weights
-        self.root.rowconfigure(1, weight=1)
-        self.root.columnconfigure(0, weight=1)
+        # All database calls go through the worker so the window never blocks
+        self.db_worker = db_worker
+        self.change_feed = ChangeFeed(self.db_manager)
+        self.change_poll_id = None
+        self.poll_count = 0
         
         self.setup_ui()
+        self.db_worker.on_state_change = self.update_status_bar
         self.refresh_customer_list()
         self.update_dashboard()
+        self.poll_changes()
+    
+    def show(self):
+        """Show the main window"""
+        self.root.title("Retail Management System")
+        self.root.minsize(1000, 600)
+        self.root.geometry("1400x800")
+        self.frame.grid(row=0, column=0, sticky="nsew")
+    
+    def hide(self):
+        self.frame.grid_remove()
+    
+    def start_session(self, username):
+        """Switch the kept-alive window to a newly logged in user"""
+        self.username = username
+        self.user_label.config(text=f"👤 {username}")
+    
+    def end_session(self):
+        """Drop everything that belongs to the user logging out; data widgets stay live"""
+        self.session += 1
+        for child in self.root.winfo_children():
+            # Running jobs keep their progress windows and close them when they finish
+            if isinstance(child, tk.Toplevel) and child not in self.job_windows:
+                child.destroy()
+        
+        self.selected_customer_id = None
+        if self.tree.selection():
+            self.tree.selection_remove(self.tree.selection())
+        self.amount_var.set("")
+        self.trans_desc_var.set("")
+        if self.search_var.get():
+            self.search_var.set("")
+            self.refresh_customer_list()
     
     def setup_ui(self):
         """Setup main UI"""
@@ -532,7 +2131,7 @@ class RetailManagementGUI:
         self.setup_top_bar()
         
         # Main container with proper grid configuration
-        main_container = tk.Frame(self.root)
+        main_container = tk.Frame(self.frame)
         main_container.grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
         main_container.rowconfigure(0, weight=1)
         main_container.columnconfigure(0, weight=1)
@@ -557,10 +2156,38 @@ class RetailManagementGUI:
         right_panel.columnconfigure(0, weight=1)
         
         self.setup_list_panel(right_panel)
+        
+        # Status bar
+        self.setup_status_bar()
+    
+    def setup_status_bar(self):
+        """Setup status bar with loading indicator and worker queue metrics"""
+        status_bar = tk.Frame(self.frame, bg="#ecf0f1", relief=tk.SUNKEN, bd=1)
+        status_bar.grid(row=2, column=0, sticky="ew")
+        
+        self.loading_label = tk.Label(status_bar, text="✅ Ready", font=("Arial", 9), bg="#ecf0f1", fg="#2c3e50")
+        self.loading_label.pack(side=tk.LEFT, padx=10)
+        
+        self.metrics_label = tk.Label(status_bar, text="", font=("Arial", 9), bg="#ecf0f1", fg="#7f8c8d")
+        self.metrics_label.pack(side=tk.RIGHT, padx=10)
+    
+    def update_status_bar(self, metrics):
+        """Show loading state and worker queue metrics"""
+        busy = metrics["in_flight"] > 0
+        self.loading_label.config(text="⏳ Loading..." if busy else "✅ Ready")
+        self.root.config(cursor="watch" if busy else "")
+        self.metrics_label.config(
+            text=f"Queue: {metrics['queue_depth']} | Done: {metrics['completed']} | "
+                 f"Stale dropped: {metrics['stale_dropped']} | Failed: {metrics['failed']}"
+        )
+    
+    def show_db_error(self, action):
+        """Build an error callback for a worker request"""
+        return lambda e: messagebox.showerror("Error", f"Failed to {action}:\n{str(e)}")
     
     def setup_top_bar(self):
         """Setup top navigation bar"""
-        top_bar = tk.Frame(self.root, bg="#1e3a5f", height=60)
+        top_bar = tk.Frame(self.frame, bg="#1e3a5f", height=60)
         top_bar.grid(row=0, column=0, sticky="ew")
         top_bar.grid_propagate(False)
         
@@ -578,13 +2205,14 @@ class RetailManagementGUI:
         user_frame = tk.Frame(top_bar, bg="#1e3a5f")
         user_frame.pack(side=tk.RIGHT, padx=20)
         
-        tk.Label(
+        self.user_label = tk.Label(
             user_frame,
             text=f"👤 {self.username}",
             font=("Arial", 11),
             bg="#1e3a5f",
             fg="white"
-        ).pack(side=tk.LEFT, padx=10)
+        )
+        self.user_label.pack(side=tk.LEFT, padx=10)
         
         logout_btn = tk.Button(
             user_frame,
@@ -710,6 +2338,51 @@ class RetailManagementGUI:
         )
         update_btn.grid(row=1, column=0, padx=3, pady=3, sticky="ew")
         
+        import_btn = tk.Button(
+            button_frame,
+            text="📥 Import Customers",
+            font=("Arial", 10, "bold"),
+            bg="#8e44ad",
+            fg="white",
+            activebackground="#7d3c98",
+            relief=tk.FLAT,
+            cursor="hand2",
+            command=self.open_import_dialog,
+            padx=12,
+            pady=6
+        )
+        import_btn.grid(row=1, column=1, padx=3, pady=3, sticky="ew")
+        
+        duplicates_btn = tk.Button(
+            button_frame,
+            text="🧬 Find Duplicates",
+            font=("Arial", 10, "bold"),
+            bg="#d35400",
+            fg="white",
+            activebackground="#ba4a00",
+            relief=tk.FLAT,
+            cursor="hand2",
+            command=self.open_duplicates_window,
+            padx=12,
+            pady=6
+        )
+        duplicates_btn.grid(row=2, column=0, padx=3, pady=3, sticky="ew")
+        
+        cohort_btn = tk.Button(
+            button_frame,
+            text="📅 Cohort Retention",
+            font=("Arial", 10, "bold"),
+            bg="#16a085",
+            fg="white",
+            activebackground="#138d75",
+            relief=tk.FLAT,
+            cursor="hand2",
+            command=self.open_cohort_report,
+            padx=12,
+            pady=6
+        )
+        cohort_btn.grid(row=2, column=1, padx=3, pady=3, sticky="ew")
+        
         # Transaction section
         transaction_frame = ttk.LabelFrame(actions_frame, text="💰 Add Transaction", padding="10")
         transaction_frame.pack(pady=10, fill=tk.X)
@@ -840,28 +2513,56 @@ class RetailManagementGUI:
         
         tk.Button(
             action_frame,
-            text="📜 Transaction History",
+            text="📜 Transaction History",
+            font=("Arial", 10, "bold"),
+            bg="#8e44ad",
+            fg="white",
+            activebackground="#7d3c98",
+            relief=tk.FLAT,
+            cursor="hand2",
+            command=self.view_transaction_history,
+            padx=15,
+            pady=8
+        ).pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(
+            action_frame,
+            text="📊 Customer Report",
+            font=("Arial", 10, "bold"),
+            bg="#d35400",
+            fg="white",
+            activebackground="#ba4a00",
+            relief=tk.FLAT,
+            cursor="hand2",
+            command=self.generate_report,
+            padx=15,
+            pady=8
+        ).pack(side=tk.LEFT, padx=5)
+        
+        tk.Button(
+            action_frame,
+            text="🎯 RFM Segments",
             font=("Arial", 10, "bold"),
-            bg="#8e44ad",
+            bg="#16a085",
             fg="white",
-            activebackground="#7d3c98",
+            activebackground="#138d75",
             relief=tk.FLAT,
             cursor="hand2",
-            command=self.view_transaction_history,
+            command=self.run_rfm_segmentation,
             padx=15,
             pady=8
         ).pack(side=tk.LEFT, padx=5)
         
         tk.Button(
             action_frame,
-            text="📊 Customer Report",
+            text="📤 Export Data",
             font=("Arial", 10, "bold"),
-            bg="#d35400",
+            bg="#2c3e50",
             fg="white",
-            activebackground="#ba4a00",
+            activebackground="#1a252f",
             relief=tk.FLAT,
             cursor="hand2",
-            command=self.generate_report,
+            command=self.open_export_window,
             padx=15,
             pady=8
         ).pack(side=tk.LEFT, padx=5)
@@ -918,14 +2619,345 @@ class RetailManagementGUI:
             messagebox.showerror("Validation Error", "All fields are required!")
             return
         
-        try:
-            customer_id = self.db_manager.add_customer(name.strip(), contact.strip(), address.strip(), category)
+        def on_added(customer_id):
             messagebox.showinfo("Success", f"✅ Customer '{name.strip()}' added successfully!\n\nCustomer ID: {customer_id}")
             window.destroy()
-            self.refresh_customer_list()
-            self.update_dashboard()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to add customer:\n{str(e)}")
+            self.check_for_changes()
+        
+        self.db_worker.submit(
+            self.db_manager.add_customer, name.strip(), contact.strip(), address.strip(), category,
+            on_success=on_added, on_error=self.show_db_error("add customer")
+        )
+    
+    def open_import_dialog(self):
+        """Pick a CSV/JSONL file and import its customers in the background"""
+        path = filedialog.askopenfilename(
+            title="Import Customers",
+            filetypes=[("Customer files", "*.csv *.jsonl"), ("CSV files", "*.csv"), ("JSON Lines", "*.jsonl")]
+        )
+        if not path:
+            return
+        
+        def job(report):
+            return self.db_manager.import_customers(
+                path,
+                progress=lambda s: report(
+                    f"Imported {s['imported']:,} customers\n"
+                    f"{s['duplicates']:,} duplicates, {s['invalid']:,} invalid rows skipped"
+                )
+            )
+        
+        self.run_background_job("Importing Customers", job, self.on_import_complete)
+    
+    def on_import_complete(self, stats):
+        """Show import summary and reload the directory"""
+        messagebox.showinfo(
+            "Import Complete",
+            f"✅ Imported: {stats['imported']:,}\n"
+            f"Duplicates skipped: {stats['duplicates']:,}\n"
+            f"Invalid rows skipped: {stats['invalid']:,}"
+        )
+        self.refresh_customer_list()
+        self.update_dashboard()
+    
+    def run_rfm_segmentation(self):
+        """Recompute RFM segments in the background and show the segment sizes"""
+        if not NUMPY_AVAILABLE:
+            messagebox.showwarning("Missing library", "numpy not available. Install numpy to compute RFM segments.")
+            return
+        
+        def job(report):
+            report("Scoring customers...")
+            return self.db_manager.compute_rfm_segments()
+        
+        self.run_background_job("RFM Segmentation", job, self.show_rfm_segments)
+    
+    def show_rfm_segments(self, counts):
+        """Show customer counts per RFM segment"""
+        rfm_window = tk.Toplevel(self.root)
+        rfm_window.title("RFM Segments")
+        rfm_window.geometry("400x350")
+        rfm_window.transient(self.root)
+        
+        seg_tree = ttk.Treeview(rfm_window, columns=("Segment", "Customers"), show="headings")
+        seg_tree.heading("Segment", text="Segment")
+        seg_tree.heading("Customers", text="Customers")
+        seg_tree.column("Segment", width=200)
+        seg_tree.column("Customers", width=120, anchor=tk.CENTER)
+        seg_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        for segment, count in sorted(counts.items(), key=lambda kv: -kv[1]):
+            seg_tree.insert("", tk.END, values=(segment, f"{count:,}"))
+    
+    def open_cohort_report(self, refresh=False):
+        """Show cohort retention, recomputed in the background only when the data changed"""
+        if not NUMPY_AVAILABLE:
+            messagebox.showwarning("Missing library", "numpy not available. Install numpy to compute cohort retention.")
+            return
+        
+        def job(report):
+            report("Grouping customers by registration month...")
+            return self.db_manager.compute_cohort_retention(refresh=refresh)
+        
+        self.run_background_job("Cohort Retention", job, self.show_cohort_report)
+    
+    def show_cohort_report(self, result):
+        """Show the cohort x months-since retention matrix"""
+        cohort_window = tk.Toplevel(self.root)
+        cohort_window.title(f"Cohort Retention (as of {result['month']})")
+        cohort_window.geometry("1000x450")
+        cohort_window.transient(self.root)
+        cohort_window.rowconfigure(0, weight=1)
+        cohort_window.columnconfigure(0, weight=1)
+        
+        tree_frame = tk.Frame(cohort_window)
+        tree_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+        tree_frame.rowconfigure(0, weight=1)
+        tree_frame.columnconfigure(0, weight=1)
+        
+        months = [f"M{offset}" for offset in range(COHORT_MAX_MONTHS + 1)]
+        columns = ("Cohort", "Customers", *months)
+        cohort_tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+        for col in columns:
+            cohort_tree.heading(col, text=col)
+            cohort_tree.column(col, width=90 if col in ("Cohort", "Customers") else 55, anchor=tk.CENTER)
+        
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=cohort_tree.yview)
+        hsb = ttk.Scrollbar(tree_frame, orient="horizontal", command=cohort_tree.xview)
+        cohort_tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        cohort_tree.grid(row=0, column=0, sticky="nsew")
+        vsb.grid(row=0, column=1, sticky="ns")
+        hsb.grid(row=1, column=0, sticky="ew")
+        
+        # NaN (months that have not happened yet) is the only value not equal to itself
+        for cohort, size, shares in zip(result["cohorts"], result["sizes"], result["retention"]):
+            cohort_tree.insert("", tk.END, values=(
+                cohort, f"{size:,}", *(f"{share:.0%}" if share == share else "" for share in shares)
+            ))
+        
+        footer = tk.Frame(cohort_window)
+        footer.grid(row=1, column=0, sticky="ew", padx=10, pady=(0, 10))
+        tk.Label(
+            footer,
+            text=f"M0 = registration month. Computed in {result['seconds']:.2f}s",
+            font=("Arial", 9),
+            fg="#7f8c8d"
+        ).pack(side=tk.LEFT)
+        
+        def refresh():
+            cohort_window.destroy()
+            self.open_cohort_report(refresh=True)
+        
+        tk.Button(
+            footer,
+            text="🔄 Recompute",
+            font=("Arial", 10, "bold"),
+            bg="#3498db",
+            fg="white",
+            relief=tk.FLAT,
+            cursor="hand2",
+            command=refresh,
+            padx=12,
+            pady=4
+        ).pack(side=tk.RIGHT)
+    
+    def open_duplicates_window(self):
+        """Find likely duplicate customers in the background"""
+        def job(report):
+            report("Comparing customers...")
+            return find_duplicate_customers(self.db_manager)
+        
+        self.run_background_job("Finding Duplicates", job, self.show_duplicates_window)
+    
+    def show_duplicates_window(self, duplicates):
+        """List duplicate candidates and merge the selected pair"""
+        if not duplicates:
+            messagebox.showinfo("No Duplicates", "✅ No likely duplicate customers found.")
+            return
+        
+        dup_window = tk.Toplevel(self.root)
+        dup_window.title(f"Duplicate Customers ({len(duplicates)})")
+        dup_window.geometry("950x500")
+        dup_window.transient(self.root)
+        dup_window.rowconfigure(0, weight=1)
+        dup_window.columnconfigure(0, weight=1)
+        
+        tree_frame = tk.Frame(dup_window)
+        tree_frame.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+        tree_frame.rowconfigure(0, weight=1)
+        tree_frame.columnconfigure(0, weight=1)
+        
+        columns = ("Score", "Keep", "Keep Contact", "Duplicate", "Duplicate Contact")
+        dup_tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+        for col, width in zip(columns, (70, 230, 150, 230, 150)):
+            dup_tree.heading(col, text=col)
+            dup_tree.column(col, width=width, anchor=tk.CENTER if col == "Score" else tk.W)
+        
+        vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=dup_tree.yview)
+        dup_tree.configure(yscrollcommand=vsb.set)
+        dup_tree.grid(row=0, column=0, sticky="nsew")
+        vsb.grid(row=0, column=1, sticky="ns")
+        
+        pairs = {}
+        for idx, pair in enumerate(duplicates):
+            keep, duplicate = pair["keep"], pair["duplicate"]
+            pairs[str(idx)] = pair
+            dup_tree.insert("", tk.END, iid=str(idx), values=(
+                f"{pair['score']:.0%}",
+                f"#{keep['customer_id']} {keep['name']}",
+                keep["contact"],
+                f"#{duplicate['customer_id']} {duplicate['name']}",
+                duplicate["contact"]
+            ))
+        
+        def merge_selected():
+            selection = dup_tree.selection()
+            if not selection:
+                messagebox.showwarning("Warning", "⚠️ Please select a pair first!", parent=dup_window)
+                return
+            
+            pair = pairs[selection[0]]
+            keep, duplicate = pair["keep"], pair["duplicate"]
+            if not messagebox.askyesno(
+                "Confirm Merge",
+                f"Merge #{duplicate['customer_id']} {duplicate['name']} into "
+                f"#{keep['customer_id']} {keep['name']}?\n\n"
+                "Transactions and loyalty points will be moved and the duplicate deleted.",
+                parent=dup_window
+            ):
+                return
+            
+            def on_merged(merged):
+                if not merged:
+                    messagebox.showerror("Error", "One of these customers no longer exists!", parent=dup_window)
+                    return
+                # Drop every pair that involved the removed customer
+                for iid, other in list(pairs.items()):
+                    ids = (other["keep"]["customer_id"], other["duplicate"]["customer_id"])
+                    if iid == selection[0] or duplicate["customer_id"] in ids:
+                        del pairs[iid]
+                        dup_tree.delete(iid)
+                self.check_for_changes()
+            
+            self.db_worker.submit(
+                self.db_manager.merge_customers, keep["customer_id"], duplicate["customer_id"],
+                on_success=on_merged, on_error=self.show_db_error("merge customers")
+            )
+        
+        tk.Button(
+            dup_window,
+            text="🔗 Merge Selected",
+            font=("Arial", 11, "bold"),
+            bg="#8e44ad",
+            fg="white",
+            relief=tk.FLAT,
+            cursor="hand2",
+            command=merge_selected,
+            padx=20,
+            pady=8
+        ).grid(row=1, column=0, pady=10)
+    
+    def open_export_window(self):
+        """Open window to export customers or transactions"""
+        exp_window = tk.Toplevel(self.root)
+        exp_window.title("Export Data")
+        exp_window.geometry("350x200")
+        exp_window.transient(self.root)
+        exp_window.grab_set()
+        
+        tk.Label(exp_window, text="Table:", font=("Arial", 10, "bold")).grid(row=0, column=0, sticky=tk.W, pady=8, padx=5)
+        table_combo = ttk.Combobox(exp_window, values=list(EXPORT_TABLES), state="readonly", font=("Arial", 10))
+        table_combo.set("customers")
+        table_combo.grid(row=0, column=1, sticky="ew", pady=8, padx=5)
+        
+        tk.Label(exp_window, text="Format:", font=("Arial", 10, "bold")).grid(row=1, column=0, sticky=tk.W, pady=8, padx=5)
+        format_combo = ttk.Combobox(exp_window, values=list(EXPORT_FORMATS), state="readonly", font=("Arial", 10))
+        format_combo.set("csv")
+        format_combo.grid(row=1, column=1, sticky="ew", pady=8, padx=5)
+        
+        submit_btn = tk.Button(
+            exp_window,
+            text="Export",
+            font=("Arial", 10, "bold"),
+            bg="#2c3e50",
+            fg="white",
+            command=lambda: self.submit_export(exp_window, table_combo.get(), format_combo.get())
+        )
+        submit_btn.grid(row=2, column=0, columnspan=2, pady=10)
+    
+    def submit_export(self, window, table, fmt):
+        path = filedialog.asksaveasfilename(
+            title="Export Data",
+            initialfile=f"{table}.{fmt}",
+            defaultextension=f".{fmt}",
+            filetypes=[("Export files", f"*.{fmt}")]
+        )
+        if not path:
+            return
+        window.destroy()
+        
+        def job(report):
+            return self.db_manager.export_table(
+                table, path, fmt, progress=lambda rows: report(f"Exported {rows:,} {table}...")
+            )
+        
+        self.run_background_job("Exporting Data", job, lambda stats: messagebox.showinfo(
+            "Export Complete",
+            f"✅ Exported {stats['rows']:,} {table} to\n{path}\n\n"
+            f"{stats['bytes'] / 1_048_576:.1f} MB at {stats['mb_per_sec']:.1f} MB/s"
+        ))
+    
+    def run_background_job(self, title, job, on_complete):
+        """Run job(report) on a worker thread with a progress window on the Tk thread"""
+        job_window = tk.Toplevel(self.root)
+        job_window.title(title)
+        job_window.geometry("380x150")
+        job_window.transient(self.root)
+        job_window.grab_set()
+        job_window.protocol("WM_DELETE_WINDOW", lambda: None)
+        self.job_windows.add(job_window)
+        session = self.session
+        
+        status_label = tk.Label(job_window, text="Starting...", font=("Arial", 10), justify=tk.LEFT)
+        status_label.pack(pady=(20, 10))
+        progress_bar = ttk.Progressbar(job_window, mode="indeterminate", length=300)
+        progress_bar.pack(pady=10)
+        progress_bar.start(10)
+        
+        # Tk is not thread-safe, so the worker only talks to the UI through this queue
+        events = queue.Queue()
+        
+        def worker():
+            try:
+                events.put(("done", job(lambda text: events.put(("progress", text)))))
+            except Exception as e:
+                events.put(("error", e))
+        
+        def poll():
+            try:
+                while True:
+                    kind, payload = events.get_nowait()
+                    if kind == "progress":
+                        status_label.config(text=payload)
+                        continue
+                    
+                    progress_bar.stop()
+                    job_window.destroy()
+                    self.job_windows.discard(job_window)
+                    if session != self.session:
+                        # The user who started it has logged out; the work itself is done
+                        logger.info("%s finished after logout (%s)", title, "ok" if kind == "done" else payload)
+                    elif kind == "done":
+                        on_complete(payload)
+                    else:
+                        messagebox.showerror("Error", f"{title} failed:\n{str(payload)}")
+                    return
+            except queue.Empty:
+                pass
+            self.root.after(100, poll)
+        
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(100, poll)
     
     def open_update_window(self):
         """Open window to update selected customer"""
@@ -933,7 +2965,13 @@ class RetailManagementGUI:
             messagebox.showwarning("Warning", "⚠️ Please select a customer first!")
             return
         
-        customer = self.db_manager.get_customer(self.selected_customer_id)
+        self.db_worker.submit(
+            self.db_manager.get_customer, self.selected_customer_id,
+            on_success=self.show_update_window, on_error=self.show_db_error("load customer")
+        )
+    
+    def show_update_window(self, customer):
+        """Show update form for a loaded customer"""
         if not customer:
             messagebox.showerror("Error", "Customer not found!")
             return
@@ -992,16 +3030,18 @@ class RetailManagementGUI:
             messagebox.showerror("Validation Error", "All fields are required!")
             return
         
-        try:
-            if self.db_manager.update_customer(customer_id, name.strip(), contact.strip(), address.strip(), category):
+        def on_updated(updated):
+            if updated:
                 messagebox.showinfo("Success", "✅ Customer updated successfully!")
                 window.destroy()
-                self.refresh_customer_list()
-                self.update_dashboard()
+                self.check_for_changes()
             else:
                 messagebox.showerror("Error", "Customer not found!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to update customer:\n{str(e)}")
+        
+        self.db_worker.submit(
+            self.db_manager.update_customer, customer_id, name.strip(), contact.strip(), address.strip(), category,
+            on_success=on_updated, on_error=self.show_db_error("update customer")
+        )
     
     def open_delete_window(self):
         """Open window to confirm delete selected customer"""
@@ -1009,7 +3049,13 @@ class RetailManagementGUI:
             messagebox.showwarning("Warning", "⚠️ Please select a customer first!")
             return
         
-        customer = self.db_manager.get_customer(self.selected_customer_id)
+        self.db_worker.submit(
+            self.db_manager.get_customer, self.selected_customer_id,
+            on_success=self.show_delete_window, on_error=self.show_db_error("load customer")
+        )
+    
+    def show_delete_window(self, customer):
+        """Show delete confirmation for a loaded customer"""
         if not customer:
             messagebox.showerror("Error", "Customer not found!")
             return
@@ -1022,7 +3068,7 @@ class RetailManagementGUI:
         
         tk.Label(del_window, text=f"Name: {customer['name']}", font=("Arial", 10)).pack(pady=5)
         tk.Label(del_window, text=f"ID: {customer['customer_id']}", font=("Arial", 10)).pack(pady=5)
-        tk.Label(del_window, text="This will delete all transactions!", font=("Arial", 10, "bold"), fg="red").pack(pady=10)
+        tk.Label(del_window, text="Customer and transactions will be archived.", font=("Arial", 10, "bold"), fg="red").pack(pady=10)
         
         button_frame = tk.Frame(del_window)
         button_frame.pack(pady=10)
@@ -1048,26 +3094,23 @@ class RetailManagementGUI:
         cancel_btn.pack(side=tk.LEFT, padx=5)
     
     def submit_delete(self, window, customer_id):
-        try:
-            if self.db_manager.delete_customer(customer_id):
+        def on_deleted(deleted):
+            if deleted:
                 messagebox.showinfo("Success", "✅ Customer deleted successfully!")
                 self.selected_customer_id = None
                 window.destroy()
-                self.refresh_customer_list()
-                self.update_dashboard()
+                self.check_for_changes()
             else:
                 messagebox.showerror("Error", "Failed to delete customer!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to delete customer:\n{str(e)}")
+        
+        self.db_worker.submit(
+            self.db_manager.delete_customer, customer_id,
+            on_success=on_deleted, on_error=self.show_db_error("delete customer")
+        )
     
     def get_discount_rate(self, category: str) -> float:
         """Get discount rate based on customer category"""
-        discount_rates = {
-            "Regular": 0.0,
-            "Student": 0.10,
-            "VIP": 0.15
-        }
-        return discount_rates.get(category, 0.0)
+        return DISCOUNT_RATES.get(category, 0.0)
     
     def on_customer_select(self, event):
         """Handle customer selection from list"""
@@ -1080,53 +3123,121 @@ class RetailManagementGUI:
     
     def refresh_customer_list(self):
         """Refresh the customer list"""
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Add all customers
-        customers = self.db_manager.get_all_customers()
-        for idx, customer in enumerate(customers):
-            discount_rate = self.get_discount_rate(customer["category"]) * 100
-            tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
-            
-            self.tree.insert("", tk.END, values=(
-                customer["customer_id"],
-                customer["name"],
-                customer["contact"],
-                customer["address"][:50] + "..." if len(customer["address"]) > 50 else customer["address"],
-                customer["category"],
-                customer["loyalty_points"],
-                f"{discount_rate:.0f}%"
-            ), tags=(tag,))
+        # Shares the search key, so a refresh supersedes any search still in flight
+        self.db_worker.submit(
+            self.db_manager.get_all_customers,
+            on_success=self.populate_customer_tree, key="customer_list"
+        )
     
     def search_customers(self):
         """Search customers based on query"""
         query = self.search_var.get().strip()
         
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
         if not query:
             self.refresh_customer_list()
             return
         
-        # Search and display results
-        customers = self.db_manager.search_customers(query)
+        # Only the latest keystroke's results are shown
+        self.db_worker.submit(
+            self.db_manager.search_customers, query,
+            on_success=self.populate_customer_tree, key="customer_list"
+        )
+    
+    def populate_customer_tree(self, customers):
+        """Replace the customer list contents"""
+        # Clear existing items
+        for item in self.tree.get_children():
+            self.tree.delete(item)
+        
         for idx, customer in enumerate(customers):
-            discount_rate = self.get_discount_rate(customer["category"]) * 100
             tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
-            
-            self.tree.insert("", tk.END, values=(
-                customer["customer_id"],
-                customer["name"],
-                customer["contact"],
-                customer["address"][:50] + "..." if len(customer["address"]) > 50 else customer["address"],
-                customer["category"],
-                customer["loyalty_points"],
-                f"{discount_rate:.0f}%"
-            ), tags=(tag,))
+            self.tree.insert("", tk.END, iid=str(customer["customer_id"]),
+                             values=self.customer_row_values(customer), tags=(tag,))
+    
+    def customer_row_values(self, customer):
+        """Customer list column values for a customer"""
+        discount_rate = self.get_discount_rate(customer["category"]) * 100
+        return (
+            customer["customer_id"],
+            customer["name"],
+            customer["contact"],
+            customer["address"][:50] + "..." if len(customer["address"]) > 50 else customer["address"],
+            customer["category"],
+            customer["loyalty_points"],
+            f"{discount_rate:.0f}%"
+        )
+    
+    def customer_tree_index(self, name):
+        """Position for a name in the customer list, which keeps get_all_customers' ORDER BY name"""
+        children = self.tree.get_children()
+        low, high = 0, len(children)
+        while low < high:
+            mid = (low + high) // 2
+            if self.tree.set(children[mid], "Name") <= name:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+    
+    def poll_changes(self):
+        """Poll the change feed and schedule the next poll once it has been applied"""
+        def reschedule(_=None):
+            self.change_poll_id = self.root.after(CHANGE_POLL_MS, self.poll_changes)
+        
+        self.poll_count += 1
+        if self.poll_count % 3600 == 0:
+            self.db_worker.submit(self.change_feed.prune)
+        
+        def apply(changes):
+            # Reschedule even if applying fails, or the feed would stop for the rest of the session
+            try:
+                self.apply_changes(changes)
+            finally:
+                reschedule()
+        
+        self.db_worker.submit(self.change_feed.poll, on_success=apply, on_error=reschedule)
+    
+    def check_for_changes(self):
+        """Pick up our own writes right away instead of waiting for the next poll"""
+        self.db_worker.submit(self.change_feed.poll, on_success=self.apply_changes)
+    
+    def apply_changes(self, changes):
+        """Patch the customer list and stat cards with rows that changed"""
+        if not changes:
+            return
+        if changes["reload"]:
+            self.search_customers()
+            self.update_dashboard()
+            return
+        
+        if self.search_var.get().strip():
+            # Changed rows may enter or leave the search results, so re-run it
+            if changes["customers"]:
+                self.search_customers()
+        else:
+            for customer_id, customer in changes["customers"].items():
+                iid = str(customer_id)
+                if customer is None:
+                    if self.tree.exists(iid):
+                        self.tree.delete(iid)
+                elif self.tree.exists(iid):
+                    if self.tree.set(iid, "Name") != customer["name"]:
+                        # Renamed: detach first so the index counts only the other rows
+                        self.tree.detach(iid)
+                        self.tree.move(iid, "", self.customer_tree_index(customer["name"]))
+                    self.tree.item(iid, values=self.customer_row_values(customer))
+                else:
+                    index = self.customer_tree_index(customer["name"])
+                    tag = 'evenrow' if index % 2 == 0 else 'oddrow'
+                    self.tree.insert("", index, iid=iid, values=self.customer_row_values(customer), tags=(tag,))
+        
+        counters = changes["counters"]
+        if "total_customers" in counters:
+            self.total_customers_label.config(text=str(counters["total_customers"]))
+            self.vip_customers_label.config(text=str(counters["vip_customers"]))
+        if "total_transactions" in counters:
+            self.total_transactions_label.config(text=str(counters["total_transactions"]))
+            self.total_revenue_label.config(text=f"${counters['total_revenue']:.2f}")
     
     def add_transaction(self):
         """Add a transaction to selected customer"""
@@ -1136,35 +3247,44 @@ class RetailManagementGUI:
         
         try:
             amount = float(self.amount_var.get())
-            if amount <= 0:
-                messagebox.showerror("Error", "Amount must be greater than 0!")
-                return
-            
-            description = self.trans_desc_var.get().strip()
-            if not description:
-                messagebox.showerror("Error", "Description is required!")
-                return
-            
-            customer = self.db_manager.get_customer(self.selected_customer_id)
+        except ValueError:
+            messagebox.showerror("Error", "Invalid amount! Please enter a valid number.")
+            return
+        
+        if amount <= 0:
+            messagebox.showerror("Error", "Amount must be greater than 0!")
+            return
+        
+        description = self.trans_desc_var.get().strip()
+        if not description:
+            messagebox.showerror("Error", "Description is required!")
+            return
+        
+        customer_id = self.selected_customer_id
+        
+        def record():
+            customer = self.db_manager.get_customer(customer_id)
             if not customer:
+                return None
+            self.db_manager.add_transaction(customer_id, amount, description)
+            
+            # Get updated customer info
+            return customer, self.db_manager.get_customer(customer_id)
+        
+        def on_recorded(result):
+            if result is None:
                 messagebox.showerror("Error", "Customer not found!")
                 return
             
-            old_points = customer["loyalty_points"]
-            old_category = customer["category"]
-            
-            self.db_manager.add_transaction(self.selected_customer_id, amount, description)
-            
-            # Get updated customer info
-            updated_customer = self.db_manager.get_customer(self.selected_customer_id)
-            points_earned = updated_customer["loyalty_points"] - old_points
+            customer, updated_customer = result
+            points_earned = updated_customer["loyalty_points"] - customer["loyalty_points"]
             
             msg = f"✅ Transaction added successfully!\n\n"
             msg += f"💰 Amount: ${amount:.2f}\n"
             msg += f"⭐ Points earned: {points_earned}\n"
             msg += f"📊 Total points: {updated_customer['loyalty_points']}"
             
-            if old_category != updated_customer["category"]:
+            if customer["category"] != updated_customer["category"]:
                 msg += f"\n\n🎉 Congratulations!\n"
                 msg += f"Customer upgraded to {updated_customer['category']}!"
             
@@ -1172,12 +3292,9 @@ class RetailManagementGUI:
             
             self.amount_var.set("")
             self.trans_desc_var.set("")
-            self.refresh_customer_list()
-            self.update_dashboard()
-        except ValueError:
-            messagebox.showerror("Error", "Invalid amount! Please enter a valid number.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to add transaction:\n{str(e)}")
+            self.check_for_changes()
+        
+        self.db_worker.submit(record, on_success=on_recorded, on_error=self.show_db_error("add transaction"))
     
     def view_transaction_history(self):
         """View transaction history for selected customer"""
@@ -1185,7 +3302,16 @@ class RetailManagementGUI:
             messagebox.showwarning("Warning", "⚠️ Please select a customer first!")
             return
         
-        customer = self.db_manager.get_customer(self.selected_customer_id)
+        customer_id = self.selected_customer_id
+        self.db_worker.submit(
+            lambda: (self.db_manager.get_customer(customer_id),
+                     self.db_manager.get_transaction_summary(customer_id)),
+            on_success=lambda result: self.show_transaction_history(*result),
+            on_error=self.show_db_error("load transaction history")
+        )
+    
+    def show_transaction_history(self, customer, summary):
+        """Show the paged transaction history window"""
         if not customer:
             messagebox.showerror("Error", "Customer not found!")
             return
@@ -1230,16 +3356,20 @@ class RetailManagementGUI:
         tree_frame.rowconfigure(0, weight=1)
         tree_frame.columnconfigure(0, weight=1)
         
-        columns = ("Date", "Amount", "Description")
+        columns = ("Date", "Amount", "Description", "Balance", "Month")
         trans_tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
         
         trans_tree.heading("Date", text="Transaction Date")
         trans_tree.heading("Amount", text="Amount")
         trans_tree.heading("Description", text="Description")
+        trans_tree.heading("Balance", text="Running Total")
+        trans_tree.heading("Month", text="Month Subtotal")
         
-        trans_tree.column("Date", width=200)
-        trans_tree.column("Amount", width=150, anchor=tk.CENTER)
-        trans_tree.column("Description", width=400)
+        trans_tree.column("Date", width=170)
+        trans_tree.column("Amount", width=110, anchor=tk.CENTER)
+        trans_tree.column("Description", width=300)
+        trans_tree.column("Balance", width=130, anchor=tk.CENTER)
+        trans_tree.column("Month", width=130, anchor=tk.CENTER)
         
         vsb = ttk.Scrollbar(tree_frame, orient="vertical", command=trans_tree.yview)
         trans_tree.configure(yscrollcommand=vsb.set)
@@ -1247,36 +3377,78 @@ class RetailManagementGUI:
         trans_tree.grid(row=0, column=0, sticky="nsew")
         vsb.grid(row=0, column=1, sticky="ns")
         
-        # Add transactions
-        transactions = self.db_manager.get_transactions(self.selected_customer_id)
-        total_amount = 0
-        
-        if transactions:
-            for idx, trans in enumerate(transactions):
-                tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
-                trans_tree.insert("", tk.END, values=(
-                    trans["transaction_date"],
-                    f"${trans['amount']:.2f}",
-                    trans["description"]
-                ), tags=(tag,))
-                total_amount += trans["amount"]
-            
-            trans_tree.tag_configure('oddrow', background='#f9f9f9')
-            trans_tree.tag_configure('evenrow', background='white')
-        else:
-            trans_tree.insert("", tk.END, values=("No transactions yet", "", ""))
+        trans_tree.tag_configure('oddrow', background='#f9f9f9')
+        trans_tree.tag_configure('evenrow', background='white')
         
         # Summary
+        customer_id = customer["customer_id"]
+        
         summary_frame = tk.Frame(history_window, bg="#ecf0f1", relief=tk.RAISED, bd=2)
         summary_frame.grid(row=2, column=0, sticky="ew", padx=10, pady=(0, 10))
         
         tk.Label(
             summary_frame,
-            text=f"Total Transactions: {len(transactions)} | Total Amount: ${total_amount:.2f}",
+            text=f"Total Transactions: {summary['count']} | Total Amount: ${summary['total']:.2f}",
             font=("Arial", 12, "bold"),
             bg="#ecf0f1",
             fg="#2c3e50"
-        ).pack(pady=10)
+        ).pack(side=tk.LEFT, padx=10, pady=10)
+        
+        # Keyset pagination: each page starts below the (date, id) of the previous page's last row
+        page_keys = [None]
+        current_page = []
+        
+        def show_page():
+            self.db_worker.submit(
+                self.db_manager.get_transaction_page, customer_id, page_keys[-1],
+                on_success=render_page, key=f"history_page_{customer_id}"
+            )
+        
+        def render_page(page):
+            if not history_window.winfo_exists():
+                return
+            for item in trans_tree.get_children():
+                trans_tree.delete(item)
+            
+            current_page[:] = page
+            for idx, trans in enumerate(current_page):
+                tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
+                trans_tree.insert("", tk.END, values=(
+                    trans["transaction_date"],
+                    f"${trans['amount']:.2f}",
+                    trans["description"],
+                    f"${trans['running_total']:.2f}",
+                    f"${trans['month_total']:.2f}"
+                ), tags=(tag,))
+            
+            if not current_page:
+                trans_tree.insert("", tk.END, values=("No transactions yet", "", "", "", ""))
+            
+            first = (len(page_keys) - 1) * HISTORY_PAGE_SIZE
+            last = first + len(current_page)
+            page_label.config(text=f"{min(first + 1, last)}-{last} of {summary['count']}")
+            newer_btn.config(state=tk.NORMAL if len(page_keys) > 1 else tk.DISABLED)
+            older_btn.config(state=tk.NORMAL if last < summary["count"] else tk.DISABLED)
+        
+        def show_older():
+            oldest = current_page[-1]
+            page_keys.append((oldest["transaction_date"], oldest["transaction_id"]))
+            show_page()
+        
+        def show_newer():
+            page_keys.pop()
+            show_page()
+        
+        older_btn = tk.Button(summary_frame, text="Older ▶", font=("Arial", 10, "bold"),
+                              relief=tk.FLAT, cursor="hand2", command=show_older)
+        older_btn.pack(side=tk.RIGHT, padx=5)
+        page_label = tk.Label(summary_frame, font=("Arial", 10), bg="#ecf0f1", fg="#2c3e50")
+        page_label.pack(side=tk.RIGHT, padx=5)
+        newer_btn = tk.Button(summary_frame, text="◀ Newer", font=("Arial", 10, "bold"),
+                              relief=tk.FLAT, cursor="hand2", command=show_newer)
+        newer_btn.pack(side=tk.RIGHT, padx=5)
+        
+        show_page()
         
         # Close button
         close_btn = tk.Button(
@@ -1299,13 +3471,28 @@ class RetailManagementGUI:
             messagebox.showwarning("Warning", "⚠️ Please select a customer first!")
             return
         
-        customer = self.db_manager.get_customer(self.selected_customer_id)
-        if not customer:
+        customer_id = self.selected_customer_id
+        
+        def build():
+            customer = self.db_manager.get_customer(customer_id)
+            if not customer:
+                return None
+            transactions = self.db_manager.get_transactions(customer_id)
+            total_spent = sum(t["amount"] for t in transactions)
+            return customer, render_customer_report(
+                customer, len(transactions), total_spent, transactions[:REPORT_RECENT_TRANSACTIONS]
+            )
+        
+        self.db_worker.submit(
+            build, on_success=self.show_report_window, on_error=self.show_db_error("generate report")
+        )
+    
+    def show_report_window(self, result):
+        """Show a rendered customer report"""
+        if result is None:
             messagebox.showerror("Error", "Customer not found!")
             return
-        
-        transactions = self.db_manager.get_transactions(self.selected_customer_id)
-        total_spent = sum(t["amount"] for t in transactions)
+        customer, report = result
         
         # Create report window
         report_window = tk.Toplevel(self.root)
@@ -1344,50 +3531,6 @@ class RetailManagementGUI:
         report_text.grid(row=0, column=0, sticky="nsew")
         report_scrollbar.grid(row=0, column=1, sticky="ns")
         
-        # Generate report content
-        report = f"""
-{'='*60}
-                    CUSTOMER REPORT
-{'='*60}
-
-Customer Information:
-{'─'*60}
-Customer ID        : {customer['customer_id']}
-Name               : {customer['name']}
-Contact            : {customer['contact']}
-Address            : {customer['address']}
-Category           : {customer['category']}
-Registration Date  : {customer['registration_date']}
-
-Loyalty Program:
-{'─'*60}
-Loyalty Points     : {customer['loyalty_points']} points
-Discount Rate      : {self.get_discount_rate(customer['category']) * 100:.0f}%
-Status             : {'🌟 VIP Member' if customer['category'] == 'VIP' else '📋 Active'}
-
-Transaction Summary:
-{'─'*60}
-Total Transactions : {len(transactions)}
-Total Amount Spent : ${total_spent:.2f}
-Average Transaction: ${(total_spent / len(transactions)):.2f if transactions else 0:.2f}
-
-Recent Transactions:
-{'─'*60}
-"""
-        
-        # Add recent transactions
-        if transactions:
-            for trans in transactions[:5]:  # Last 5 transactions
-                report += f"\n{trans['transaction_date'][:16]}\n"
-                report += f"  Amount: ${trans['amount']:.2f}\n"
-                report += f"  Description: {trans['description']}\n"
-        else:
-            report += "\nNo transactions yet.\n"
-        
-        report += f"\n{'='*60}\n"
-        report += f"Report Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-        report += f"{'='*60}\n"
-        
         report_text.insert("1.0", report)
         report_text.config(state=tk.DISABLED)
         
@@ -1408,38 +3551,192 @@ Recent Transactions:
     
     def update_dashboard(self):
         """Update dashboard statistics"""
-        try:
-            stats = self.db_manager.get_dashboard_stats()
-            
-            self.total_customers_label.config(text=str(stats["total_customers"]))
-            self.vip_customers_label.config(text=str(stats["vip_customers"]))
-            self.total_transactions_label.config(text=str(stats["total_transactions"]))
-            self.total_revenue_label.config(text=f"${stats['total_revenue']:.2f}")
-        except Exception as e:
-            print(f"Error updating dashboard: {e}")
+        self.db_worker.submit(
+            self.db_manager.get_dashboard_stats,
+            on_success=self.show_dashboard_stats,
+            on_error=lambda e: logger.error("Error updating dashboard: %s", e),
+            key="dashboard"
+        )
+    
+    def show_dashboard_stats(self, stats):
+        """Show dashboard statistics"""
+        self.total_customers_label.config(text=str(stats["total_customers"]))
+        self.vip_customers_label.config(text=str(stats["vip_customers"]))
+        self.total_transactions_label.config(text=str(stats["total_transactions"]))
+        self.total_revenue_label.config(text=f"${stats['total_revenue']:.2f}")
     
     def logout(self):
         """Handle logout"""
         result = messagebox.askyesno("Confirm Logout", "Are you sure you want to logout?")
         if result:
-            self.root.destroy()
-            start_application()
+            self.on_logout()
+
+
+class AppShell:
+    """One Tk root that switches between the login screen and the main window without rebuilding them"""
+    
+    def __init__(self, root, db_manager):
+        self.root = root
+        self.db_manager = db_manager
+        self.root.resizable(True, True)
+        self.root.rowconfigure(0, weight=1)
+        self.root.columnconfigure(0, weight=1)
+        
+        # Shared by both screens for the whole process, along with the DatabaseManager
+        self.db_worker = DatabaseWorker(self.root)
+        self.login_view = LoginWindow(self.root, db_manager, self.db_worker, self.start_session)
+        self.main_view = None
+        self.last_switch_ms = None
+        
+        self.login_view.show()
+    
+    def start_session(self, username):
+        """Show the main window for a user, building it on the first login only"""
+        self.login_view.hide()
+        if self.main_view is None:
+            self.main_view = RetailManagementGUI(
+                self.root, self.db_manager, self.db_worker, username, self.end_session
+            )
+        else:
+            self.main_view.start_session(username)
+        self.main_view.show()
+    
+    def end_session(self):
+        """Return to the login screen, resetting only per-user state"""
+        start = time.perf_counter()
+        self.main_view.end_session()
+        self.main_view.hide()
+        self.login_view.show()
+        self.root.update_idletasks()
+        
+        self.last_switch_ms = (time.perf_counter() - start) * 1000
+        if self.last_switch_ms > SESSION_SWITCH_BUDGET_MS:
+            logger.warning("Logout took %.0f ms (budget %d ms)", self.last_switch_ms, SESSION_SWITCH_BUDGET_MS)
 
 
 def start_application():
     """Start the application with login"""
-    db_manager = DatabaseManager()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    root = tk.Tk()
+    app = AppShell(root, DatabaseManager())
+    root.mainloop()
+
+
+def run_cli(argv: List[str]):
+    """Run a headless batch command"""
+    parser = argparse.ArgumentParser(description="Retail Management System batch tools")
+    parser.add_argument("--db", default="retail_management.db", help="SQLite database file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    import_cmd = commands.add_parser("import", help="Bulk import customers from CSV/JSONL")
+    import_cmd.add_argument("path")
+    import_cmd.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+    
+    export_cmd = commands.add_parser("export", help="Stream a table to CSV, CSV.GZ or JSONL")
+    export_cmd.add_argument("table", choices=list(EXPORT_TABLES))
+    export_cmd.add_argument("path")
+    export_cmd.add_argument("--format", choices=EXPORT_FORMATS)
+    
+    reports_cmd = commands.add_parser("reports", help="Write a text report for every customer")
+    reports_cmd.add_argument("output_dir")
+    reports_cmd.add_argument("--month", help="Only include transactions from this month (YYYY-MM)")
+    reports_cmd.add_argument("--workers", type=int)
+    
+    rfm_cmd = commands.add_parser("rfm", help="Recompute RFM segments for every customer")
+    rfm_cmd.add_argument("--as-of", help="Score recency relative to this date (default: now)")
     
-    def on_login_success(username):
-        """Callback after successful login"""
-        main_root = tk.Tk()
-        app = RetailManagementGUI(main_root, db_manager, username)
-        main_root.mainloop()
+    archive_cmd = commands.add_parser("archive", help="Move customers and their transactions to the archive tables")
+    archive_target = archive_cmd.add_mutually_exclusive_group(required=True)
+    archive_target.add_argument("--before", help="Archive customers with no activity since this date (YYYY-MM-DD)")
+    archive_target.add_argument("--customer", type=int, help="Archive a single customer by ID")
+    archive_cmd.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
     
-    login_root = tk.Tk()
-    login_app = LoginWindow(login_root, db_manager, on_login_success)
-    login_root.mainloop()
+    restore_cmd = commands.add_parser("restore", help="Restore an archived customer and their transactions")
+    restore_cmd.add_argument("customer_id", type=int)
+    restore_cmd.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    
+    expire_cmd = commands.add_parser("expire-points", help="Expire old loyalty points and recompute VIP status")
+    expire_cmd.add_argument("--as-of", help="Expire relative to this date (default: now)")
+    expire_cmd.add_argument("--months", type=int, default=POINTS_EXPIRY_MONTHS, help="Points expire after this many months")
+    expire_cmd.add_argument("--batch-size", type=int, default=EXPIRY_BATCH_SIZE)
+    
+    cohorts_cmd = commands.add_parser("cohorts", help="Print monthly cohort retention")
+    cohorts_cmd.add_argument("--as-of", help="Last month to include (YYYY-MM, default: this month)")
+    
+    dedupe_cmd = commands.add_parser("dedupe", help="List likely duplicate customers")
+    dedupe_cmd.add_argument("--threshold", type=float, default=DUPLICATE_THRESHOLD)
+    dedupe_cmd.add_argument("--limit", type=int, default=20, help="Number of pairs to print")
+    
+    commands.add_parser("bench-records", help="Compare customer loading as dicts versus records")
+    
+    bench_cmd = commands.add_parser("bench-export", help="Measure export throughput in MB/s")
+    bench_cmd.add_argument("--output-dir", default="export_benchmark")
+    
+    args = parser.parse_args(argv)
+    db_manager = DatabaseManager(args.db)
+    
+    if args.command == "import":
+        start = time.perf_counter()
+        stats = db_manager.import_customers(args.path, args.chunk_size)
+        print(f"Imported {stats['imported']:,} customers in {time.perf_counter() - start:.1f}s "
+              f"({stats['duplicates']:,} duplicates, {stats['invalid']:,} invalid)")
+    elif args.command == "export":
+        stats = db_manager.export_table(args.table, args.path, args.format)
+        print(f"Exported {stats['rows']:,} rows in {stats['seconds']:.1f}s ({stats['mb_per_sec']:.1f} MB/s)")
+    elif args.command == "reports":
+        stats = generate_batch_reports(db_manager, args.output_dir, args.month, args.workers)
+        print(f"Wrote {stats['customers']:,} reports in {stats['seconds']:.1f}s "
+              f"({stats['customers_per_sec']:,.0f} customers/sec)")
+    elif args.command == "rfm":
+        start = time.perf_counter()
+        counts = db_manager.compute_rfm_segments(args.as_of)
+        print(f"Scored {sum(counts.values()):,} customers in {time.perf_counter() - start:.2f}s")
+        for segment, count in sorted(counts.items(), key=lambda kv: -kv[1]):
+            print(f"  {segment:<16}{count:>10,}")
+    elif args.command == "archive":
+        if args.customer is not None:
+            archived = db_manager.archive_customer(args.customer, args.batch_size)
+            print(f"Archived customer #{args.customer}" if archived else f"Customer #{args.customer} not found")
+        else:
+            stats = db_manager.archive_inactive_customers(args.before, args.batch_size)
+            print(f"Archived {stats['customers']:,} customers and {stats['transactions']:,} transactions "
+                  f"in {stats['seconds']:.1f}s")
+    elif args.command == "restore":
+        restored = db_manager.restore_customer(args.customer_id, args.batch_size)
+        print(f"Restored customer #{args.customer_id}" if restored else f"Customer #{args.customer_id} not archived")
+    elif args.command == "expire-points":
+        stats = db_manager.expire_loyalty_points(args.as_of, args.months, args.batch_size)
+        print(f"Expired {stats['points']:,} points from {stats['transactions']:,} transactions "
+              f"({stats['customers']:,} customer updates) in {stats['seconds']:.1f}s")
+        print(f"Promoted {stats['promoted']:,} customers to VIP, demoted {stats['demoted']:,} from VIP")
+    elif args.command == "cohorts":
+        result = db_manager.compute_cohort_retention(args.as_of)
+        print(f"Computed {len(result['cohorts']):,} cohorts in {result['seconds']:.2f}s")
+        print(f"{'Cohort':<9}{'Size':>9}" + "".join(f"{f'M{offset}':>6}" for offset in range(COHORT_MAX_MONTHS + 1)))
+        for cohort, size, shares in zip(result["cohorts"], result["sizes"], result["retention"]):
+            print(f"{cohort:<9}{size:>9,}" + "".join(f"{share:>6.0%}" if share == share else f"{'':>6}" for share in shares))
+    elif args.command == "dedupe":
+        start = time.perf_counter()
+        duplicates = find_duplicate_customers(db_manager, args.threshold)
+        print(f"Found {len(duplicates):,} candidate pairs in {time.perf_counter() - start:.1f}s")
+        for pair in duplicates[:args.limit]:
+            keep, duplicate = pair["keep"], pair["duplicate"]
+            print(f"  {pair['score']:.0%}  #{keep.customer_id} {keep.name} ({keep.contact})"
+                  f"  <-  #{duplicate.customer_id} {duplicate.name} ({duplicate.contact})")
+    elif args.command == "bench-records":
+        for label, stats in benchmark_records(db_manager).items():
+            print(f"{label:<8}{stats['rows']:>12,} customers {stats['seconds']:>8.2f}s {stats['mb']:>10.1f} MB")
+    elif args.command == "bench-export":
+        db_size = os.path.getsize(args.db) / 1_048_576
+        print(f"Database: {args.db} ({db_size:.1f} MB)")
+        for stats in benchmark_export(db_manager, args.output_dir):
+            print(f"{stats['table']:<14}{stats['format']:<8}{stats['rows']:>12,} rows "
+                  f"{stats['bytes'] / 1_048_576:>10.1f} MB {stats['seconds']:>8.2f}s "
+                  f"{stats['mb_per_sec']:>8.1f} MB/s")
 
 
 if __name__ == "__main__":
-    start_application()
\ No newline at end of file
+    if len(sys.argv) > 1:
+        run_cli(sys.argv[1:])
+    else:
+        start_application()
\ No newline at end of file
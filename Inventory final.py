@@ -1,6 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
+from datetime import date, timedelta
+from inventory_core import (ItemStore, SQLiteBackend, now_timestamp, stock_level, forecast_reorder,
+                            FORECAST_WINDOW_DAYS, LEAD_TIME_DAYS, NUMPY_AVAILABLE)
 
 class StockMonitorApp:
     def __init__(self, root):
@@ -11,10 +14,12 @@ class StockMonitorApp:
         
         # Database setup
         self.db_name = "stock_data.db"
+        self.backend = SQLiteBackend(self.db_name)
+        self.ledger = self.backend.ledger
         self.init_db()
         
         # Load items from DB
-        self.items = self.load_data()
+        self.items = ItemStore(self.load_data())
         
         # GUI setup
         self.create_widgets()
@@ -22,89 +27,20 @@ class StockMonitorApp:
         
     # ---------- DATABASE FUNCTIONS ----------
     def init_db(self):
-        """Initialize database and create table if not exists."""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS stock_items (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                sku TEXT UNIQUE NOT NULL,
-                quantity INTEGER,
-                min_level INTEGER,
-                category TEXT NOT NULL,
-                subcategory TEXT NOT NULL,
-                unit TEXT,
-                price REAL,
-                description TEXT,
-                is_service INTEGER DEFAULT 0,
-                duration TEXT,
-                service_cost REAL
-            )
-        """)
-        conn.commit()
-        conn.close()
+        """Initialize database and create tables if not exists."""
+        self.backend.init_db()
 
     def load_data(self):
         """Load all items from the database."""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT name, sku, quantity, min_level, category, subcategory, unit,
-                   price, description, is_service, duration, service_cost
-            FROM stock_items
-        """)
-        rows = cursor.fetchall()
-        conn.close()
-        items = []
-        for r in rows:
-            items.append({
-                'name': r[0],
-                'sku': r[1],
-                'quantity': r[2],
-                'min_level': r[3],
-                'category': r[4],
-                'subcategory': r[5],
-                'unit': r[6],
-                'price': r[7],
-                'description': r[8],
-                'is_service': bool(r[9]),
-                'duration': r[10],
-                'service_cost': r[11]
-            })
-        return items
+        return self.backend.load_items()
 
-    def save_to_db(self, item, update=False):
-        """Insert or update an item in the database."""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        if update:
-            cursor.execute("""
-                UPDATE stock_items
-                SET name=?, quantity=?, min_level=?, category=?, subcategory=?, unit=?,
-                    price=?, description=?, is_service=?, duration=?, service_cost=?
-                WHERE sku=?
-            """, (item['name'], item['quantity'], item['min_level'], item['category'],
-                  item['subcategory'], item['unit'], item['price'], item['description'],
-                  int(item['is_service']), item['duration'], item['service_cost'], item['sku']))
-        else:
-            cursor.execute("""
-                INSERT INTO stock_items (name, sku, quantity, min_level, category, subcategory,
-                                         unit, price, description, is_service, duration, service_cost)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (item['name'], item['sku'], item['quantity'], item['min_level'],
-                  item['category'], item['subcategory'], item['unit'], item['price'],
-                  item['description'], int(item['is_service']), item['duration'], item['service_cost']))
-        conn.commit()
-        conn.close()
+    def save_to_db(self, item, update=False, original_sku=None, reason=None):
+        """Insert or update an item in the database, logging any quantity change as a movement."""
+        self.backend.save_item(item, update=update, original_sku=original_sku, reason=reason)
 
     def delete_from_db(self, sku):
-        """Delete an item by SKU."""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM stock_items WHERE sku=?", (sku,))
-        conn.commit()
-        conn.close()
+        """Delete an item by SKU (its remaining stock is logged as a 'delete' movement)."""
+        self.backend.delete_item(sku)
     
     # ---------- GUI CREATION ----------
     def create_widgets(self):
@@ -125,9 +61,12 @@ class StockMonitorApp:
         self.critical_label = self.create_stat_card(stats_frame, "Critical", "0", '#e74c3c', 2)
         self.healthy_label = self.create_stat_card(stats_frame, "Healthy", "0", '#27ae60', 3)
         
-        # Alert Frame
+        # Alert Frame (banner is shown/hidden by update_stats, never rebuilt)
         self.alert_frame = tk.Frame(self.root, bg='#f0f0f0')
         self.alert_frame.pack(fill='x', padx=10, pady=5)
+        self.alert_banner = tk.Frame(self.alert_frame, bg='#e74c3c', relief='raised', bd=2)
+        self.alert_label = tk.Label(self.alert_banner, font=('Arial', 12, 'bold'), bg='#e74c3c', fg='white')
+        self.alert_label.pack(pady=10)
         
         # Control Frame
         control_frame = tk.Frame(self.root, bg='#f0f0f0')
@@ -141,6 +80,8 @@ class StockMonitorApp:
         
         tk.Button(control_frame, text="➕ Add Item/Service", command=self.add_item,
                   bg='#3498db', fg='white', font=('Arial', 10, 'bold'), padx=15, pady=5).pack(side='right', padx=5)
+        tk.Button(control_frame, text="📈 Reorder Forecast", command=self.show_forecast,
+                  bg='#34495e', fg='white', font=('Arial', 10, 'bold'), padx=15, pady=5).pack(side='right', padx=5)
         
         # Table Frame
         table_frame = tk.Frame(self.root, bg='white')
@@ -204,48 +145,62 @@ class StockMonitorApp:
         else:
             return 'GOOD', 'good'
             
-    def get_filtered_items(self):
+    def matches_filter(self, item):
         filter_type = self.filter_var.get()
-        if filter_type == 'all':
-            return self.items
-        elif filter_type == 'low':
-            return [i for i in self.items if not i['is_service'] and i['quantity'] <= i['min_level']]
+        if filter_type == 'low':
+            return stock_level(item) != 'healthy'
         elif filter_type == 'critical':
-            return [i for i in self.items if not i['is_service'] and i['quantity'] <= i['min_level'] * 0.5]
-        return self.items
+            return stock_level(item) == 'critical'
+        return True
+    
+    def get_filtered_items(self):
+        return self.items.filter(level=self.filter_var.get())
+    
+    def update_stats(self):
+        """Show the running counters; O(1), no pass over the items"""
+        self.total_label.config(text=str(self.items.stats.total))
+        self.low_label.config(text=str(self.items.stats.low))
+        self.critical_label.config(text=str(self.items.stats.critical))
+        self.healthy_label.config(text=str(self.items.stats.healthy))
+        
+        if self.items.stats.critical > 0:
+            self.alert_label.config(text=f"⚠️ CRITICAL ALERT: {self.items.stats.critical} item(s) at critical levels!")
+            self.alert_banner.pack(fill='x', pady=5)
+        else:
+            self.alert_banner.pack_forget()
+    
+    def item_row(self, item):
+        status, tag = self.get_stock_status(item)
+        percentage = 100 if item['is_service'] else min((item['quantity'] / item['min_level']) * 100, 100)
+        return (
+            status, item['name'], item['sku'], item['category'],
+            item['subcategory'], item['quantity'] if not item['is_service'] else '',
+            item['min_level'] if not item['is_service'] else '', item['unit'] if not item['is_service'] else '',
+            f"${item['price']:.2f}" if item['price'] else '',
+            f"{percentage:.0f}%" if not item['is_service'] else ''
+        ), tag
+    
+    def show_item(self, item):
+        """Insert, update or hide one item's row without touching the rest of the table"""
+        sku = item['sku']
+        if not self.matches_filter(item):
+            if self.tree.exists(sku):
+                self.tree.delete(sku)
+            return
+        values, tag = self.item_row(item)
+        if self.tree.exists(sku):
+            self.tree.item(sku, values=values, tags=(tag,))
+        else:
+            self.tree.insert('', 'end', iid=sku, values=values, tags=(tag,))
         
     def refresh_display(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        total = len(self.items)
-        low_count = len([i for i in self.items if not i['is_service'] and i['quantity'] <= i['min_level']])
-        critical_count = len([i for i in self.items if not i['is_service'] and i['quantity'] <= i['min_level'] * 0.5])
-        healthy_count = total - low_count
-        
-        self.total_label.config(text=str(total))
-        self.low_label.config(text=str(low_count))
-        self.critical_label.config(text=str(critical_count))
-        self.healthy_label.config(text=str(healthy_count))
-        
-        for widget in self.alert_frame.winfo_children():
-            widget.destroy()
-        if critical_count > 0:
-            alert = tk.Frame(self.alert_frame, bg='#e74c3c', relief='raised', bd=2)
-            alert.pack(fill='x', pady=5)
-            tk.Label(alert, text=f"⚠️ CRITICAL ALERT: {critical_count} item(s) at critical levels!",
-                     font=('Arial', 12, 'bold'), bg='#e74c3c', fg='white').pack(pady=10)
+        """Rebuild the table for the current filter; single-item changes use show_item"""
+        self.tree.delete(*self.tree.get_children())
+        self.update_stats()
         
         for item in self.get_filtered_items():
-            status, tag = self.get_stock_status(item)
-            percentage = 100 if item['is_service'] else min((item['quantity'] / item['min_level']) * 100, 100)
-            self.tree.insert('', 'end', values=(
-                status, item['name'], item['sku'], item['category'],
-                item['subcategory'], item['quantity'] if not item['is_service'] else '',
-                item['min_level'] if not item['is_service'] else '', item['unit'] if not item['is_service'] else '',
-                f"${item['price']:.2f}" if item['price'] else '',
-                f"{percentage:.0f}%" if not item['is_service'] else ''
-            ), tags=(tag,))
+            values, tag = self.item_row(item)
+            self.tree.insert('', 'end', iid=item['sku'], values=values, tags=(tag,))
             
     # ---------- ITEM DIALOGS ----------
     def add_item(self):
@@ -256,8 +211,8 @@ class StockMonitorApp:
         if not selection:
             messagebox.showwarning("No Selection", "Select an item to edit")
             return
-        item_values = self.tree.item(selection[0])['values']
-        item = next((i for i in self.items if i['sku'] == item_values[2]), None)
+        # Rows are keyed by SKU
+        item = self.items.get(selection[0])
         if item:
             self.open_item_dialog(item)
             
@@ -267,11 +222,12 @@ class StockMonitorApp:
             messagebox.showwarning("No Selection", "Select an item to delete")
             return
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this item?"):
-            item_values = self.tree.item(selection[0])['values']
-            sku = item_values[2]
+            sku = selection[0]
             self.delete_from_db(sku)
-            self.items = [i for i in self.items if i['sku'] != sku]
-            self.refresh_display()
+            if sku in self.items:
+                self.items.remove(sku)
+            self.tree.delete(sku)
+            self.update_stats()
             
     def open_item_dialog(self, item=None):
         dialog = tk.Toplevel(self.root)
@@ -340,18 +296,23 @@ class StockMonitorApp:
                 }
                 
                 if item:
-                    self.save_to_db(new_item, update=True)
-                    idx = next((i for i, x in enumerate(self.items) if x['sku'] == item['sku']), None)
-                    if idx is not None:
-                        self.items[idx] = new_item
+                    if sku != item['sku'] and sku in self.items:
+                        messagebox.showerror("Error", "SKU already exists")
+                        return
+                    self.save_to_db(new_item, update=True, original_sku=item['sku'])
+                    if item['sku'] in self.items:
+                        self.items.update(item['sku'], new_item)
+                    if sku != item['sku'] and self.tree.exists(item['sku']):
+                        self.tree.delete(item['sku'])
                 else:
-                    if any(i['sku'] == sku for i in self.items):
+                    if sku in self.items:
                         messagebox.showerror("Error", "SKU already exists")
                         return
                     self.save_to_db(new_item)
-                    self.items.append(new_item)
+                    self.items.add(new_item)
                 
-                self.refresh_display()
+                self.show_item(new_item)
+                self.update_stats()
                 dialog.destroy()
             except ValueError:
                 messagebox.showerror("Error", "Enter valid numbers for quantity, min level, price, or service cost")
@@ -370,7 +331,110 @@ class StockMonitorApp:
         menu = tk.Menu(self.root, tearoff=0)
         menu.add_command(label="Edit", command=self.edit_item)
         menu.add_command(label="Delete", command=self.delete_item)
+        menu.add_command(label="Movement History", command=self.show_history)
         menu.post(event.x_root, event.y_root)
+    
+    def show_history(self):
+        selection = self.tree.selection()
+        if not selection:
+            messagebox.showwarning("No Selection", "Select an item to view its history")
+            return
+        sku = selection[0]
+        
+        window = tk.Toplevel(self.root)
+        window.title(f"Movement History - {sku}")
+        window.geometry("700x450")
+        window.configure(bg='#ecf0f1')
+        window.transient(self.root)
+        
+        # Point-in-time lookup: latest snapshot + the movements after it
+        query_frame = tk.Frame(window, bg='#ecf0f1')
+        query_frame.pack(fill='x', padx=10, pady=10)
+        tk.Label(query_frame, text="Stock at:", bg='#ecf0f1', font=('Arial', 10)).pack(side='left', padx=5)
+        when_var = tk.StringVar(value=now_timestamp())
+        tk.Entry(query_frame, textvariable=when_var, width=22, font=('Arial', 10)).pack(side='left', padx=5)
+        result_label = tk.Label(query_frame, text="", bg='#ecf0f1', font=('Arial', 10, 'bold'))
+        
+        def lookup():
+            try:
+                result_label.config(text=f"{self.ledger.stock_at(sku, when_var.get().strip())} units")
+            except sqlite3.Error as e:
+                messagebox.showerror("Error", str(e), parent=window)
+        
+        tk.Button(query_frame, text="Show", command=lookup, bg='#3498db', fg='white',
+                  font=('Arial', 10, 'bold'), padx=10).pack(side='left', padx=5)
+        result_label.pack(side='left', padx=10)
+        
+        table_frame = tk.Frame(window, bg='white')
+        table_frame.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+        columns = ('Date', 'Type', 'Change', 'Quantity After', 'Note')
+        history_tree = ttk.Treeview(table_frame, columns=columns, show='headings')
+        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=history_tree.yview)
+        history_tree.configure(yscrollcommand=vsb.set)
+        for col, width in zip(columns, (150, 100, 80, 110, 200)):
+            history_tree.heading(col, text=col)
+            history_tree.column(col, width=width, anchor='center')
+        history_tree.grid(row=0, column=0, sticky='nsew')
+        vsb.grid(row=0, column=1, sticky='ns')
+        table_frame.grid_rowconfigure(0, weight=1)
+        table_frame.grid_columnconfigure(0, weight=1)
+        
+        for created_at, reason, delta, quantity_after, note in self.ledger.history(sku):
+            history_tree.insert('', 'end', values=(
+                created_at, reason.title(), f"{delta:+d}", quantity_after, note or ''
+            ))
+    
+    def show_forecast(self):
+        if not NUMPY_AVAILABLE:
+            messagebox.showwarning("Missing library", "numpy not available. Install numpy to run the forecast.")
+            return
+        today = date.today()
+        since = (today - timedelta(days=FORECAST_WINDOW_DAYS - 1)).isoformat()
+        try:
+            forecast = forecast_reorder(self.items, self.ledger.daily_consumption(since), as_of=today)
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", str(e))
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Reorder Forecast")
+        window.geometry("900x500")
+        window.configure(bg='#ecf0f1')
+        window.transient(self.root)
+        
+        at_risk = sum(1 for row in forecast if row['at_risk'])
+        tk.Label(window, text=f"{at_risk} item(s) will run out within the {LEAD_TIME_DAYS}-day lead time "
+                              f"(usage smoothed over the last {FORECAST_WINDOW_DAYS} days)",
+                 bg='#ecf0f1', font=('Arial', 11, 'bold')).pack(pady=10)
+        
+        table_frame = tk.Frame(window, bg='white')
+        table_frame.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+        columns = ('Item Name', 'SKU', 'On Hand', 'Daily Usage', 'Days of Cover', 'Reorder Point', 'Status')
+        forecast_tree = ttk.Treeview(table_frame, columns=columns, show='headings')
+        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=forecast_tree.yview)
+        forecast_tree.configure(yscrollcommand=vsb.set)
+        for col, width in zip(columns, (200, 100, 80, 100, 110, 110, 140)):
+            forecast_tree.heading(col, text=col)
+            forecast_tree.column(col, width=width, anchor='center')
+        forecast_tree.grid(row=0, column=0, sticky='nsew')
+        vsb.grid(row=0, column=1, sticky='ns')
+        table_frame.grid_rowconfigure(0, weight=1)
+        table_frame.grid_columnconfigure(0, weight=1)
+        forecast_tree.tag_configure('at_risk', background='#ffcccc')
+        forecast_tree.tag_configure('reorder', background='#fff3cd')
+        
+        for row in forecast:
+            if row['at_risk']:
+                status, tag = "🔴 STOCKOUT RISK", 'at_risk'
+            elif row['quantity'] <= row['reorder_point']:
+                status, tag = "🟡 REORDER", 'reorder'
+            else:
+                status, tag = "🟢 OK", ''
+            cover = "∞" if row['days_of_cover'] == float('inf') else f"{row['days_of_cover']:.1f}"
+            forecast_tree.insert('', 'end', values=(
+                row['name'], row['sku'], row['quantity'], f"{row['daily_usage']:.2f}",
+                cover, row['reorder_point'], status
+            ), tags=(tag,))
 
 
 if __name__ == '__main__':
@@ -1,9 +1,15 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
-import mysql.connector
 from mysql.connector import Error
-import csv
-from datetime import datetime
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime, timedelta
+from inventory_core import (
+    ItemStore, MySQLBackend, now_timestamp, stock_level, search_key, search_matches, forecast_reorder,
+    FORECAST_WINDOW_DAYS, LEAD_TIME_DAYS, NUMPY_AVAILABLE, POOL_SIZE, SEARCH_DEBOUNCE_MS, SEARCH_LIMIT
+)
 
 # Optional: charting
 try:
@@ -30,13 +36,22 @@ class StockMonitorApp:
             "password": "kathmandu5**",   # keep secure in production
             "database": "stock_db"
         }
+        # pooled connections shared by every DB call (STOCK_DB_POOL_SIZE overrides)
+        self.pool_size = POOL_SIZE
 
         # sorting state
         self.sort_reverse = {}
+        # pending search-as-you-type run (root.after id)
+        self.search_job = None
+
+        # stock_items + movement ledger (stock_movements + snapshots)
+        self.backend = MySQLBackend(self.db_config, pool_size=self.pool_size)
+        self.ledger = self.backend.ledger
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
         # load DB + items
         self.init_db()
-        self.items = self.load_data()
+        self.items = ItemStore(self.load_data(), search_index=True)
 
         # UI
         self.create_widgets()
@@ -45,116 +60,33 @@ class StockMonitorApp:
         self.low_stock_popup_once()
 
     # ---------- DATABASE ----------
-    def get_connection(self):
+    def init_db(self):
         try:
-            conn = mysql.connector.connect(**self.db_config)
-            return conn
+            self.backend.init_db()
         except Error as e:
             messagebox.showerror("Database Error", f"Error connecting to MySQL:\n{e}")
-            return None
-
-    def init_db(self):
-        conn = self.get_connection()
-        if not conn:
-            return
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS stock_items (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                sku VARCHAR(100) UNIQUE NOT NULL,
-                quantity INT,
-                min_level INT,
-                category VARCHAR(255) NOT NULL,
-                subcategory VARCHAR(255) NOT NULL,
-                unit VARCHAR(50),
-                price DECIMAL(10,2),
-                description TEXT,
-                is_service BOOLEAN DEFAULT 0,
-                duration VARCHAR(100),
-                service_cost DECIMAL(10,2)
-            )
-        """)
-        conn.commit()
-        cursor.close()
-        conn.close()
 
     def load_data(self):
-        conn = self.get_connection()
-        if not conn:
+        try:
+            return self.backend.load_items()
+        except Error as e:
+            messagebox.showerror("Database Error", f"Error connecting to MySQL:\n{e}")
             return []
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT name, sku, quantity, min_level, category, subcategory, unit,
-                   price, description, is_service, duration, service_cost
-            FROM stock_items
-        """)
-        rows = cursor.fetchall()
-        conn.close()
-        items = []
-        for r in rows:
-            items.append({
-                "name": r[0],
-                "sku": r[1],
-                "quantity": int(r[2]) if r[2] is not None else None,
-                "min_level": int(r[3]) if r[3] is not None else None,
-                "category": r[4],
-                "subcategory": r[5],
-                "unit": r[6],
-                "price": float(r[7]) if r[7] is not None else 0.0,
-                "description": r[8] or "",
-                "is_service": bool(r[9]),
-                "duration": r[10] or "",
-                "service_cost": float(r[11]) if r[11] is not None else 0.0,
-            })
-        return items
-
-    def save_to_db(self, item, update=False, original_sku=None):
-        conn = self.get_connection()
-        if not conn:
-            return False
-        cursor = conn.cursor()
+
+    def save_to_db(self, item, update=False, original_sku=None, reason=None, note=""):
+        # quantity changes are logged to stock_movements in the same transaction
         try:
-            if update:
-                # Don't allow SKU change on update for simplicity
-                cursor.execute("""
-                    UPDATE stock_items
-                    SET name=%s, quantity=%s, min_level=%s, category=%s, subcategory=%s,
-                        unit=%s, price=%s, description=%s, is_service=%s, duration=%s, service_cost=%s
-                    WHERE sku=%s
-                """, (
-                    item["name"], item["quantity"], item["min_level"], item["category"],
-                    item["subcategory"], item["unit"], item["price"], item["description"],
-                    int(item["is_service"]), item["duration"], item["service_cost"], item["sku"]
-                ))
-            else:
-                cursor.execute("""
-                    INSERT INTO stock_items (name, sku, quantity, min_level, category, subcategory,
-                                             unit, price, description, is_service, duration, service_cost)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    item["name"], item["sku"], item["quantity"], item["min_level"],
-                    item["category"], item["subcategory"], item["unit"], item["price"],
-                    item["description"], int(item["is_service"]), item["duration"], item["service_cost"]
-                ))
-            conn.commit()
+            self.backend.save_item(item, update=update, original_sku=original_sku, reason=reason, note=note)
             return True
         except Error as e:
             messagebox.showerror("DB Error", f"Database operation failed: {e}")
             return False
-        finally:
-            cursor.close()
-            conn.close()
 
     def delete_from_db(self, sku):
-        conn = self.get_connection()
-        if not conn:
-            return
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM stock_items WHERE sku=%s", (sku,))
-        conn.commit()
-        cursor.close()
-        conn.close()
+        try:
+            self.backend.delete_item(sku)
+        except Error as e:
+            messagebox.showerror("DB Error", f"Database operation failed: {e}")
 
     # ---------- GUI ----------
     def create_widgets(self):
@@ -179,9 +111,12 @@ class StockMonitorApp:
         self.critical_label = self.create_stat_card(stats_frame, "Critical", "0", "#e74c3c", 2)
         self.healthy_label = self.create_stat_card(stats_frame, "Healthy", "0", "#27ae60", 3)
 
-        # Alerts
+        # Alerts (banner is shown/hidden by update_stats, never rebuilt)
         self.alert_frame = tk.Frame(self.root, bg=self.light_bg)
         self.alert_frame.pack(fill="x", padx=10, pady=5)
+        self.alert_banner = tk.Frame(self.alert_frame, bg="#e74c3c", relief="raised", bd=2)
+        self.alert_label = tk.Label(self.alert_banner, font=("Arial", 12, "bold"), bg="#e74c3c", fg="white")
+        self.alert_label.pack(pady=10)
 
         # Controls
         control_frame = tk.Frame(self.root, bg=self.light_bg)
@@ -207,16 +142,21 @@ class StockMonitorApp:
         # Search
         tk.Label(control_frame, text="Search:", bg=self.light_bg).pack(side="left", padx=8)
         self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
         tk.Entry(control_frame, textvariable=self.search_var, width=20).pack(side="left", padx=5)
         tk.Button(control_frame, text="🔍 Go", command=self.search_items, bg="#8e44ad", fg="white").pack(side="left", padx=5)
         tk.Button(control_frame, text="Reset", command=self.reset_filters, bg="#95a5a6", fg="white").pack(side="left", padx=5)
+        self.search_status = tk.Label(control_frame, text="", bg=self.light_bg, fg="#7f8c8d")
+        self.search_status.pack(side="left", padx=5)
 
         # Right-side buttons
         tk.Button(control_frame, text="➕ Add Item/Service", command=self.add_item, bg="#3498db", fg="white").pack(side="right", padx=5)
         tk.Button(control_frame, text="⬇ Export CSV", command=self.export_csv, bg="#2ecc71", fg="white").pack(side="right", padx=5)
         tk.Button(control_frame, text="⬆ Import CSV", command=self.import_csv, bg="#f39c12", fg="white").pack(side="right", padx=5)
         tk.Button(control_frame, text="📊 Chart", command=self.show_chart, bg="#34495e", fg="white").pack(side="right", padx=5)
+        tk.Button(control_frame, text="📈 Forecast", command=self.show_forecast, bg="#16a085", fg="white").pack(side="right", padx=5)
         tk.Button(control_frame, text="Dark Mode", command=self.toggle_theme, bg="#7f8c8d", fg="white").pack(side="right", padx=5)
+        tk.Button(control_frame, text="DB Pool", command=self.show_pool_stats, bg="#7f8c8d", fg="white").pack(side="right", padx=5)
 
         # Table frame
         table_frame = tk.Frame(self.root, bg="white")
@@ -281,87 +221,126 @@ class StockMonitorApp:
             return "GOOD", "good"
 
     def update_category_filter(self):
-        cats = sorted({i["category"] for i in self.items if i.get("category")})
+        cats = self.items.categories()
         vals = ["All"] + cats
         self.category_cb['values'] = vals
         if self.category_var.get() not in vals:
             self.category_var.set("All")
 
     def get_filtered_items(self):
-        f = self.filter_var.get()
-        items = list(self.items)  # copy
-        # category filter
+        # category and stock filters come from the store's precomputed buckets
         cat = self.category_var.get()
-        if cat and cat != "All":
-            items = [i for i in items if i["category"] == cat]
+        return self.items.filter(
+            category=cat if cat and cat != "All" else None,
+            level=self.filter_var.get(),
+            text=self.search_var.get(),
+        )
 
-        # search filter
+    def matches_filter(self, item):
+        """Same rules as get_filtered_items, for a single item"""
+        cat = self.category_var.get()
+        if cat and cat != "All" and item["category"] != cat:
+            return False
         search_text = self.search_var.get().lower().strip()
-        if search_text:
-            items = [i for i in items if (search_text in i["name"].lower() or search_text in i["sku"].lower() or search_text in (i.get("category") or "").lower())]
-
-        # stock filters
+        if search_text and not search_matches(search_key(item), search_text):
+            return False
+        f = self.filter_var.get()
         if f == "low":
-            return [i for i in items if not i["is_service"] and i["quantity"] is not None and i["min_level"] is not None and i["quantity"] <= i["min_level"]]
+            return stock_level(item) != "healthy"
         elif f == "critical":
-            return [i for i in items if not i["is_service"] and i["quantity"] is not None and i["min_level"] is not None and i["quantity"] <= i["min_level"] * 0.5]
-        return items
+            return stock_level(item) == "critical"
+        return True
+
+    def update_stats(self):
+        # counters are maintained by the item store, so this never scans the items
+        self.total_label.config(text=str(self.items.stats.total))
+        self.low_label.config(text=str(self.items.stats.low))
+        self.critical_label.config(text=str(self.items.stats.critical))
+        self.healthy_label.config(text=str(self.items.stats.healthy))
+
+        if self.items.stats.critical > 0:
+            self.alert_label.config(text=f"⚠️ CRITICAL ALERT: {self.items.stats.critical} item(s) at critical levels!")
+            self.alert_banner.pack(fill="x", pady=5)
+        else:
+            self.alert_banner.pack_forget()
+
+    def item_row(self, item):
+        status, tag = self.get_stock_status(item)
+        if item["is_service"]:
+            percentage = 100
+        else:
+            if item["min_level"] and item["min_level"] > 0 and item["quantity"] is not None:
+                percentage = min((item["quantity"] / item["min_level"]) * 100, 100)
+            else:
+                percentage = 0
+        values = (
+            status, item["name"], item["sku"], item["category"],
+            item["subcategory"], item["quantity"] if not item["is_service"] else "",
+            item["min_level"] if not item["is_service"] else "",
+            item["unit"] if not item["is_service"] else "",
+            f"${item['price']:.2f}" if item["price"] else "",
+            f"{percentage:.0f}%" if not item["is_service"] else "",
+        )
+        return values, tag
+
+    def show_item(self, item):
+        # insert, update or hide a single row (rows are keyed by SKU)
+        sku = item["sku"]
+        if not self.matches_filter(item):
+            if self.tree.exists(sku):
+                self.tree.delete(sku)
+            return
+        values, tag = self.item_row(item)
+        if self.tree.exists(sku):
+            self.tree.item(sku, values=values, tags=(tag,))
+        else:
+            self.tree.insert("", "end", iid=sku, values=values, tags=(tag,))
+        if item["category"] and item["category"] not in self.category_cb["values"]:
+            self.update_category_filter()
 
     def refresh_display(self):
-        # clear tree
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-
-        total = len(self.items)
-        low = len([i for i in self.items if not i["is_service"] and i["quantity"] is not None and i["min_level"] is not None and i["quantity"] <= i["min_level"]])
-        critical = len([i for i in self.items if not i["is_service"] and i["quantity"] is not None and i["min_level"] is not None and i["quantity"] <= i["min_level"] * 0.5])
-        healthy = total - low
-
-        self.total_label.config(text=str(total))
-        self.low_label.config(text=str(low))
-        self.critical_label.config(text=str(critical))
-        self.healthy_label.config(text=str(healthy))
-
-        # alerts
-        for w in self.alert_frame.winfo_children():
-            w.destroy()
-        if critical > 0:
-            alert = tk.Frame(self.alert_frame, bg="#e74c3c", relief="raised", bd=2)
-            alert.pack(fill="x", pady=5)
-            tk.Label(
-                alert,
-                text=f"⚠️ CRITICAL ALERT: {critical} item(s) at critical levels!",
-                font=("Arial", 12, "bold"), bg="#e74c3c", fg="white"
-            ).pack(pady=10)
+        # full rebuild for filter/sort changes; single-item edits go through show_item
+        start = time.perf_counter()
+        self.tree.delete(*self.tree.get_children())
+        self.update_stats()
+
+        text = self.search_var.get().strip()
+        if text:
+            # search box: only the best SEARCH_LIMIT matches from the trigram index, ranked
+            cat = self.category_var.get()
+            items, total, exact = self.items.search(
+                text, category=cat if cat and cat != "All" else None,
+                level=self.filter_var.get(), limit=SEARCH_LIMIT,
+            )
+        else:
+            items = self.get_filtered_items()
 
         # populate tree from filtered items
-        for item in self.get_filtered_items():
-            status, tag = self.get_stock_status(item)
-            if item["is_service"]:
-                percentage = 100
-            else:
-                if item["min_level"] and item["min_level"] > 0 and item["quantity"] is not None:
-                    percentage = min((item["quantity"] / item["min_level"]) * 100, 100)
-                else:
-                    percentage = 0
-            self.tree.insert(
-                "", "end",
-                values=(
-                    status, item["name"], item["sku"], item["category"],
-                    item["subcategory"], item["quantity"] if not item["is_service"] else "",
-                    item["min_level"] if not item["is_service"] else "",
-                    item["unit"] if not item["is_service"] else "",
-                    f"${item['price']:.2f}" if item["price"] else "",
-                    f"{percentage:.0f}%" if not item["is_service"] else "",
-                ),
-                tags=(tag,)
-            )
+        for item in items:
+            values, tag = self.item_row(item)
+            self.tree.insert("", "end", iid=item["sku"], values=values, tags=(tag,))
+
+        if text:
+            elapsed = (time.perf_counter() - start) * 1000
+            count = f"{total:,}" if exact else f"about {total:,}"
+            self.search_status.config(text=f"Showing {len(items)} of {count} matches ({elapsed:.1f} ms)")
+        else:
+            self.search_status.config(text="")
 
         # refresh category filter choices
         self.update_category_filter()
 
     # ---------- Search / Reset ----------
+    def schedule_search(self):
+        # search as you type: wait for a pause in typing, then refresh once
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(SEARCH_DEBOUNCE_MS, self.search_items)
+
     def search_items(self):
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+            self.search_job = None
         self.refresh_display()
 
     def reset_filters(self):
@@ -372,66 +351,115 @@ class StockMonitorApp:
 
     # ---------- Export / Import ----------
     def export_csv(self):
-        filename = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV files", "*.csv")], title="Save CSV")
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv", title="Save CSV",
+            filetypes=[("CSV files", "*.csv"), ("Compressed CSV", "*.csv.gz")]
+        )
         if not filename:
             return
-        try:
-            with open(filename, "w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["Name", "SKU", "Category", "Subcategory", "Quantity", "Min Level", "Unit", "Price", "Description", "Is Service", "Duration", "Service Cost"])
-                for item in self.items:
-                    writer.writerow([
-                        item["name"], item["sku"], item["category"], item["subcategory"],
-                        item["quantity"], item["min_level"], item["unit"], item["price"],
-                        item["description"], int(item["is_service"]), item["duration"], item["service_cost"]
-                    ])
-            messagebox.showinfo("Exported", f"CSV exported to {filename}")
-        except Exception as e:
-            messagebox.showerror("Export Error", str(e))
+        cancel = threading.Event()
+
+        def job(report):
+            # streams from the database, so the file is current even if self.items is not
+            return self.backend.export_items(
+                filename, cancel=cancel,
+                progress=lambda st: report(f"Exported {st['rows']:,} of {st['total']:,} items...", st["fraction"]),
+            )
+
+        def done(stats):
+            if stats["cancelled"]:
+                messagebox.showinfo("Export Cancelled", "Export cancelled; no file was written.")
+            else:
+                messagebox.showinfo("Exported", f"{stats['rows']:,} items exported to {filename}")
+
+        self.run_background_job("Exporting CSV", job, done, cancel=cancel)
 
     def import_csv(self):
         fname = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")], title="Select CSV to import")
         if not fname:
             return
-        try:
-            with open(fname, newline='', encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                added = 0
-                failed = 0
-                for row in reader:
-                    # basic mapping with safe parsing
-                    sku = row.get("SKU") or row.get("sku") or row.get("Sku")
-                    if not sku:
-                        failed += 1
-                        continue
-                    new_item = {
-                        "name": row.get("Name") or row.get("name") or "",
-                        "sku": sku,
-                        "quantity": int(row.get("Quantity")) if row.get("Quantity") else (None if (row.get("Is Service") and int(row.get("Is Service"))==1) else 0),
-                        "min_level": int(row.get("Min Level")) if row.get("Min Level") else (None if (row.get("Is Service") and int(row.get("Is Service"))==1) else 0),
-                        "category": row.get("Category") or row.get("category") or "Uncategorized",
-                        "subcategory": row.get("Subcategory") or row.get("subcategory") or "",
-                        "unit": row.get("Unit") or "",
-                        "price": float(row.get("Price")) if row.get("Price") else 0.0,
-                        "description": row.get("Description") or "",
-                        "is_service": bool(int(row.get("Is Service"))) if row.get("Is Service") else False,
-                        "duration": row.get("Duration") or "",
-                        "service_cost": float(row.get("Service Cost")) if row.get("Service Cost") else 0.0
-                    }
-                    # skip if SKU already exists
-                    if any(i["sku"] == new_item["sku"] for i in self.items):
-                        failed += 1
+        upsert = messagebox.askyesnocancel(
+            "Import CSV", "Update items whose SKU already exists?\n\nYes = update them, No = skip them"
+        )
+        if upsert is None:
+            return
+        error_path = os.path.splitext(fname)[0] + ".errors.csv"
+
+        def job(report):
+            # validation, dedupe and the chunked writes all stay off the Tk thread
+            stats = self.backend.import_items(
+                fname, upsert=upsert, error_path=error_path,
+                progress=lambda st: report(
+                    f"Imported {st['imported'] + st['updated']:,} of {st['rows']:,} rows...", st["fraction"]
+                ),
+            )
+            report("Reloading items...", 1.0)
+            return stats, ItemStore(self.backend.load_items(), search_index=True)
+
+        def done(result):
+            stats, items = result
+            self.items = items
+            self.refresh_display()
+            msg = (f"Added: {stats['imported']}, Updated: {stats['updated']}, "
+                   f"Duplicates skipped: {stats['duplicates']}, Invalid: {stats['invalid']}")
+            if stats["error_report"]:
+                msg += f"\n\nRejected rows were written to:\n{stats['error_report']}"
+            messagebox.showinfo("Import Result", msg)
+
+        self.run_background_job("Importing CSV", job, done)
+
+    def run_background_job(self, title, job, on_complete, cancel=None):
+        """Run job(report) on a worker thread; report(text, fraction) drives the progress bar
+
+        Pass a threading.Event as cancel to get a Cancel button that sets it.
+        """
+        job_window = tk.Toplevel(self.root)
+        job_window.title(title)
+        job_window.geometry("380x180")
+        job_window.transient(self.root)
+        job_window.grab_set()
+        job_window.protocol("WM_DELETE_WINDOW", lambda: None)
+
+        status_label = tk.Label(job_window, text="Starting...", justify="left")
+        status_label.pack(pady=(20, 10))
+        progress_bar = ttk.Progressbar(job_window, mode="determinate", maximum=100, length=300)
+        progress_bar.pack(pady=10)
+        if cancel is not None:
+            cancel_button = tk.Button(job_window, text="Cancel", bg="#95a5a6", fg="white",
+                                      command=lambda: (cancel.set(), cancel_button.config(state="disabled")))
+            cancel_button.pack(pady=5)
+
+        # Tk is not thread-safe, so the worker only talks to the UI through this queue
+        events = queue.Queue()
+
+        def worker():
+            try:
+                events.put(("done", job(lambda text, fraction=None: events.put(("progress", (text, fraction))))))
+            except Exception as e:
+                events.put(("error", e))
+
+        def poll():
+            try:
+                while True:
+                    kind, payload = events.get_nowait()
+                    if kind == "progress":
+                        text, fraction = payload
+                        status_label.config(text=text)
+                        if fraction is not None:
+                            progress_bar["value"] = fraction * 100
                         continue
-                    ok = self.save_to_db(new_item, update=False)
-                    if ok:
-                        self.items.append(new_item)
-                        added += 1
+                    job_window.destroy()
+                    if kind == "done":
+                        on_complete(payload)
                     else:
-                        failed += 1
-                self.refresh_display()
-                messagebox.showinfo("Import Result", f"Added: {added}, Failed/skipped: {failed}")
-        except Exception as e:
-            messagebox.showerror("Import Error", str(e))
+                        messagebox.showerror("Error", f"{title} failed:\n{payload}")
+                    return
+            except queue.Empty:
+                pass
+            self.root.after(100, poll)
+
+        threading.Thread(target=worker, daemon=True).start()
+        self.root.after(100, poll)
 
     # ---------- Item Editing ----------
     def add_item(self):
@@ -442,9 +470,8 @@ class StockMonitorApp:
         if not sel:
             messagebox.showwarning("No Selection", "Select an item to edit")
             return
-        vals = self.tree.item(sel[0])["values"]
-        sku_val = vals[2]
-        itm = next((i for i in self.items if i["sku"] == sku_val), None)
+        sku_val = sel[0]  # rows are keyed by SKU
+        itm = self.items.get(sku_val)
         if itm:
             self.open_item_dialog(itm)
 
@@ -454,20 +481,20 @@ class StockMonitorApp:
             messagebox.showwarning("No Selection", "Select an item to delete")
             return
         if messagebox.askyesno("Confirm", "Are you sure you want to delete this item?"):
-            vals = self.tree.item(sel[0])["values"]
-            sku = vals[2]
+            sku = sel[0]
             self.delete_from_db(sku)
-            self.items = [i for i in self.items if i["sku"] != sku]
-            self.refresh_display()
+            if sku in self.items:
+                self.items.remove(sku)
+            self.tree.delete(sku)
+            self.update_stats()
 
     def refill_stock(self):
         sel = self.tree.selection()
         if not sel:
             messagebox.showwarning("No Selection", "Select an item to refill")
             return
-        vals = self.tree.item(sel[0])["values"]
-        sku = vals[2]
-        item = next((i for i in self.items if i["sku"] == sku), None)
+        sku = sel[0]
+        item = self.items.get(sku)
         if not item:
             messagebox.showwarning("Error", "Item not found")
             return
@@ -476,10 +503,138 @@ class StockMonitorApp:
             return
         qty = simpledialog.askinteger("Refill Stock", "Enter quantity to add:", minvalue=1)
         if qty:
-            item["quantity"] = (item["quantity"] or 0) + qty
-            ok = self.save_to_db(item, update=True)
+            refilled = dict(item, quantity=(item["quantity"] or 0) + qty)
+            ok = self.save_to_db(refilled, update=True, reason="receipt")
             if ok:
-                self.refresh_display()
+                self.items.update(sku, refilled)
+                self.show_item(refilled)
+                self.update_stats()
+
+    def record_sale(self):
+        sel = self.tree.selection()
+        if not sel:
+            messagebox.showwarning("No Selection", "Select an item to record a sale")
+            return
+        sku = sel[0]
+        item = self.items.get(sku)
+        if not item or item["is_service"]:
+            messagebox.showwarning("Error", "Sales can only be recorded for stocked items")
+            return
+        on_hand = item["quantity"] or 0
+        if on_hand <= 0:
+            messagebox.showwarning("Error", "Item is out of stock")
+            return
+        qty = simpledialog.askinteger("Record Sale", f"Quantity sold (on hand: {on_hand}):", minvalue=1, maxvalue=on_hand)
+        if qty:
+            sold = dict(item, quantity=on_hand - qty)
+            if self.save_to_db(sold, update=True, reason="sale"):
+                self.items.update(sku, sold)
+                self.show_item(sold)
+                self.update_stats()
+
+    def show_history(self):
+        sel = self.tree.selection()
+        if not sel:
+            messagebox.showwarning("No Selection", "Select an item to view its history")
+            return
+        sku = sel[0]
+
+        window = tk.Toplevel(self.root)
+        window.title(f"Movement History - {sku}")
+        window.geometry("700x450")
+        window.configure(bg="#ecf0f1")
+        window.transient(self.root)
+
+        # point-in-time lookup: latest snapshot + the movements after it
+        query_frame = tk.Frame(window, bg="#ecf0f1")
+        query_frame.pack(fill="x", padx=10, pady=10)
+        tk.Label(query_frame, text="Stock at:", bg="#ecf0f1").pack(side="left", padx=5)
+        when_var = tk.StringVar(value=now_timestamp())
+        tk.Entry(query_frame, textvariable=when_var, width=22).pack(side="left", padx=5)
+        result_label = tk.Label(query_frame, text="", bg="#ecf0f1", font=("Arial", 10, "bold"))
+
+        def lookup():
+            try:
+                result_label.config(text=f"{self.ledger.stock_at(sku, when_var.get().strip())} units")
+            except Error as e:
+                messagebox.showerror("DB Error", str(e), parent=window)
+
+        tk.Button(query_frame, text="Show", command=lookup, bg="#3498db", fg="white").pack(side="left", padx=5)
+        result_label.pack(side="left", padx=10)
+
+        table_frame = tk.Frame(window, bg="white")
+        table_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        columns = ("Date", "Type", "Change", "Quantity After", "Note")
+        history_tree = ttk.Treeview(table_frame, columns=columns, show="headings")
+        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=history_tree.yview)
+        history_tree.configure(yscrollcommand=vsb.set)
+        for col, w in zip(columns, [150, 100, 80, 110, 200]):
+            history_tree.heading(col, text=col)
+            history_tree.column(col, width=w, anchor="center")
+        history_tree.grid(row=0, column=0, sticky="nsew")
+        vsb.grid(row=0, column=1, sticky="ns")
+        table_frame.grid_rowconfigure(0, weight=1)
+        table_frame.grid_columnconfigure(0, weight=1)
+
+        try:
+            rows = self.ledger.history(sku)
+        except Error as e:
+            messagebox.showerror("DB Error", str(e), parent=window)
+            return
+        for created_at, reason, delta, quantity_after, note in rows:
+            history_tree.insert("", "end", values=(created_at, reason.title(), f"{delta:+d}", quantity_after, note or ""))
+
+    def show_forecast(self):
+        if not NUMPY_AVAILABLE:
+            messagebox.showwarning("Missing library", "numpy not available. Install numpy to run the forecast.")
+            return
+        today = date.today()
+        since = (today - timedelta(days=FORECAST_WINDOW_DAYS - 1)).isoformat()
+        try:
+            forecast = forecast_reorder(self.items, self.ledger.daily_consumption(since), as_of=today)
+        except Error as e:
+            messagebox.showerror("DB Error", str(e))
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title("Reorder Forecast")
+        window.geometry("900x500")
+        window.configure(bg="#ecf0f1")
+        window.transient(self.root)
+
+        at_risk = sum(1 for row in forecast if row["at_risk"])
+        tk.Label(window, text=f"{at_risk} item(s) will run out within the {LEAD_TIME_DAYS}-day lead time "
+                              f"(usage smoothed over the last {FORECAST_WINDOW_DAYS} days)",
+                 bg="#ecf0f1", font=("Arial", 11, "bold")).pack(pady=10)
+
+        table_frame = tk.Frame(window, bg="white")
+        table_frame.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        columns = ("Item Name", "SKU", "On Hand", "Daily Usage", "Days of Cover", "Reorder Point", "Status")
+        forecast_tree = ttk.Treeview(table_frame, columns=columns, show="headings")
+        vsb = ttk.Scrollbar(table_frame, orient="vertical", command=forecast_tree.yview)
+        forecast_tree.configure(yscrollcommand=vsb.set)
+        for col, w in zip(columns, [200, 100, 80, 100, 110, 110, 140]):
+            forecast_tree.heading(col, text=col)
+            forecast_tree.column(col, width=w, anchor="center")
+        forecast_tree.grid(row=0, column=0, sticky="nsew")
+        vsb.grid(row=0, column=1, sticky="ns")
+        table_frame.grid_rowconfigure(0, weight=1)
+        table_frame.grid_columnconfigure(0, weight=1)
+        forecast_tree.tag_configure("at_risk", background="#ffcccc")
+        forecast_tree.tag_configure("reorder", background="#fff3cd")
+
+        for row in forecast:
+            if row["at_risk"]:
+                status, tag = "🔴 STOCKOUT RISK", "at_risk"
+            elif row["quantity"] <= row["reorder_point"]:
+                status, tag = "🟡 REORDER", "reorder"
+            else:
+                status, tag = "🟢 OK", ""
+            cover = "∞" if row["days_of_cover"] == float("inf") else f"{row['days_of_cover']:.1f}"
+            forecast_tree.insert("", "end", values=(
+                row["name"], row["sku"], row["quantity"], f"{row['daily_usage']:.2f}",
+                cover, row["reorder_point"], status
+            ), tags=(tag,))
 
     def open_item_dialog(self, item=None):
         dialog = tk.Toplevel(self.root)
@@ -538,7 +693,7 @@ class StockMonitorApp:
             if not code:
                 return
             # if SKU exists, load that item into fields for quick edit
-            found = next((it for it in self.items if it["sku"] == code), None)
+            found = self.items.get(code)
             if found:
                 # populate fields with found item (use string form)
                 for idx, key in enumerate(keys):
@@ -587,20 +742,19 @@ class StockMonitorApp:
                         messagebox.showerror("Error", "Changing SKU is not allowed on edit")
                         return
                     ok = self.save_to_db(new_item, update=True)
-                    if ok:
-                        for i, x in enumerate(self.items):
-                            if x["sku"] == item["sku"]:
-                                self.items[i] = new_item
-                                break
+                    if ok and sku in self.items:
+                        self.items.update(sku, new_item)
                 else:
-                    if any(i["sku"] == sku for i in self.items):
+                    if sku in self.items:
                         messagebox.showerror("Error", "SKU already exists")
                         return
                     ok = self.save_to_db(new_item, update=False)
                     if ok:
-                        self.items.append(new_item)
+                        self.items.add(new_item)
 
-                self.refresh_display()
+                if ok:
+                    self.show_item(new_item)
+                    self.update_stats()
                 dialog.destroy()
             except ValueError:
                 messagebox.showerror("Error", "Enter valid numbers for quantity, min level, price, or service cost")
@@ -624,6 +778,8 @@ class StockMonitorApp:
         menu.add_command(label="Edit", command=self.edit_item)
         menu.add_command(label="Delete", command=self.delete_item)
         menu.add_command(label="Refill Stock", command=self.refill_stock)
+        menu.add_command(label="Record Sale", command=self.record_sale)
+        menu.add_command(label="Movement History", command=self.show_history)
         menu.post(event.x_root, event.y_root)
 
     # ---------- Sorting ----------
@@ -676,9 +832,24 @@ class StockMonitorApp:
     # ---------- Misc ----------
     def low_stock_popup_once(self):
         # show a popup once at startup if any low stock items
-        low_items = [i for i in self.items if not i["is_service"] and i["quantity"] is not None and i["min_level"] is not None and i["quantity"] <= i["min_level"]]
-        if low_items:
-            messagebox.showwarning("Low Stock Alert", f"{len(low_items)} item(s) are at or below min level. Check dashboard.")
+        if self.items.stats.low:
+            messagebox.showwarning("Low Stock Alert", f"{self.items.stats.low} item(s) are at or below min level. Check dashboard.")
+
+    def show_pool_stats(self):
+        stats = self.backend.pool_stats()
+        if not stats:
+            messagebox.showinfo("DB Pool", "Connection pooling is off (pool size 0).")
+            return
+        messagebox.showinfo("DB Pool", "\n".join([
+            f"Connections: {stats['in_use']} in use, {stats['idle']} idle, {stats['open']}/{stats['size']} open",
+            f"Checkouts: {stats['reused']} reused, {stats['created']} new, {stats['waits']} waited, {stats['timeouts']} timed out",
+            f"Health checks: {stats['pings']} (dropped {stats['dropped']})",
+            f"Prepared statements: {stats['statements_prepared']} prepared, {stats['statements_reused']} reused",
+        ]))
+
+    def on_close(self):
+        self.backend.close()
+        self.root.destroy()
 
     def toggle_theme(self):
         # simple light/dark toggle (changes bg and some widget colors)
@@ -0,0 +1,152 @@
+"""Run the same stock workloads against each inventory_core backend and compare them.
+
+    python inventory_bench.py --items 5000 --refills 2000
+    python inventory_bench.py --backends memory sqlite mysql --mysql-password ...
+
+Workloads: bulk import (import_items from a CSV, as the Import CSV button does), load
+(load_items into an ItemStore), filtered view (category / level / search queries)
+and refill storm (receipts against random SKUs). The SQL backends use a connection
+pool of --pool-size (0 = a new connection per call). SQLite also serves as the local
+stand-in for the pool. The MySQL run drops and recreates the stock tables in
+--mysql-database, so point it at a scratch database. Any MySQL-compatible server
+will do (MariaDB, a local container).
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from inventory_core import POOL_SIZE, ItemStore, MemoryBackend, MySQLBackend, SQLiteBackend, write_items_csv
+
+CATEGORIES = ["Electronics", "Grocery", "Clothing", "Hardware", "Toys", "Beauty", "Office", "Garden"]
+UNITS = ["pcs", "kg", "ltr", "box"]
+WORKLOADS = ("bulk import", "load", "filtered view", "refill storm")
+
+
+def make_items(count, seed):
+    rng = random.Random(seed)
+    items = []
+    for n in range(count):
+        is_service = rng.random() < 0.05
+        min_level = rng.randint(5, 50)
+        items.append({
+            "name": f"Item {n} {rng.choice(['Blue', 'Red', 'Large', 'Small', 'Pro'])}",
+            "sku": f"SKU{n:07d}",
+            "quantity": None if is_service else rng.randint(0, min_level * 3),
+            "min_level": None if is_service else min_level,
+            "category": rng.choice(CATEGORIES),
+            "subcategory": "",
+            "unit": "" if is_service else rng.choice(UNITS),
+            "price": round(rng.uniform(1, 500), 2),
+            "description": "",
+            "is_service": is_service,
+            "duration": "1h" if is_service else "",
+            "service_cost": 25.0 if is_service else 0.0,
+        })
+    return items
+
+
+def filter_queries():
+    queries = [(None, level, "") for level in ("all", "low", "critical")]
+    queries += [(category, "low", "") for category in CATEGORIES]
+    queries += [(None, "all", text) for text in ("blue", "sku00001", "pro")]
+    return queries
+
+
+def run_workloads(backend, csv_path, refills, seed):
+    """{workload: seconds} plus a checksum of the final quantities (equal across backends)."""
+    timings = {}
+    backend.init_db()
+
+    start = time.perf_counter()
+    backend.import_items(csv_path)
+    timings["bulk import"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = ItemStore(backend.load_items())
+    timings["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for category, level, text in filter_queries():
+        backend.filter_items(category, level, text)
+    timings["filtered view"] = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    stocked = [item["sku"] for item in store if not item["is_service"]]
+    start = time.perf_counter()
+    for _ in range(refills):
+        sku = rng.choice(stocked)
+        refilled = dict(store.get(sku))
+        refilled["quantity"] += rng.randint(1, 20)
+        backend.save_item(refilled, update=True, reason="receipt")
+        store.update(sku, refilled)
+    timings["refill storm"] = time.perf_counter() - start
+
+    checksum = sum(item["quantity"] or 0 for item in backend.load_items())
+    return timings, checksum
+
+
+def reset_mysql(backend):
+    conn = backend.connect()
+    cursor = conn.cursor()
+    for table in ("stock_items", "stock_movements", "stock_snapshots", "stock_snapshot_items"):
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    conn.commit()
+    cursor.close()
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the inventory storage backends")
+    parser.add_argument("--backends", nargs="+", choices=["memory", "sqlite", "mysql"], default=["memory", "sqlite"])
+    parser.add_argument("--items", type=int, default=5000, help="Items created by the bulk import")
+    parser.add_argument("--refills", type=int, default=2000, help="Receipts in the refill storm")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE,
+                        help="Pooled connections for the SQL backends (0 = connect per call)")
+    parser.add_argument("--mysql-host", default="localhost")
+    parser.add_argument("--mysql-user", default="stock_user")
+    parser.add_argument("--mysql-password", default=os.environ.get("STOCK_DB_PASSWORD", ""))
+    parser.add_argument("--mysql-database", default="stock_bench")
+    args = parser.parse_args(argv)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "items.csv")
+        write_items_csv(csv_path, make_items(args.items, args.seed))
+        for name in args.backends:
+            if name == "memory":
+                backend = MemoryBackend()
+            elif name == "sqlite":
+                backend = SQLiteBackend(os.path.join(tmp, "stock_bench.db"), pool_size=args.pool_size)
+            else:
+                backend = MySQLBackend({
+                    "host": args.mysql_host, "user": args.mysql_user,
+                    "password": args.mysql_password, "database": args.mysql_database,
+                }, pool_size=args.pool_size)
+                reset_mysql(backend)
+            results[name] = run_workloads(backend, csv_path, args.refills, args.seed)
+            stats = backend.pool_stats() if hasattr(backend, "pool_stats") else None
+            print(f"{name}: done" + (f" (pool: {stats})" if stats else ""))
+            if hasattr(backend, "close"):
+                backend.close()
+
+    counts = {"bulk import": args.items, "load": args.items,
+              "filtered view": len(filter_queries()), "refill storm": args.refills}
+    print()
+    print(f"{'workload':<15}" + "".join(f"{name:>20}" for name in results))
+    for workload in WORKLOADS:
+        row = f"{workload:<15}"
+        for timings, _ in results.values():
+            seconds = timings[workload]
+            row += f"{seconds * 1000:>10.1f} ms {counts[workload] / seconds:>6.0f}/s" if seconds else f"{'-':>20}"
+        print(row)
+    print(f"{'checksum':<15}" + "".join(f"{checksum:>20}" for _, checksum in results.values()))
+    if len({checksum for _, checksum in results.values()}) > 1:
+        print("WARNING: backends ended with different stock totals")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1560 @@
+"""Shared stock logic for the StockMonitorApp scripts (Inventory final.py, inventory add.py)."""
+
+import csv
+import gzip
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from datetime import date, datetime, timedelta
+
+# Optional: vectorized forecasting
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except Exception:
+    NUMPY_AVAILABLE = False
+
+# Optional: MySQL backend
+try:
+    import mysql.connector
+    MYSQL_AVAILABLE = True
+except Exception:
+    MYSQL_AVAILABLE = False
+
+
+def stock_level(item):
+    """Classify an item for the dashboard counters: 'critical', 'low' or 'healthy'.
+
+    Matches the Low Stock / Critical filters: low means quantity <= min_level and
+    critical means quantity <= half of it. Services and items without levels are healthy.
+    """
+    if item["is_service"] or item["quantity"] is None or item["min_level"] is None:
+        return "healthy"
+    if item["quantity"] <= item["min_level"] * 0.5:
+        return "critical"
+    if item["quantity"] <= item["min_level"]:
+        return "low"
+    return "healthy"
+
+
+class StockStats:
+    """Total / low / critical / healthy counters kept up to date in O(1) per item change."""
+
+    def __init__(self, items=()):
+        self.total = 0
+        self.low = 0        # includes critical items, like the Low Stock filter
+        self.critical = 0
+        for item in items:
+            self.add(item)
+
+    @property
+    def healthy(self):
+        return self.total - self.low
+
+    def _count(self, item, delta):
+        level = stock_level(item)
+        self.total += delta
+        if level != "healthy":
+            self.low += delta
+        if level == "critical":
+            self.critical += delta
+
+    def add(self, item):
+        self._count(item, 1)
+
+    def remove(self, item):
+        self._count(item, -1)
+
+    def replace(self, old_item, new_item):
+        """Account for an edit; pass a copy of the item as it was before the change."""
+        self._count(old_item, -1)
+        self._count(new_item, 1)
+
+    def as_dict(self):
+        return {"total": self.total, "low": self.low, "critical": self.critical, "healthy": self.healthy}
+
+
+# Stock-level filter -> the stock_level buckets it covers (Low Stock includes critical items)
+FILTER_LEVELS = {"all": None, "low": ("critical", "low"), "critical": ("critical",)}
+
+
+def search_key(item):
+    """Lowercased text the search box matches against (name, SKU, category)."""
+    return "\0".join((item["name"] or "", item["sku"] or "", item.get("category") or "")).lower()
+
+
+def search_matches(key, text):
+    """The search box rule: a substring from three bytes up, else the start of a field or word."""
+    if len(text.encode()) >= 3:
+        return text in key
+    return key.startswith(text) or "\0" + text in key or " " + text in key
+
+
+SEARCH_LIMIT = 200         # ranked results rendered per search-as-you-type query
+SEARCH_DEBOUNCE_MS = 150   # typing pause before the search box runs
+SEARCH_VERIFY_ALL = 20000  # up to this many trigram candidates are checked one by one for an exact count
+SEARCH_MAX_GRAMS = 4       # rarest query trigrams intersected; the text check covers the rest
+INDEX_BUILD_CHUNK = 100000 # items per vectorized pass when building the index in bulk
+
+_LEVEL_CODES = {"healthy": 0, "low": 1, "critical": 2}
+
+
+def _trigram_codes(data):
+    """Distinct trigrams of a bytes string, as 24-bit ints."""
+    return {data[i] << 16 | data[i + 1] << 8 | data[i + 2] for i in range(len(data) - 2)}
+
+
+def _one_of(values, wanted):
+    """values == any of a few wanted codes (cheaper than np.isin for short lists)."""
+    match = values == wanted[0]
+    for value in wanted[1:]:
+        match |= values == value
+    return match
+
+
+class TrigramIndex:
+    """Trigram postings over the search keys, for ranked search-as-you-type.
+
+    Each indexed item gets a slot number, and every byte trigram of its UTF-8 key maps
+    to an ascending array of slots. Keys are indexed with a leading "\0", so field
+    starts have trigrams of their own. Edits append a new slot and tombstone the old
+    one, so posting lists are only ever appended to. Once half the slots are dead the
+    index is rebuilt. Queries intersect postings with numpy and only touch the Python
+    objects of the results they return.
+    """
+
+    def __init__(self, items=(), keys=None):
+        self.postings = {}               # trigram code -> array of slots, ascending
+        self.slot_of = {}                # sku -> live slot
+        self.items = []                  # slot -> item (None once dead)
+        self.keys = []                   # slot -> search_key(item)
+        self.levels = array("b")         # slot -> _LEVEL_CODES code
+        self.categories = array("i")     # slot -> category code
+        self.category_codes = {}         # category -> code
+        self.alive = bytearray()         # slot -> 1 while live
+        self.dead = 0
+        items = list(items)
+        if items:
+            self._build(items, keys or [search_key(item) for item in items])
+
+    def __len__(self):
+        return len(self.slot_of)
+
+    def _category_code(self, category):
+        return self.category_codes.setdefault(category, len(self.category_codes))
+
+    def _append_slot(self, item, key):
+        slot = len(self.items)
+        self.slot_of[item["sku"]] = slot
+        self.items.append(item)
+        self.keys.append(key)
+        self.levels.append(_LEVEL_CODES[stock_level(item)])
+        self.categories.append(self._category_code(item["category"]))
+        self.alive.append(1)
+        return slot
+
+    def _build(self, items, keys):
+        """Index many items at once; the trigram work is done by numpy, a chunk at a time."""
+        postings = self.postings
+        for start in range(0, len(items), INDEX_BUILD_CHUNK):
+            chunk = items[start:start + INDEX_BUILD_CHUNK]
+            chunk_keys = keys[start:start + INDEX_BUILD_CHUNK]
+            first = len(self.items)
+            self.slot_of.update(zip([item["sku"] for item in chunk], range(first, first + len(chunk))))
+            self.items.extend(chunk)
+            self.keys.extend(chunk_keys)
+            self.levels.extend([_LEVEL_CODES[stock_level(item)] for item in chunk])
+            self.categories.extend([self._category_code(item["category"]) for item in chunk])
+            self.alive.extend(b"\x01" * len(chunk))
+
+            encoded = [("\0" + key).encode() for key in chunk_keys]
+            lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+            data = np.frombuffer(b"".join(encoded), dtype=np.uint8).astype(np.int64)
+            # a trigram may start anywhere except the last two bytes of its own key
+            ends = np.cumsum(lengths)
+            owner = np.repeat(np.arange(len(encoded)), lengths)
+            pos = np.flatnonzero(np.arange(len(data)) < ends[owner] - 2)
+            codes = data[pos] << 16 | data[pos + 1] << 8 | data[pos + 2]
+            pairs = np.sort(codes << 32 | (owner[pos] + first))
+            pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]]
+            codes = pairs >> 32
+            slots = (pairs & 0xFFFFFFFF).astype(np.intc)
+            bounds = np.flatnonzero(np.diff(codes)) + 1
+            for code, run in zip(codes[np.r_[0, bounds]].tolist(), np.split(slots, bounds)):
+                posting = postings.get(code)
+                if posting is None:
+                    posting = postings[code] = array("i")
+                posting.frombytes(run.tobytes())
+
+    def add(self, item, key=None):
+        key = key or search_key(item)
+        slot = self._append_slot(item, key)
+        postings = self.postings
+        for code in _trigram_codes(("\0" + key).encode()):
+            posting = postings.get(code)
+            if posting is None:
+                posting = postings[code] = array("i")
+            posting.append(slot)
+
+    def remove(self, sku):
+        slot = self.slot_of.pop(sku)
+        self.items[slot] = None
+        self.alive[slot] = 0
+        self.dead += 1
+        if self.dead > 1000 and self.dead * 2 > len(self.items):
+            live = [item for item in self.items if item is not None]
+            self.__init__(live)
+
+    def update(self, sku, new_item):
+        """Re-index an edited item; edits that keep the search key just refresh the slot."""
+        slot = self.slot_of[sku]
+        key = search_key(new_item)
+        if new_item["sku"] == sku and self.keys[slot] == key:
+            self.items[slot] = new_item
+            self.levels[slot] = _LEVEL_CODES[stock_level(new_item)]
+            self.categories[slot] = self._category_code(new_item["category"])
+            return
+        self.remove(sku)
+        self.add(new_item, key)
+
+    def _posting(self, code):
+        posting = self.postings.get(code)
+        return np.frombuffer(posting, dtype=np.intc) if posting else np.empty(0, dtype=np.intc)
+
+    def _in_posting(self, slots, posting):
+        """Mask of the slots (ascending) that also appear in posting."""
+        if not len(posting) or not len(slots):
+            return np.zeros(len(slots), dtype=bool)
+        if len(slots) * 16 < len(self.items):
+            pos = np.searchsorted(posting, slots)
+            pos[pos == len(posting)] = 0
+            return posting[pos] == slots
+        marked = np.zeros(len(self.items), dtype=bool)
+        marked[posting] = True
+        return marked[slots]
+
+    def _candidates(self, data):
+        """Ascending slots holding the rarest trigrams of data (a superset of the matches).
+
+        A list covering half the index or more barely narrows anything down, so it is left
+        to the text check on the rows actually shown.
+        """
+        lists = [self._posting(code) for code in _trigram_codes(data)]
+        lists.sort(key=len)
+        found = lists[0]
+        for posting in lists[1:SEARCH_MAX_GRAMS]:
+            if not len(found) or len(posting) * 2 >= len(self.items):
+                break
+            found = found[self._in_posting(found, posting)]
+        return found
+
+    def _restrict(self, slots, category, levels):
+        """Drop dead slots and those outside the category / stock levels."""
+        tests = []
+        if self.dead:
+            tests.append((np.frombuffer(self.alive, dtype=np.uint8), [1]))
+        if category is not None:
+            tests.append((np.frombuffer(self.categories, dtype=np.intc), [self.category_codes.get(category, -1)]))
+        if levels is not None:
+            tests.append((np.frombuffer(self.levels, dtype=np.int8), [_LEVEL_CODES[level] for level in levels]))
+        if not tests or not len(slots):
+            return slots
+        if len(slots) * 4 < len(self.items):
+            # few candidates: look their attributes up directly
+            for values, wanted in tests:
+                slots = slots[_one_of(values[slots], wanted)]
+            return slots
+        # many candidates: one pass over the whole index, then a single lookup
+        keep = np.ones(len(self.items), dtype=bool)
+        for values, wanted in tests:
+            keep &= _one_of(values, wanted)
+        return slots[keep[slots]]
+
+    def search(self, text, category=None, levels=None, limit=SEARCH_LIMIT):
+        """(items, total, exact) for the best limit matches of text.
+
+        Matches at the start of a field rank first, then matches at the start of a word,
+        then the rest, each in indexing order. total is exact when exact is True, else an
+        upper bound (trigram candidates not yet checked). Queries under three bytes
+        match the start of a field or word.
+        """
+        text = text.lower().strip()
+        data = text.encode()
+        if len(data) < 2:
+            return self._scan_word_starts(text, category, levels, limit)
+        field_start = data[0] << 8 | data[1]             # "\0" + first two bytes
+        word_start = 32 << 16 | data[0] << 8 | data[1]  # " " + first two bytes
+        if len(data) == 2:
+            slots = np.sort(np.concatenate((self._posting(field_start), self._posting(word_start))))
+            slots = slots[np.r_[True, slots[1:] != slots[:-1]]] if len(slots) else slots
+            checked = True
+        else:
+            slots = self._candidates(data)
+            checked = len(data) == 3
+
+        slots = self._restrict(slots, category, levels)
+
+        keys = self.keys
+        if not checked and len(slots) <= SEARCH_VERIFY_ALL:
+            slots = np.array([slot for slot in slots.tolist() if text in keys[slot]], dtype=np.intc)
+            checked = True
+
+        at_field = self._in_posting(slots, self._posting(field_start))
+        at_word = self._in_posting(slots, self._posting(word_start)) & ~at_field
+        results = []
+        rejected = 0
+        for tier in (slots[at_field], slots[at_word], slots[~(at_field | at_word)]):
+            for start in range(0, len(tier), 1024):
+                for slot in tier[start:start + 1024].tolist():
+                    if checked or text in keys[slot]:
+                        results.append(self.items[slot])
+                        if len(results) == limit:
+                            return results, len(slots) - rejected, checked
+                    else:
+                        rejected += 1
+        return results, len(results), True
+
+    def _scan_word_starts(self, text, category, levels, limit):
+        # a single byte has no postings; stop scanning once the page is full
+        field, word = "\0" + text, " " + text
+        code = self.category_codes.get(category, -1) if category is not None else None
+        codes = {_LEVEL_CODES[level] for level in levels} if levels is not None else None
+        results = []
+        for slot, key in enumerate(self.keys):
+            if not self.alive[slot] or not (key.startswith(text) or field in key or word in key):
+                continue
+            if code is not None and self.categories[slot] != code:
+                continue
+            if codes is not None and self.levels[slot] not in codes:
+                continue
+            results.append(self.items[slot])
+            if len(results) == limit:
+                return results, limit, False
+        return results, len(results), True
+
+
+class ItemStore:
+    """Items in display order with a SKU hash index plus category and stock-level buckets.
+
+    Every mutation goes through add / update / remove / sort so the buckets and the
+    StockStats counters never drift. Iterating yields item dicts like the old list did.
+    search_index=True also keeps a TrigramIndex for search() (needs numpy); only screens
+    with a search box should ask for it, it costs seconds and memory at large item counts.
+    """
+
+    def __init__(self, items=(), search_index=False):
+        self.by_sku = {}                 # sku -> item, in display order
+        self.by_category = {}            # category -> {sku: item}
+        self.by_level = {}               # stock_level -> {sku: item}
+        self.by_category_level = {}      # (category, stock_level) -> {sku: item}
+        self.search_keys = {}            # sku -> search_key(item)
+        self.search_index = None
+        self.stats = StockStats()
+        for item in items:
+            self.add(item)
+        if search_index and NUMPY_AVAILABLE:
+            # built in one vectorized pass, then kept current by add / update / remove
+            self.search_index = TrigramIndex(self.by_sku.values(), list(self.search_keys.values()))
+
+    def __len__(self):
+        return len(self.by_sku)
+
+    def __iter__(self):
+        return iter(self.by_sku.values())
+
+    def __contains__(self, sku):
+        return sku in self.by_sku
+
+    def get(self, sku):
+        return self.by_sku.get(sku)
+
+    def _buckets(self, item):
+        level = stock_level(item)
+        return (
+            (self.by_category, item["category"]),
+            (self.by_level, level),
+            (self.by_category_level, (item["category"], level)),
+        )
+
+    def _index(self, item):
+        sku = item["sku"]
+        for index, key in self._buckets(item):
+            index.setdefault(key, {})[sku] = item
+        self.search_keys[sku] = search_key(item)
+
+    def _unindex(self, item):
+        sku = item["sku"]
+        for index, key in self._buckets(item):
+            bucket = index[key]
+            del bucket[sku]
+            if not bucket:
+                del index[key]
+        del self.search_keys[sku]
+
+    def add(self, item):
+        if item["sku"] in self.by_sku:
+            raise KeyError(f"SKU already exists: {item['sku']}")
+        self.by_sku[item["sku"]] = item
+        self._index(item)
+        if self.search_index is not None:
+            self.search_index.add(item, self.search_keys[item["sku"]])
+        self.stats.add(item)
+
+    def update(self, sku, new_item):
+        """Replace the item stored under sku, keeping its position (new_item may carry a new SKU)."""
+        old_item = self.by_sku[sku]
+        self.stats.replace(old_item, new_item)
+        if self.search_index is not None:
+            self.search_index.update(sku, new_item)
+        if new_item["sku"] != sku:
+            # Rebuild the order so the renamed item keeps its place
+            self._unindex(old_item)
+            self.by_sku = {(new_item["sku"] if k == sku else k): (new_item if k == sku else v)
+                           for k, v in self.by_sku.items()}
+            self._index(new_item)
+            return old_item
+
+        self.by_sku[sku] = new_item
+        for (index, old_key), (_, new_key) in zip(self._buckets(old_item), self._buckets(new_item)):
+            if old_key == new_key:
+                index[old_key][sku] = new_item      # keeps its place in the bucket
+                continue
+            bucket = index[old_key]
+            del bucket[sku]
+            if not bucket:
+                del index[old_key]
+            index.setdefault(new_key, {})[sku] = new_item
+        self.search_keys[sku] = search_key(new_item)
+        return old_item
+
+    def remove(self, sku):
+        item = self.by_sku.pop(sku)
+        self._unindex(item)
+        if self.search_index is not None:
+            self.search_index.remove(sku)
+        self.stats.remove(item)
+        return item
+
+    def sort(self, key, reverse=False):
+        items = sorted(self.by_sku.values(), key=key, reverse=reverse)
+        self.by_sku = {}
+        self.by_category = {}
+        self.by_level = {}
+        self.by_category_level = {}
+        self.search_keys = {}
+        for item in items:
+            self.by_sku[item["sku"]] = item
+            self._index(item)
+
+    def categories(self):
+        return sorted(c for c in self.by_category if c)
+
+    def filter(self, category=None, level="all", text=""):
+        """Items matching a category, a stock-level filter ('all', 'low', 'critical') and search text.
+
+        Category and level are answered straight from the precomputed buckets; only the
+        search text needs a scan, and only over the buckets that already matched.
+        """
+        levels = FILTER_LEVELS.get(level)
+        if category and levels:
+            buckets = [self.by_category_level.get((category, lv), {}) for lv in levels]
+        elif category:
+            buckets = [self.by_category.get(category, {})]
+        elif levels:
+            buckets = [self.by_level.get(lv, {}) for lv in levels]
+        else:
+            buckets = [self.by_sku]
+
+        text = (text or "").lower().strip()
+        if not text:
+            items = []
+            for bucket in buckets:
+                items.extend(bucket.values())
+            return items
+
+        keys = self.search_keys
+        return [item for bucket in buckets for sku, item in bucket.items() if search_matches(keys[sku], text)]
+
+    def search(self, text, category=None, level="all", limit=SEARCH_LIMIT):
+        """(items, total, exact): the best limit matches for the search box, ranked.
+
+        Goes through the trigram index (see TrigramIndex.search); without one (search_index
+        not requested, or no numpy) it falls back to filter() in display order.
+        """
+        if self.search_index is None:
+            items = self.filter(category, level, text)
+            return items[:limit], len(items), True
+        return self.search_index.search(text, category, FILTER_LEVELS.get(level), limit)
+
+
+SNAPSHOT_EVERY = 5000      # movements between automatic stock snapshots
+
+IMPORT_CHUNK_SIZE = 5000   # rows per executemany / commit during a CSV import
+EXPORT_CHUNK_SIZE = 5000   # rows per fetchmany during a CSV export
+
+POOL_SIZE = int(os.environ.get("STOCK_DB_POOL_SIZE", "5"))  # pooled connections per MySQL backend
+POOL_TIMEOUT = 10          # seconds to wait for a free pooled connection
+POOL_PING_AFTER = 30       # idle seconds after which a connection is health-checked on checkout
+
+FORECAST_WINDOW_DAYS = 56  # consumption history used for the daily usage rate
+FORECAST_ALPHA = 0.2       # exponential smoothing factor (higher = reacts faster)
+LEAD_TIME_DAYS = 7         # supplier lead time assumed for every item
+SAFETY_DAYS = 3            # extra days of cover kept on top of the lead time
+
+_LEDGER_DDL = {
+    "sqlite": (
+        """CREATE TABLE IF NOT EXISTS stock_movements (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               sku TEXT NOT NULL,
+               delta INTEGER NOT NULL,
+               quantity_after INTEGER,
+               reason TEXT NOT NULL,
+               note TEXT,
+               created_at TEXT NOT NULL
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_stock_movements_sku ON stock_movements (sku, id)",
+        """CREATE TABLE IF NOT EXISTS stock_snapshots (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               taken_at TEXT NOT NULL,
+               last_movement_id INTEGER NOT NULL,
+               is_full INTEGER NOT NULL DEFAULT 1
+           )""",
+        """CREATE TABLE IF NOT EXISTS stock_snapshot_items (
+               snapshot_id INTEGER NOT NULL,
+               sku TEXT NOT NULL,
+               quantity INTEGER NOT NULL,
+               PRIMARY KEY (snapshot_id, sku)
+           )""",
+        "CREATE INDEX IF NOT EXISTS idx_stock_snapshot_items_sku ON stock_snapshot_items (sku, snapshot_id)",
+    ),
+    "mysql": (
+        """CREATE TABLE IF NOT EXISTS stock_movements (
+               id BIGINT AUTO_INCREMENT PRIMARY KEY,
+               sku VARCHAR(100) NOT NULL,
+               delta INT NOT NULL,
+               quantity_after INT,
+               reason VARCHAR(20) NOT NULL,
+               note VARCHAR(255),
+               created_at DATETIME NOT NULL,
+               INDEX idx_stock_movements_sku (sku, id)
+           )""",
+        """CREATE TABLE IF NOT EXISTS stock_snapshots (
+               id INT AUTO_INCREMENT PRIMARY KEY,
+               taken_at DATETIME NOT NULL,
+               last_movement_id BIGINT NOT NULL,
+               is_full TINYINT NOT NULL DEFAULT 1
+           )""",
+        """CREATE TABLE IF NOT EXISTS stock_snapshot_items (
+               snapshot_id INT NOT NULL,
+               sku VARCHAR(100) NOT NULL,
+               quantity INT NOT NULL,
+               PRIMARY KEY (snapshot_id, sku),
+               INDEX idx_stock_snapshot_items_sku (sku, snapshot_id)
+           )""",
+    ),
+}
+
+
+def now_timestamp():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class PooledConnection:
+    """A connection checked out of a ConnectionPool; close() returns it to the pool.
+
+    Everything else is passed through to the underlying DB-API connection, so code
+    written for connect()/close() per call works unchanged.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def statement(self, sql):
+        """Cursor bound to sql, reused for as long as this connection lives."""
+        return self._pool._statement(self._raw, sql)
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._release(raw)
+
+
+class ConnectionPool:
+    """Fixed-size pool over any DB-API connect() factory.
+
+    Connections are handed out newest-first. Any that sat idle longer than ping_after
+    are checked with SELECT 1 and replaced if dead. Returning a connection rolls back
+    whatever its user left open. With prepared=True (MySQL) statement() hands out
+    server-side prepared cursors, cached per connection and SQL text.
+    """
+
+    def __init__(self, connect, size=POOL_SIZE, timeout=POOL_TIMEOUT, ping_after=POOL_PING_AFTER, prepared=False):
+        self._connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.prepared = prepared
+        self._idle = []                  # (connection, last returned at)
+        self._statements = {}            # connection -> {sql: cursor}
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.counters = {
+            "created": 0, "reused": 0, "waits": 0, "timeouts": 0,
+            "pings": 0, "dropped": 0, "statements_prepared": 0, "statements_reused": 0,
+        }
+
+    def _count(self, name):
+        with self._cond:
+            self.counters[name] += 1
+
+    def _new_connection(self):
+        # the caller already holds a slot in self._open
+        try:
+            raw = self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        self._count("created")
+        return raw
+
+    def _healthy(self, raw):
+        self._count("pings")
+        try:
+            cursor = raw.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _drop(self, raw):
+        for cursor in self._statements.pop(raw, {}).values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def connect(self):
+        """Check out a connection, waiting up to timeout seconds when all are in use."""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("connection pool is closed")
+                if self._idle:
+                    raw, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    raw = last_used = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters["timeouts"] += 1
+                    raise TimeoutError(f"no free database connection after {self.timeout}s")
+                self.counters["waits"] += 1
+                self._cond.wait(remaining)
+
+        if raw is None:
+            raw = self._new_connection()
+        elif time.monotonic() - last_used > self.ping_after and not self._healthy(raw):
+            self._drop(raw)
+            self._count("dropped")
+            raw = self._new_connection()
+        else:
+            self._count("reused")
+        return PooledConnection(self, raw)
+
+    def _release(self, raw):
+        try:
+            raw.rollback()
+            healthy = True
+        except Exception:
+            healthy = False
+        with self._cond:
+            if healthy and not self._closed:
+                self._idle.append((raw, time.monotonic()))
+                self._cond.notify()
+                return
+            self._open -= 1
+            if not healthy:
+                self.counters["dropped"] += 1
+            self._cond.notify()
+        self._drop(raw)
+
+    def _statement(self, raw, sql):
+        cache = self._statements.setdefault(raw, {})
+        cursor = cache.get(sql)
+        if cursor is None:
+            cursor = cache[sql] = raw.cursor(prepared=True) if self.prepared else raw.cursor()
+            self._count("statements_prepared")
+        else:
+            self._count("statements_reused")
+        return cursor
+
+    def stats(self):
+        """Pool size and usage counters, for the UI and the benchmarks."""
+        with self._cond:
+            return dict(self.counters, size=self.size, open=self._open,
+                        idle=len(self._idle), in_use=self._open - len(self._idle))
+
+    def close(self):
+        """Disconnect idle connections; checked-out ones are closed when returned."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for raw, _ in idle:
+            self._drop(raw)
+
+
+def execute(conn, sql, params=()):
+    """Run sql on conn, reusing the connection's cached statement when it is pooled.
+
+    The returned cursor is only for fetching; it belongs to the connection.
+    """
+    cursor = conn.statement(sql) if isinstance(conn, PooledConnection) else conn.cursor()
+    cursor.execute(sql, params)
+    return cursor
+
+
+class StockLedger:
+    """Append-only stock_movements plus periodic snapshots of SKU quantities.
+
+    Stock at any time is the latest snapshot taken before it plus the movements recorded
+    after that snapshot, so a point-in-time query never scans more than SNAPSHOT_EVERY
+    movements. Movements are written on the caller's connection, inside the same
+    transaction as the stock_items change they describe.
+
+    Most snapshots are incremental: they hold only the SKUs that moved since the previous
+    snapshot (zeros included). A full copy of every stocked SKU is taken first and then
+    only once the incremental rows since the last full copy reach the number of stocked
+    SKUs. A SKU's quantity at a snapshot is its newest row between the last full copy and
+    that snapshot. So snapshot rows stay within about twice the movement count, and
+    reading the whole catalogue at a point in time reads at most about twice the stocked
+    SKU count.
+    """
+
+    def __init__(self, connect, dialect="sqlite", snapshot_every=SNAPSHOT_EVERY):
+        self.connect = connect            # () -> new DB-API connection
+        self.dialect = dialect
+        self.ph = "?" if dialect == "sqlite" else "%s"
+        self.snapshot_every = snapshot_every
+        self.since_snapshot = 0
+        self.rows_since_full = 0          # snapshot rows written since the last full copy
+
+    def _sql(self, query):
+        return query.replace("?", self.ph)
+
+    def init_tables(self, conn):
+        """Create the ledger tables; the first run snapshots current stock as the baseline."""
+        cursor = conn.cursor()
+        for ddl in _LEDGER_DDL[self.dialect]:
+            cursor.execute(ddl)
+        self._upgrade_tables(conn)
+        cursor.execute("SELECT MAX(last_movement_id) FROM stock_snapshots")
+        last_id = cursor.fetchone()[0]
+        if last_id is None:
+            self.take_snapshot(conn)
+        else:
+            cursor.execute(self._sql("SELECT COUNT(*) FROM stock_movements WHERE id > ?"), (last_id,))
+            self.since_snapshot = cursor.fetchone()[0]
+            cursor.execute(
+                "SELECT COUNT(*) FROM stock_snapshot_items WHERE snapshot_id > "
+                "(SELECT MAX(id) FROM stock_snapshots WHERE is_full = 1)"
+            )
+            self.rows_since_full = cursor.fetchone()[0]
+        cursor.close()
+
+    def _upgrade_tables(self, conn):
+        """Add is_full (older ledgers only have full snapshots) and the per-SKU snapshot index."""
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT is_full FROM stock_snapshots WHERE 1 = 0")
+            cursor.fetchall()
+            return
+        except Exception:
+            pass
+        finally:
+            cursor.close()
+        cursor = conn.cursor()
+        cursor.execute("ALTER TABLE stock_snapshots ADD COLUMN is_full INTEGER NOT NULL DEFAULT 1")
+        if self.dialect == "mysql":
+            cursor.execute("ALTER TABLE stock_snapshot_items ADD INDEX idx_stock_snapshot_items_sku (sku, snapshot_id)")
+        cursor.close()
+
+    def record(self, conn, sku, old_quantity, new_quantity, reason, note=""):
+        """Log a quantity change (None counts as 0); no-op changes are not recorded."""
+        delta = (new_quantity or 0) - (old_quantity or 0)
+        if delta == 0:
+            return
+        execute(conn, self._sql(
+            "INSERT INTO stock_movements (sku, delta, quantity_after, reason, note, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)"
+        ), (sku, delta, new_quantity or 0, reason, note, now_timestamp()))
+        self.since_snapshot += 1
+
+    def record_many(self, conn, changes, reason, note=""):
+        """Log (sku, old_quantity, new_quantity) changes with one executemany."""
+        created_at = now_timestamp()
+        rows = [
+            (sku, (new or 0) - (old or 0), new or 0, reason, note, created_at)
+            for sku, old, new in changes if (new or 0) != (old or 0)
+        ]
+        if not rows:
+            return
+        cursor = conn.cursor()
+        cursor.executemany(self._sql(
+            "INSERT INTO stock_movements (sku, delta, quantity_after, reason, note, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)"
+        ), rows)
+        cursor.close()
+        self.since_snapshot += len(rows)
+
+    def snapshot_if_due(self, conn):
+        """Take a snapshot once snapshot_every movements have built up since the last one.
+
+        Call it after the last movement of a write, before committing: a snapshot copies
+        stock_items, so taking one between the movements of a single write (a rename logs
+        three) would record quantities the movement log has not caught up with yet.
+        """
+        if self.since_snapshot >= self.snapshot_every:
+            self.take_snapshot(conn)
+
+    def take_snapshot(self, conn, full=None):
+        """Snapshot the SKUs that moved since the last snapshot, or every stocked SKU when full.
+
+        full=None takes a full copy only for the first snapshot or once the incremental rows
+        since the last full copy reach the stocked SKU count (see the class docstring).
+        """
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM stock_movements")
+        last_id = cursor.fetchone()[0]
+        cursor.execute("SELECT MAX(last_movement_id) FROM stock_snapshots")
+        previous_id = cursor.fetchone()[0]
+        if full is None:
+            full = previous_id is None
+            if not full:
+                cursor.execute("SELECT COUNT(*) FROM stock_items WHERE quantity IS NOT NULL AND quantity <> 0")
+                full = self.rows_since_full >= cursor.fetchone()[0]
+        cursor.execute(self._sql(
+            "INSERT INTO stock_snapshots (taken_at, last_movement_id, is_full) VALUES (?, ?, ?)"
+        ), (now_timestamp(), last_id, int(full)))
+        snapshot_id = cursor.lastrowid
+        if full:
+            cursor.execute(self._sql(
+                "INSERT INTO stock_snapshot_items (snapshot_id, sku, quantity) "
+                "SELECT ?, sku, quantity FROM stock_items WHERE quantity IS NOT NULL AND quantity <> 0"
+            ), (snapshot_id,))
+            self.rows_since_full = 0
+        else:
+            # current quantity of every SKU that moved (0 once deleted or renamed away)
+            cursor.execute(self._sql(
+                "INSERT INTO stock_snapshot_items (snapshot_id, sku, quantity) "
+                "SELECT ?, m.sku, COALESCE(i.quantity, 0) "
+                "FROM (SELECT DISTINCT sku FROM stock_movements WHERE id > ? AND id <= ?) m "
+                "LEFT JOIN stock_items i ON i.sku = m.sku"
+            ), (snapshot_id, previous_id, last_id))
+            self.rows_since_full += cursor.rowcount
+        cursor.close()
+        self.since_snapshot = 0
+
+    def _snapshot_before(self, cursor, when):
+        """(snapshot id, its last movement id, id of the full copy it builds on) before a timestamp."""
+        cursor.execute(self._sql(
+            "SELECT id, last_movement_id FROM stock_snapshots WHERE taken_at <= ? ORDER BY id DESC LIMIT 1"
+        ), (when,))
+        row = cursor.fetchone()
+        if row is None:
+            return None, 0, None
+        cursor.execute(self._sql("SELECT MAX(id) FROM stock_snapshots WHERE is_full = 1 AND id <= ?"), (row[0],))
+        return row[0], row[1], cursor.fetchone()[0]
+
+    def stock_at(self, sku, when):
+        """Quantity of one SKU at a timestamp ('YYYY-MM-DD[ HH:MM:SS]')."""
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            snapshot_id, last_id, full_id = self._snapshot_before(cursor, when)
+            base = 0
+            if snapshot_id is not None:
+                cursor.execute(self._sql(
+                    "SELECT quantity FROM stock_snapshot_items WHERE sku = ? AND snapshot_id BETWEEN ? AND ? "
+                    "ORDER BY snapshot_id DESC LIMIT 1"
+                ), (sku, full_id, snapshot_id))
+                row = cursor.fetchone()
+                base = row[0] if row else 0
+            cursor.execute(self._sql(
+                "SELECT COALESCE(SUM(delta), 0) FROM stock_movements WHERE sku = ? AND id > ? AND created_at <= ?"
+            ), (sku, last_id, when))
+            return int(base + cursor.fetchone()[0])
+        finally:
+            cursor.close()
+            conn.close()
+
+    def stock_levels_at(self, when):
+        """{sku: quantity} for the whole catalogue at a timestamp (SKUs at zero are left out)."""
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            snapshot_id, last_id, full_id = self._snapshot_before(cursor, when)
+            levels = {}
+            if snapshot_id is not None:
+                # oldest first, so each SKU ends up with its newest row
+                cursor.execute(self._sql(
+                    "SELECT sku, quantity FROM stock_snapshot_items WHERE snapshot_id BETWEEN ? AND ? "
+                    "ORDER BY snapshot_id"
+                ), (full_id, snapshot_id))
+                levels = dict(cursor.fetchall())
+            cursor.execute(self._sql(
+                "SELECT sku, SUM(delta) FROM stock_movements WHERE id > ? AND created_at <= ? GROUP BY sku"
+            ), (last_id, when))
+            for sku, delta in cursor.fetchall():
+                levels[sku] = int(levels.get(sku, 0) + delta)
+            return {sku: qty for sku, qty in levels.items() if qty}
+        finally:
+            cursor.close()
+            conn.close()
+
+    def history(self, sku, limit=500):
+        """Newest-first (created_at, reason, delta, quantity_after, note) rows for one SKU."""
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(self._sql(
+                "SELECT created_at, reason, delta, quantity_after, note FROM stock_movements "
+                "WHERE sku = ? ORDER BY id DESC LIMIT ?"
+            ), (sku, limit))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def daily_consumption(self, since):
+        """(sku, day, units) outflows per day since a date; deletions and renames are not consumption."""
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(self._sql(
+                "SELECT sku, DATE(created_at), -SUM(delta) FROM stock_movements "
+                "WHERE delta < 0 AND reason NOT IN ('delete', 'rename') AND created_at >= ? "
+                "GROUP BY sku, DATE(created_at)"
+            ), (since,))
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+            conn.close()
+
+
+def forecast_reorder(items, consumption, as_of=None, window_days=FORECAST_WINDOW_DAYS,
+                     alpha=FORECAST_ALPHA, lead_time_days=LEAD_TIME_DAYS, safety_days=SAFETY_DAYS):
+    """Daily usage, days of cover and reorder point for every stocked item in one vectorized pass.
+
+    consumption is StockLedger.daily_consumption() output. Usage is an exponentially
+    weighted average of the last window_days days (days without sales count as zero).
+    Returns dicts sorted by days of cover, most urgent first.
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("numpy is required for reorder forecasting")
+
+    stocked = [item for item in items if not item["is_service"]]
+    row_of = {item["sku"]: n for n, item in enumerate(stocked)}
+    end = as_of or date.today()
+    start = end - timedelta(days=window_days - 1)
+
+    # Collect (item row, day offset, units) triples for the window
+    offsets = {}
+    rows, days, amounts = [], [], []
+    for sku, day, units in consumption:
+        offset = offsets.get(day)
+        if offset is None:
+            parsed = day if isinstance(day, date) else date.fromisoformat(str(day))
+            offset = offsets[day] = (parsed - start).days
+        row = row_of.get(sku)
+        if row is not None and 0 <= offset < window_days:
+            rows.append(row)
+            days.append(offset)
+            amounts.append(units)
+
+    # Exponential smoothing is linear, so each day's units are weighted by its age and summed
+    # per item in one bincount (newest day weighs alpha, older days decay by 1 - alpha)
+    weights = alpha * (1 - alpha) ** np.arange(window_days)[::-1]
+    weights /= weights.sum()
+    daily = np.bincount(
+        np.array(rows, dtype=np.int64),
+        weights=np.array(amounts, dtype=float) * weights[np.array(days, dtype=np.int64)],
+        minlength=len(stocked),
+    )
+
+    quantity = np.array([item["quantity"] or 0 for item in stocked], dtype=float)
+    cover = np.full(len(stocked), np.inf)
+    np.divide(quantity, daily, out=cover, where=daily > 0)
+    reorder_point = np.ceil(daily * (lead_time_days + safety_days))
+    at_risk = cover < lead_time_days
+
+    order = np.argsort(cover, kind="stable")
+    return [
+        {
+            "sku": stocked[n]["sku"],
+            "name": stocked[n]["name"],
+            "quantity": int(quantity[n]),
+            "daily_usage": float(daily[n]),
+            "days_of_cover": float(cover[n]),
+            "reorder_point": int(reorder_point[n]),
+            "at_risk": bool(at_risk[n]),
+        }
+        for n in order.tolist()
+    ]
+
+
+# ---------- Storage backends ----------
+# Every backend offers init_db / load_items / save_item / delete_item / filter_items,
+# so the apps and inventory_bench.py run the same code against any of them.
+
+ITEM_FIELDS = ("name", "sku", "quantity", "min_level", "category", "subcategory", "unit",
+               "price", "description", "is_service", "duration", "service_cost")
+
+_ITEMS_DDL = {
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS stock_items (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            sku TEXT UNIQUE NOT NULL,
+            quantity INTEGER,
+            min_level INTEGER,
+            category TEXT NOT NULL,
+            subcategory TEXT NOT NULL,
+            unit TEXT,
+            price REAL,
+            description TEXT,
+            is_service INTEGER DEFAULT 0,
+            duration TEXT,
+            service_cost REAL
+        )
+    """,
+    "mysql": """
+        CREATE TABLE IF NOT EXISTS stock_items (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            sku VARCHAR(100) UNIQUE NOT NULL,
+            quantity INT,
+            min_level INT,
+            category VARCHAR(255) NOT NULL,
+            subcategory VARCHAR(255) NOT NULL,
+            unit VARCHAR(50),
+            price DECIMAL(10,2),
+            description TEXT,
+            is_service BOOLEAN DEFAULT 0,
+            duration VARCHAR(100),
+            service_cost DECIMAL(10,2)
+        )
+    """,
+}
+
+# Upsert clause per dialect: every column but the SKU takes the imported value
+_UPSERT_SQL = {
+    "sqlite": "ON CONFLICT(sku) DO UPDATE SET " + ", ".join(f"{f} = excluded.{f}" for f in ITEM_FIELDS if f != "sku"),
+    "mysql": "ON DUPLICATE KEY UPDATE " + ", ".join(f"{f} = VALUES({f})" for f in ITEM_FIELDS if f != "sku"),
+}
+
+# CSV header used by export and import
+CSV_COLUMNS = (
+    ("Name", "name"), ("SKU", "sku"), ("Category", "category"), ("Subcategory", "subcategory"),
+    ("Quantity", "quantity"), ("Min Level", "min_level"), ("Unit", "unit"), ("Price", "price"),
+    ("Description", "description"), ("Is Service", "is_service"), ("Duration", "duration"),
+    ("Service Cost", "service_cost"),
+)
+
+# SQL for the stock-level filters; same rules as stock_level()
+_LEVEL_SQL = {
+    "low": "is_service = 0 AND quantity IS NOT NULL AND min_level IS NOT NULL AND quantity <= min_level",
+    "critical": "is_service = 0 AND quantity IS NOT NULL AND min_level IS NOT NULL AND quantity <= min_level * 0.5",
+}
+
+
+def item_from_row(row):
+    """Item dict from a stock_items row selected in ITEM_FIELDS order."""
+    return {
+        "name": row[0],
+        "sku": row[1],
+        "quantity": int(row[2]) if row[2] is not None else None,
+        "min_level": int(row[3]) if row[3] is not None else None,
+        "category": row[4],
+        "subcategory": row[5],
+        "unit": row[6],
+        "price": float(row[7]) if row[7] is not None else 0.0,
+        "description": row[8] or "",
+        "is_service": bool(row[9]),
+        "duration": row[10] or "",
+        "service_cost": float(row[11]) if row[11] is not None else 0.0,
+    }
+
+
+def item_params(item):
+    """ITEM_FIELDS values of an item, ready to bind."""
+    return tuple(int(item[f]) if f == "is_service" else item[f] for f in ITEM_FIELDS)
+
+
+def _csv_value(row, *names):
+    for name in names:
+        value = row.get(name)
+        if value and value.strip():
+            return value.strip()
+    return ""
+
+
+def _csv_number(row, name, kind, default):
+    value = _csv_value(row, name)
+    if not value:
+        return default
+    try:
+        return kind(value)
+    except ValueError:
+        raise ValueError(f"{name}: not a number ({value!r})") from None
+
+
+def parse_import_row(row):
+    """Item dict from a CSV row in the export format; raises ValueError naming the bad field."""
+    sku = _csv_value(row, "SKU", "sku", "Sku")
+    if not sku:
+        raise ValueError("SKU: missing")
+    is_service = bool(_csv_number(row, "Is Service", int, 0))
+    return {
+        "name": _csv_value(row, "Name", "name"),
+        "sku": sku,
+        "quantity": _csv_number(row, "Quantity", int, None if is_service else 0),
+        "min_level": _csv_number(row, "Min Level", int, None if is_service else 0),
+        "category": _csv_value(row, "Category", "category") or "Uncategorized",
+        "subcategory": _csv_value(row, "Subcategory", "subcategory"),
+        "unit": _csv_value(row, "Unit"),
+        "price": _csv_number(row, "Price", float, 0.0),
+        "description": _csv_value(row, "Description"),
+        "is_service": is_service,
+        "duration": _csv_value(row, "Duration"),
+        "service_cost": _csv_number(row, "Service Cost", float, 0.0),
+    }
+
+
+def write_items_csv(path, items):
+    """Write items in the CSV_COLUMNS format (what import_items reads back)."""
+    items = list(items)
+    export_csv_file(path, [[item_params(item) for item in items]], len(items))
+
+
+def import_csv_file(path, existing, write, upsert=False, chunk_size=IMPORT_CHUNK_SIZE,
+                    progress=None, error_path=None):
+    """Stream a CSV through validation and SKU dedupe, handing valid items to write() in chunks.
+
+    existing is {sku: quantity} for what is already stored; write(chunk, existing) stores a
+    chunk and runs before existing learns about it. Rows that fail validation, repeat a SKU
+    from earlier in the file, or (without upsert) clash with a stored SKU go to error_path
+    as line,sku,error. progress gets the running stats plus the fraction of the file read.
+    """
+    stats = {"rows": 0, "imported": 0, "updated": 0, "duplicates": 0, "invalid": 0, "error_report": None}
+    total_size = os.path.getsize(path) or 1
+    consumed = [0]
+    seen = set()
+    chunk = []
+    report = None
+
+    def lines(f):
+        for line in f:
+            consumed[0] += len(line)
+            yield line
+
+    def reject(line_no, row, error):
+        nonlocal report
+        if error_path is None:
+            return
+        if report is None:
+            report_file = open(error_path, "w", newline="", encoding="utf-8")
+            report = (report_file, csv.writer(report_file))
+            report[1].writerow(["line", "sku", "error"])
+            stats["error_report"] = error_path
+        report[1].writerow([line_no, _csv_value(row, "SKU", "sku", "Sku"), error])
+
+    def flush():
+        write(chunk, existing)
+        for item in chunk:
+            stats["updated" if item["sku"] in existing else "imported"] += 1
+            existing[item["sku"]] = item["quantity"]
+        chunk.clear()
+        if progress:
+            progress(dict(stats, fraction=min(consumed[0] / total_size, 1.0)))
+
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(lines(f))
+            for row in reader:
+                stats["rows"] += 1
+                try:
+                    item = parse_import_row(row)
+                except ValueError as e:
+                    stats["invalid"] += 1
+                    reject(reader.line_num, row, str(e))
+                    continue
+                sku = item["sku"]
+                if sku in seen:
+                    stats["duplicates"] += 1
+                    reject(reader.line_num, row, "duplicate SKU earlier in the file")
+                    continue
+                seen.add(sku)
+                if sku in existing and not upsert:
+                    stats["duplicates"] += 1
+                    reject(reader.line_num, row, "SKU already exists")
+                    continue
+                chunk.append(item)
+                if len(chunk) >= chunk_size:
+                    flush()
+            if chunk:
+                flush()
+    finally:
+        if report is not None:
+            report[0].close()
+    return stats
+
+
+def export_csv_file(path, chunks, total, progress=None, cancel=None):
+    """Write row chunks (ITEM_FIELDS order) as CSV, gzip-compressed when path ends in .gz.
+
+    Only one chunk is held at a time. If cancel (a threading.Event) gets set, the
+    partial file is removed and the stats come back with cancelled=True.
+    """
+    order = [ITEM_FIELDS.index(key) for _, key in CSV_COLUMNS]
+    service = ITEM_FIELDS.index("is_service")
+    stats = {"rows": 0, "total": total, "cancelled": False, "bytes": 0}
+    if path.endswith(".gz"):
+        # level 6 is ~2x faster than gzip's default 9 for a few percent more bytes
+        f = gzip.open(path, "wt", compresslevel=6, newline="", encoding="utf-8")
+    else:
+        f = open(path, "w", newline="", encoding="utf-8")
+    with f:
+        writer = csv.writer(f)
+        writer.writerow([header for header, _ in CSV_COLUMNS])
+        for chunk in chunks:
+            if cancel is not None and cancel.is_set():
+                stats["cancelled"] = True
+                break
+            writer.writerows(
+                [int(row[i]) if i == service else row[i] for i in order] for row in chunk
+            )
+            stats["rows"] += len(chunk)
+            if progress:
+                progress(dict(stats, fraction=stats["rows"] / total if total else 1.0))
+    if stats["cancelled"]:
+        os.remove(path)
+    else:
+        stats["bytes"] = os.path.getsize(path)
+    return stats
+
+
+class MemoryBackend:
+    """Items and movements kept in process; nothing survives a restart.
+
+    Baseline for the benchmarks and a scratch backend for trying the UI without a database.
+    """
+
+    name = "memory"
+    ledger = None
+
+    def __init__(self):
+        self.items = ItemStore()
+        self.movements = []            # (sku, delta, quantity_after, reason, note, created_at)
+
+    def init_db(self):
+        pass
+
+    def _record(self, sku, old_quantity, new_quantity, reason, note=""):
+        delta = (new_quantity or 0) - (old_quantity or 0)
+        if delta:
+            self.movements.append((sku, delta, new_quantity or 0, reason, note, now_timestamp()))
+
+    def load_items(self):
+        return [dict(item) for item in self.items]
+
+    def save_item(self, item, update=False, original_sku=None, reason=None, note=""):
+        item = dict(item)
+        if update:
+            old = self.items.get(original_sku or item["sku"])
+            if old is None:
+                return
+            self.items.update(old["sku"], item)
+            if old["sku"] != item["sku"]:
+                self._record(old["sku"], old["quantity"], 0, "rename", f"to {item['sku']}")
+                self._record(item["sku"], 0, old["quantity"], "rename", f"from {old['sku']}")
+            self._record(item["sku"], old["quantity"], item["quantity"], reason or "adjustment", note)
+        else:
+            self.items.add(item)
+            self._record(item["sku"], None, item["quantity"], reason or "initial", note)
+
+    def delete_item(self, sku):
+        old = self.items.get(sku)
+        if old is not None:
+            self.items.remove(sku)
+            self._record(sku, old["quantity"], 0, "delete")
+
+    def import_items(self, path, upsert=False, chunk_size=IMPORT_CHUNK_SIZE, progress=None, error_path=None):
+        def write(chunk, existing):
+            for item in chunk:
+                if item["sku"] in existing:
+                    self.items.update(item["sku"], item)
+                else:
+                    self.items.add(item)
+                self._record(item["sku"], existing.get(item["sku"]), item["quantity"], "import")
+
+        existing = {item["sku"]: item["quantity"] for item in self.items}
+        return import_csv_file(path, existing, write, upsert, chunk_size, progress, error_path)
+
+    def export_items(self, path, chunk_size=EXPORT_CHUNK_SIZE, progress=None, cancel=None):
+        def chunks():
+            rows = (item_params(item) for item in self.items)
+            while True:
+                chunk = [row for _, row in zip(range(chunk_size), rows)]
+                if not chunk:
+                    return
+                yield chunk
+
+        return export_csv_file(path, chunks(), len(self.items), progress, cancel)
+
+    def filter_items(self, category=None, level="all", text=""):
+        return [dict(item) for item in self.items.filter(category, level, text)]
+
+
+class SQLBackend:
+    """stock_items plus the StockLedger tables over any DB-API connection factory.
+
+    With pool_size 0 every call opens its own connection; otherwise calls borrow one
+    from a ConnectionPool of that size. Quantity changes are logged to stock_movements
+    in the same transaction as the stock_items write.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, connect, snapshot_every=SNAPSHOT_EVERY, pool_size=0, prepared=False):
+        self.pool = ConnectionPool(connect, pool_size, prepared=prepared) if pool_size else None
+        self.connect = self.pool.connect if self.pool else connect
+        self.ledger = StockLedger(self.connect, self.dialect, snapshot_every)
+
+    def close(self):
+        if self.pool:
+            self.pool.close()
+
+    def pool_stats(self):
+        return self.pool.stats() if self.pool else None
+
+    def _sql(self, query):
+        return self.ledger._sql(query)
+
+    def init_db(self):
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(_ITEMS_DDL[self.dialect])
+            self.ledger.init_tables(conn)
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+
+    def _select(self, where="", params=()):
+        conn = self.connect()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(self._sql(f"SELECT {', '.join(ITEM_FIELDS)} FROM stock_items {where} ORDER BY id"), params)
+            return [item_from_row(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+            conn.close()
+
+    def load_items(self):
+        return self._select()
+
+    def save_item(self, item, update=False, original_sku=None, reason=None, note=""):
+        """Insert or update an item; original_sku lets an update rename the SKU."""
+        conn = self.connect()
+        try:
+            if update:
+                key = original_sku or item["sku"]
+                rows = execute(conn, self._sql("SELECT quantity FROM stock_items WHERE sku = ?"), (key,)).fetchall()
+                execute(conn, self._sql(
+                    f"UPDATE stock_items SET {', '.join(f + ' = ?' for f in ITEM_FIELDS)} WHERE sku = ?"
+                ), item_params(item) + (key,))
+                old_quantity = rows[0][0] if rows else None
+                if rows and key != item["sku"]:
+                    # a rename moves the whole balance, so both SKUs' point-in-time stock stays right
+                    self.ledger.record(conn, key, old_quantity, 0, "rename", f"to {item['sku']}")
+                    self.ledger.record(conn, item["sku"], 0, old_quantity, "rename", f"from {key}")
+                self.ledger.record(conn, item["sku"], old_quantity, item["quantity"], reason or "adjustment", note)
+            else:
+                execute(conn, self._sql(
+                    f"INSERT INTO stock_items ({', '.join(ITEM_FIELDS)}) "
+                    f"VALUES ({', '.join('?' * len(ITEM_FIELDS))})"
+                ), item_params(item))
+                self.ledger.record(conn, item["sku"], None, item["quantity"], reason or "initial", note)
+            self.ledger.snapshot_if_due(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def delete_item(self, sku):
+        """Delete an item by SKU (its remaining stock is logged as a 'delete' movement)."""
+        conn = self.connect()
+        try:
+            rows = execute(conn, self._sql("SELECT quantity FROM stock_items WHERE sku = ?"), (sku,)).fetchall()
+            execute(conn, self._sql("DELETE FROM stock_items WHERE sku = ?"), (sku,))
+            if rows:
+                self.ledger.record(conn, sku, rows[0][0], 0, "delete")
+                self.ledger.snapshot_if_due(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def import_items(self, path, upsert=False, chunk_size=IMPORT_CHUNK_SIZE, progress=None, error_path=None):
+        """Bulk import a CSV: chunked executemany, one transaction per chunk (see import_csv_file).
+
+        With upsert, SKUs that already exist are updated in place (ON CONFLICT / ON DUPLICATE
+        KEY UPDATE) and their quantity change is logged like any other movement.
+        """
+        insert = (f"INSERT INTO stock_items ({', '.join(ITEM_FIELDS)}) "
+                  f"VALUES ({', '.join('?' * len(ITEM_FIELDS))})")
+        if upsert:
+            insert += " " + _UPSERT_SQL[self.dialect]
+        insert = self._sql(insert)
+
+        conn = self.connect()
+        cursor = conn.cursor()
+
+        def write(chunk, existing):
+            try:
+                cursor.executemany(insert, [item_params(item) for item in chunk])
+                self.ledger.record_many(
+                    conn, [(item["sku"], existing.get(item["sku"]), item["quantity"]) for item in chunk], "import"
+                )
+                self.ledger.snapshot_if_due(conn)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        try:
+            cursor.execute("SELECT sku, quantity FROM stock_items")
+            existing = dict(cursor.fetchall())
+            return import_csv_file(path, existing, write, upsert, chunk_size, progress, error_path)
+        finally:
+            cursor.close()
+            conn.close()
+
+    def export_items(self, path, chunk_size=EXPORT_CHUNK_SIZE, progress=None, cancel=None):
+        """Stream stock_items to CSV (or .csv.gz) straight from the database.
+
+        Rows come through an unbuffered cursor with fetchmany, so memory stays at one
+        chunk however big the catalogue is; see export_csv_file for cancellation.
+        """
+        conn = self.connect()
+        count_cursor = conn.cursor()
+        count_cursor.execute("SELECT COUNT(*) FROM stock_items")
+        total = count_cursor.fetchall()[0][0]
+        count_cursor.close()
+        # mysql-connector cursors are unbuffered unless asked otherwise: rows stay on the
+        # server until fetched. sqlite3 cursors always step through the table lazily.
+        cursor = conn.cursor()
+
+        def chunks():
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+        try:
+            cursor.execute(f"SELECT {', '.join(ITEM_FIELDS)} FROM stock_items ORDER BY id")
+            return export_csv_file(path, chunks(), total, progress, cancel)
+        finally:
+            # a cancelled export leaves rows unread, which MySQL refuses to close over;
+            # the pool then drops that connection instead of reusing it
+            try:
+                cursor.close()
+            except Exception:
+                pass
+            conn.close()
+
+    def _search_clause(self, text):
+        """search_matches as SQL: (clause, params) for lowercased, stripped search text.
+
+        Search text never contains the NUL that joins search_key's fields, so matching the
+        key is the same as matching any one field on its own. This relies on the database's
+        LOWER folding case like str.lower.
+        """
+        fields = ("name", "sku", "category")
+        if len(text.encode()) >= 3:
+            return " OR ".join(f"INSTR(LOWER({f}), ?) > 0" for f in fields), (text,) * 3
+        return (" OR ".join(f"INSTR(LOWER({f}), ?) = 1 OR INSTR(LOWER({f}), ?) > 0" for f in fields),
+                (text, " " + text) * 3)
+
+    def filter_items(self, category=None, level="all", text=""):
+        """The items ItemStore.filter returns (same search rule), answered by the database in id order."""
+        clauses, params = [], []
+        if category:
+            clauses.append("category = ?")
+            params.append(category)
+        if level in _LEVEL_SQL:
+            clauses.append(_LEVEL_SQL[level])
+        text = (text or "").lower().strip()
+        if text:
+            clause, search_params = self._search_clause(text)
+            clauses.append(f"({clause})")
+            params.extend(search_params)
+        return self._select("WHERE " + " AND ".join(clauses) if clauses else "", tuple(params))
+
+
+def _sqlite_search_matches(name, sku, category, text):
+    return search_matches(search_key({"name": name, "sku": sku, "category": category}), text)
+
+
+class SQLiteBackend(SQLBackend):
+    name = "sqlite"
+    dialect = "sqlite"
+
+    def __init__(self, db_name, snapshot_every=SNAPSHOT_EVERY, pool_size=0):
+        self.db_name = db_name
+        # a pooled connection is only ever used by one thread at a time
+        super().__init__(lambda: self._connect(check_same_thread=not pool_size), snapshot_every, pool_size)
+
+    def _connect(self, check_same_thread):
+        conn = sqlite3.connect(self.db_name, check_same_thread=check_same_thread)
+        conn.create_function("search_matches", 4, _sqlite_search_matches, deterministic=True)
+        return conn
+
+    def _search_clause(self, text):
+        # SQLite's LOWER only folds ASCII, so the search rule runs as a Python function
+        return "search_matches(name, sku, category, ?)", (text,)
+
+
+class MySQLBackend(SQLBackend):
+    name = "mysql"
+    dialect = "mysql"
+
+    def __init__(self, db_config, snapshot_every=SNAPSHOT_EVERY, pool_size=POOL_SIZE):
+        if not MYSQL_AVAILABLE:
+            raise RuntimeError("mysql-connector-python is required for the MySQL backend")
+        self.db_config = db_config
+        super().__init__(lambda: mysql.connector.connect(**self.db_config), snapshot_every,
+                         pool_size, prepared=True)
@@ -0,0 +1,87 @@
+"""Archiving customers and restoring them must round-trip every row."""
+
+import importlib.util
+import os
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "customer_final", os.path.join(os.path.dirname(__file__), os.pardir, "Customer Final.py")
+)
+customer_final = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(customer_final)
+
+CUSTOMER_SQL = f"SELECT {customer_final.CUSTOMER_COLUMNS} FROM customers ORDER BY customer_id"
+TRANSACTION_SQL = f"SELECT {customer_final.TRANSACTION_COLUMNS} FROM transactions ORDER BY transaction_id"
+
+
+def query(db, sql, params=()):
+    conn = db.get_connection()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = customer_final.DatabaseManager(str(tmp_path / "retail.db"))
+    for n in range(12):
+        customer_id = db.add_customer(f"Customer {n}", f"555-{n:04d}", f"{n} Main St", "Regular")
+        for amount in range(n % 4):
+            db.add_transaction(customer_id, 100.0 + amount, f"sale {amount}")
+    # Even customers registered in 2020 and last bought in 2021, odd ones are recent
+    conn = db.get_connection()
+    with conn:
+        conn.execute(
+            "UPDATE customers SET registration_date = CASE WHEN customer_id % 2 = 0 "
+            "THEN '2020-01-01 09:00:00' ELSE '2024-01-01 09:00:00' END"
+        )
+        conn.execute(
+            """UPDATE transactions SET transaction_date = CASE
+                   WHEN customer_id % 2 = 0 THEN '2021-03-01 10:00:00' ELSE '2024-02-01 10:00:00' END"""
+        )
+    conn.close()
+    return db
+
+
+def test_archive_and_restore_one_customer(db):
+    customers, transactions = query(db, CUSTOMER_SQL), query(db, TRANSACTION_SQL)
+    customer_id = 4
+
+    assert db.archive_customer(customer_id, batch_size=1) is True
+    assert customer_id not in [row[0] for row in query(db, CUSTOMER_SQL)]
+    assert query(
+        db, f"SELECT {customer_final.TRANSACTION_COLUMNS} FROM archived_transactions ORDER BY transaction_id"
+    ) == [row for row in transactions if row[1] == customer_id]
+    assert query(db, "SELECT COUNT(*) FROM transactions WHERE customer_id = ?", (customer_id,)) == [(0,)]
+
+    assert db.restore_customer(customer_id, batch_size=1) is True
+    assert query(db, CUSTOMER_SQL) == customers
+    assert query(db, TRANSACTION_SQL) == transactions
+    assert query(db, "SELECT COUNT(*) FROM archived_customers") == [(0,)]
+    assert query(db, "SELECT COUNT(*) FROM archived_transactions") == [(0,)]
+
+
+def test_archive_inactive_then_restore_round_trips_every_row(db):
+    customers, transactions = query(db, CUSTOMER_SQL), query(db, TRANSACTION_SQL)
+    updates = []
+
+    stats = db.archive_inactive_customers("2023-01-01", batch_size=2, progress=updates.append)
+
+    inactive = [row for row in customers if row[0] % 2 == 0]
+    assert stats["customers"] == len(inactive)
+    assert stats["transactions"] == sum(1 for row in transactions if row[1] % 2 == 0)
+    assert updates and updates[-1]["customers"] == len(inactive)
+    assert query(db, CUSTOMER_SQL) == [row for row in customers if row[0] % 2 == 1]
+    assert query(db, f"SELECT {customer_final.CUSTOMER_COLUMNS} FROM archived_customers ORDER BY customer_id") == inactive
+
+    for customer_id, *_ in inactive:
+        assert db.restore_customer(customer_id) is True
+    assert query(db, CUSTOMER_SQL) == customers
+    assert query(db, TRANSACTION_SQL) == transactions
+
+
+def test_restore_unknown_customer(db):
+    assert db.restore_customer(999) is False
+    assert db.archive_customer(999) is False
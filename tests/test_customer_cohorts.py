@@ -0,0 +1,71 @@
+"""DatabaseManager.compute_cohort_retention and its cache."""
+
+import importlib.util
+import os
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "customer_final", os.path.join(os.path.dirname(__file__), os.pardir, "Customer Final.py")
+)
+customer_final = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(customer_final)
+
+pytest.importorskip("numpy")
+
+
+def backdate(db, sql, params=()):
+    conn = db.get_connection()
+    with conn:
+        conn.execute(sql, params)
+    conn.close()
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = customer_final.DatabaseManager(str(tmp_path / "retail.db"))
+    for n in range(4):
+        customer_id = db.add_customer(f"Customer {n}", f"555-{n:04d}", "1 Main St", "Regular")
+        if n % 2 == 0:
+            db.add_transaction(customer_id, 20.0, "first sale")
+    backdate(db, "UPDATE customers SET registration_date = '2024-01-10 09:00:00'")
+    backdate(db, "UPDATE transactions SET transaction_date = '2024-02-05 09:00:00'")
+    return db
+
+
+def test_retention_matrix(db):
+    result = db.compute_cohort_retention(as_of="2024-03-15")
+
+    assert result["cohorts"] == ["2024-01"]
+    assert result["sizes"] == [4]
+    assert result["active"][0][:3] == [0, 2, 0]
+    assert result["retention"][0][:3] == [0.0, 0.5, 0.0]
+    # months after as_of are blank, not 0%
+    assert all(share != share for share in result["retention"][0][3:])
+
+
+def test_unchanged_data_is_served_from_the_cache(db):
+    first = db.compute_cohort_retention(as_of="2024-03-15")
+
+    assert db.compute_cohort_retention(as_of="2024-03-15") is first
+    assert db.compute_cohort_retention(as_of="2024-03-15", refresh=True) is not first
+
+
+def test_writes_invalidate_the_cache(db):
+    before = db.compute_cohort_retention(as_of="2024-03-15")
+
+    customer_id = db.add_customer("Late Joiner", "555-0100", "2 Main St", "Regular")
+    backdate(db, "UPDATE customers SET registration_date = '2024-03-01 09:00:00' WHERE customer_id = ?",
+             (customer_id,))
+    db.add_transaction(1, 20.0, "repeat sale")
+    backdate(db, "UPDATE transactions SET transaction_date = '2024-03-02 09:00:00' WHERE description = 'repeat sale'")
+    after = db.compute_cohort_retention(as_of="2024-03-15")
+
+    assert after is not before
+    assert after["cohorts"] == ["2024-01", "2024-03"]
+    assert after["sizes"] == [4, 1]
+    assert after["active"][0][:3] == [0, 2, 1]
+
+    # archiving moves rows out of the live tables, which must invalidate too
+    db.archive_customer(customer_id)
+    assert db.compute_cohort_retention(as_of="2024-03-15")["cohorts"] == ["2024-01"]
@@ -0,0 +1,83 @@
+"""find_duplicate_customers and DatabaseManager.merge_customers."""
+
+import importlib.util
+import os
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "customer_final", os.path.join(os.path.dirname(__file__), os.pardir, "Customer Final.py")
+)
+customer_final = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(customer_final)
+
+
+@pytest.fixture
+def db(tmp_path):
+    return customer_final.DatabaseManager(str(tmp_path / "retail.db"))
+
+
+def query(db, sql, params=()):
+    conn = db.get_connection()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def test_finds_formatting_variants_and_keeps_the_older_record(db):
+    keep = db.add_customer("Maria Lopez", "555-0101", "12 Oak Street", "Regular")
+    db.add_customer("Tom Baker", "555-0199", "4 Pine Road", "Regular")
+    duplicate = db.add_customer("maria  lopez", "(555) 0101", "12 Oak St", "Regular")
+
+    pairs = customer_final.find_duplicate_customers(db)
+
+    assert [(pair["keep"].customer_id, pair["duplicate"].customer_id) for pair in pairs] == [(keep, duplicate)]
+    assert pairs[0]["score"] >= customer_final.DUPLICATE_THRESHOLD
+
+
+def test_oversized_blocks_still_compare_every_record(db):
+    # More customers than DUPLICATE_MAX_BLOCK share both the placeholder phone and the
+    # name key (first and last word); the real duplicate pair is registered last
+    middle = ["Ade", "Bola", "Chidi", "Dayo", "Emeka", "Femi", "Gozie", "Hauwa", "Ife", "Jide"]
+    for n in range(customer_final.DUPLICATE_MAX_BLOCK * 3):
+        db.add_customer(f"Yusuf {middle[n % 10]}{'o' * (n // 10)} Okafor", "000-0000", f"{n} Market Sq", "Regular")
+    keep = db.add_customer("Yusuf Okafor", "000-0000", "8 Elm Road", "Regular")
+    duplicate = db.add_customer("Yusuf  Okafor", "000 0000", "8 Elm Rd", "Regular")
+
+    pairs = customer_final.find_duplicate_customers(db)
+
+    assert (keep, duplicate) in {(pair["keep"].customer_id, pair["duplicate"].customer_id) for pair in pairs}
+
+
+def test_merge_moves_transactions_and_points(db):
+    keep = db.add_customer("Maria Lopez", "555-0101", "12 Oak Street", "Student")
+    duplicate = db.add_customer("Maria Lopez", "555 0101", "12 Oak St", "Regular")
+    other = db.add_customer("Tom Baker", "555-0199", "4 Pine Road", "Regular")
+    db.add_transaction(keep, 6000.0, "laptop")
+    db.add_transaction(duplicate, 4500.0, "phone")
+    db.add_transaction(duplicate, 120.0, "case")
+    db.add_transaction(other, 50.0, "cable")
+    before = query(db, "SELECT transaction_id, amount, description FROM transactions ORDER BY transaction_id")
+
+    assert db.merge_customers(keep, duplicate) is True
+
+    assert query(db, "SELECT transaction_id, amount, description FROM transactions ORDER BY transaction_id") == before
+    assert query(db, "SELECT customer_id, COUNT(*) FROM transactions GROUP BY customer_id ORDER BY customer_id") == [
+        (keep, 3), (other, 1)
+    ]
+    # 600 + 450 + 12 points, which crosses the VIP threshold
+    assert query(db, "SELECT customer_id, category, loyalty_points FROM customers ORDER BY customer_id") == [
+        (keep, "VIP", 1062), (other, "Regular", 5)
+    ]
+    assert query(db, "SELECT customer_id, previous_category FROM loyalty_promotions") == [(keep, "Student")]
+
+
+def test_merge_refuses_missing_or_identical_customers(db):
+    keep = db.add_customer("Maria Lopez", "555-0101", "12 Oak Street", "Regular")
+    db.add_transaction(keep, 100.0, "shoes")
+
+    assert db.merge_customers(keep, keep) is False
+    assert db.merge_customers(keep, keep + 99) is False
+    assert query(db, "SELECT customer_id, loyalty_points FROM customers") == [(keep, 10)]
+    assert query(db, "SELECT customer_id FROM transactions") == [(keep,)]
@@ -0,0 +1,51 @@
+"""DatabaseManager.export_table: formats and the uncompressed byte count."""
+
+import csv
+import gzip
+import importlib.util
+import json
+import os
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "customer_final", os.path.join(os.path.dirname(__file__), os.pardir, "Customer Final.py")
+)
+customer_final = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(customer_final)
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = customer_final.DatabaseManager(str(tmp_path / "retail.db"))
+    db.add_customer("Zoë Ångström", "555-0101", "Þórsgata 1, Reykjavík", "VIP")
+    db.add_customer("李小龍", "555-0102", "九龍 2", "Regular")
+    return db
+
+
+@pytest.mark.parametrize("name, fmt", [
+    ("customers.csv", "csv"), ("customers.csv.gz", "csv.gz"), ("customers.jsonl", "jsonl")
+])
+def test_raw_bytes_counts_encoded_output(db, tmp_path, name, fmt):
+    path = str(tmp_path / name)
+    stats = db.export_table("customers", path)
+
+    opener = gzip.open if fmt == "csv.gz" else open
+    with opener(path, "rb") as f:
+        data = f.read()
+    assert stats["format"] == fmt
+    assert stats["rows"] == 2
+    assert stats["raw_bytes"] == len(data)
+    assert stats["bytes"] == os.path.getsize(path)
+
+
+def test_export_round_trips_non_ascii_rows(db, tmp_path):
+    db.export_table("customers", str(tmp_path / "customers.csv"))
+    db.export_table("customers", str(tmp_path / "customers.jsonl"))
+
+    with open(tmp_path / "customers.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    with open(tmp_path / "customers.jsonl", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [row["name"] for row in rows] == [record["name"] for record in records] == ["Zoë Ångström", "李小龍"]
+    assert list(rows[0]) == list(customer_final.EXPORT_TABLES["customers"])
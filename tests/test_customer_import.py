@@ -0,0 +1,70 @@
+"""DatabaseManager.import_customers: validation, duplicate contacts and chunked commits."""
+
+import importlib.util
+import json
+import os
+
+_spec = importlib.util.spec_from_file_location(
+    "customer_final", os.path.join(os.path.dirname(__file__), os.pardir, "Customer Final.py")
+)
+customer_final = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(customer_final)
+
+
+def customers(db):
+    conn = db.get_connection()
+    try:
+        return conn.execute(
+            "SELECT name, contact, address, category FROM customers ORDER BY customer_id"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def test_csv_import_skips_invalid_rows_and_duplicate_contacts(tmp_path):
+    db = customer_final.DatabaseManager(str(tmp_path / "retail.db"))
+    db.add_customer("Existing", "555-0100", "1 Old Rd", "Regular")
+
+    path = tmp_path / "customers.csv"
+    path.write_text(
+        "Name,Contact,Address,Category\n"
+        "Ann Lee,555-0101,1 Main St,student\n"
+        "Bob Ray,(555) 0101,2 Main St,VIP\n"        # same phone digits as Ann
+        "Cat Poe,555 0100,3 Main St,\n"              # already registered
+        "Dan Orr,,4 Main St,Regular\n"               # no contact
+        "Eve Fox,eve@example.com,5 Main St,Gold\n"   # unknown category
+        "Fay Gill, EVE@example.com ,6 Main St,Regular\n"
+        "Gus Hill,eve2@example.com,7 Main St,\n",
+        encoding="utf-8",
+    )
+    updates = []
+    stats = db.import_customers(str(path), chunk_size=1, progress=updates.append)
+
+    assert stats == {"imported": 3, "duplicates": 2, "invalid": 2}
+    assert [update["imported"] for update in updates] == [1, 2, 3]
+    assert customers(db) == [
+        ("Existing", "555-0100", "1 Old Rd", "Regular"),
+        ("Ann Lee", "555-0101", "1 Main St", "Student"),
+        ("Fay Gill", "EVE@example.com", "6 Main St", "Regular"),
+        ("Gus Hill", "eve2@example.com", "7 Main St", "Regular"),
+    ]
+
+
+def test_jsonl_import_counts_unreadable_lines_as_invalid(tmp_path):
+    db = customer_final.DatabaseManager(str(tmp_path / "retail.db"))
+
+    path = tmp_path / "customers.jsonl"
+    path.write_text("\n".join([
+        json.dumps({"name": "Ann Lee", "contact": "555-0101", "address": "1 Main St"}),
+        "{not json",
+        json.dumps(["a", "list"]),
+        "",
+        json.dumps({"name": "Bob Ray", "contact": "555-0102", "address": "2 Main St", "category": "vip"}),
+    ]) + "\n", encoding="utf-8")
+    stats = db.import_customers(str(path))
+
+    assert stats == {"imported": 2, "duplicates": 0, "invalid": 2}
+    assert customers(db) == [
+        ("Ann Lee", "555-0101", "1 Main St", "Regular"),
+        ("Bob Ray", "555-0102", "2 Main St", "VIP"),
+    ]
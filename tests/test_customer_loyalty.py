@@ -0,0 +1,97 @@
+"""DatabaseManager.expire_loyalty_points: batching, resuming and VIP demotion."""
+
+import importlib.util
+import os
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "customer_final", os.path.join(os.path.dirname(__file__), os.pardir, "Customer Final.py")
+)
+customer_final = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(customer_final)
+
+AS_OF = "2025-06-01 00:00:00"
+
+
+class Interrupted(Exception):
+    pass
+
+
+def query(db, sql, params=()):
+    conn = db.get_connection()
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Three customers with old purchases spread over several batches, one recent purchase and an orphan"""
+    db = customer_final.DatabaseManager(str(tmp_path / "retail.db"))
+    ids = [db.add_customer(f"Customer {n}", f"555-{n:04d}", "1 Main St", "Regular") for n in range(3)]
+    for round_ in range(4):
+        for customer_id in ids:
+            db.add_transaction(customer_id, 100.0 + round_ * 10, "old sale")
+    db.add_transaction(None, 500.0, "orphan")
+    db.add_transaction(ids[0], 300.0, "recent sale")
+
+    conn = db.get_connection()
+    with conn:
+        conn.execute("UPDATE transactions SET transaction_date = '2024-01-15 10:00:00' WHERE description != 'recent sale'")
+        conn.execute("UPDATE transactions SET transaction_date = '2025-05-01 10:00:00' WHERE description = 'recent sale'")
+    conn.close()
+    return db
+
+
+def test_customers_are_counted_once_across_batches(db):
+    updates = []
+    stats = db.expire_loyalty_points(as_of=AS_OF, batch_size=2, progress=updates.append)
+
+    assert stats["transactions"] == 12
+    assert stats["points"] == 3 * (10 + 11 + 12 + 13)
+    assert stats["customers"] == 3
+    assert [update["customers"] for update in updates] == sorted(update["customers"] for update in updates)
+    assert all(update["customers"] <= 3 for update in updates)
+    assert query(db, "SELECT loyalty_points FROM customers ORDER BY customer_id") == [(30,), (0,), (0,)]
+
+
+def test_interrupted_run_resumes_without_expiring_twice(db):
+    def stop_after_two_batches(stats):
+        if stats["transactions"] >= 4:
+            raise Interrupted
+
+    with pytest.raises(Interrupted):
+        db.expire_loyalty_points(as_of=AS_OF, batch_size=2, progress=stop_after_two_batches)
+    assert query(db, "SELECT COUNT(*) FROM expired_points") == [(4,)]
+
+    rest = db.expire_loyalty_points(as_of=AS_OF, batch_size=2)
+    again = db.expire_loyalty_points(as_of=AS_OF, batch_size=2)
+
+    assert rest["transactions"] == 8
+    assert again["transactions"] == again["points"] == again["customers"] == 0
+    assert query(db, "SELECT COUNT(*), SUM(points) FROM expired_points") == [(12, 138)]
+    assert query(db, "SELECT loyalty_points FROM customers ORDER BY customer_id") == [(30,), (0,), (0,)]
+
+
+def test_only_points_promotions_are_demoted(tmp_path):
+    db = customer_final.DatabaseManager(str(tmp_path / "retail.db"))
+    manual_vip = db.add_customer("Manual VIP", "555-0001", "1 Main St", "VIP")
+    student = db.add_customer("Student Saver", "555-0002", "2 Main St", "Student")
+    regular = db.add_customer("Regular Buyer", "555-0003", "3 Main St", "Regular")
+    for customer_id in (student, regular):
+        db.add_transaction(customer_id, 10000.0, "big order")
+    db.add_transaction(None, 10000.0, "orphan")
+    conn = db.get_connection()
+    with conn:
+        conn.execute("UPDATE transactions SET transaction_date = '2023-01-01 10:00:00'")
+    conn.close()
+
+    stats = db.expire_loyalty_points(as_of=AS_OF)
+
+    assert stats["demoted"] == 2
+    assert query(db, "SELECT customer_id, category, loyalty_points FROM customers ORDER BY customer_id") == [
+        (manual_vip, "VIP", 0), (student, "Student", 0), (regular, "Regular", 0)
+    ]
+    assert query(db, "SELECT COUNT(*) FROM loyalty_promotions") == [(0,)]
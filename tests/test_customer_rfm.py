@@ -0,0 +1,78 @@
+"""rfm_scores and DatabaseManager.compute_rfm_segments, including heavily tied values."""
+
+import importlib.util
+import os
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "customer_final", os.path.join(os.path.dirname(__file__), os.pardir, "Customer Final.py")
+)
+customer_final = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(customer_final)
+
+np = pytest.importorskip("numpy")
+BINS = customer_final.RFM_BINS
+
+
+def scores(values, mask=None):
+    values = np.array(values, dtype=float)
+    mask = np.ones(len(values), dtype=bool) if mask is None else np.array(mask)
+    return customer_final.rfm_scores(values, mask).tolist()
+
+
+def test_distinct_values_fill_every_bucket_evenly():
+    assert scores(range(10)) == [1, 1, 2, 2, 3, 3, 4, 4, 5, 5]
+    assert scores(range(9, -1, -1)) == [5, 5, 4, 4, 3, 3, 2, 2, 1, 1]
+
+
+@pytest.mark.parametrize("count", [1, 2, 7, 100])
+def test_single_shared_value_scores_the_middle_bucket(count):
+    assert scores([3.0] * count) == [(BINS + 1) // 2] * count
+
+
+def test_heavy_ties_are_not_pushed_into_the_top_bucket():
+    # 80 one-time buyers and 20 who bought ten times: the bottom 80% sit around the 40th
+    # percentile, the top 20% around the 90th
+    result = scores([1] * 80 + [10] * 20)
+    assert set(result[:80]) == {2}
+    assert set(result[80:]) == {BINS}
+
+
+def test_tied_values_share_a_score_and_order_is_kept():
+    values = [5, 1, 1, 1, 9, 9, 2, 7, 7, 7, 7, 3]
+    result = scores(values)
+    for value in set(values):
+        assert len({score for v, score in zip(values, result) if v == value}) == 1
+    pairs = sorted(zip(values, result))
+    assert [score for _, score in pairs] == sorted(score for _, score in pairs)
+    assert min(result) >= 1 and max(result) <= BINS
+
+
+def test_values_outside_the_mask_score_zero():
+    assert scores([4, 8, 15, 16], mask=[True, False, True, False]) == [2, 0, 4, 0]
+
+
+def test_segments_with_everyone_buying_today(tmp_path):
+    db = customer_final.DatabaseManager(str(tmp_path / "retail.db"))
+    one_time = [db.add_customer(f"Once {n}", f"555-1{n:03d}", "1 Main St", "Regular") for n in range(80)]
+    frequent = [db.add_customer(f"Often {n}", f"555-2{n:03d}", "2 Main St", "Regular") for n in range(20)]
+    idle = db.add_customer("Never", "555-3000", "3 Main St", "Regular")
+    db.add_transactions_bulk(
+        [(customer_id, 20.0, "once") for customer_id in one_time]
+        + [(customer_id, 20.0, "again") for customer_id in frequent for _ in range(10)]
+    )
+
+    conn = db.get_connection()
+    conn.execute("UPDATE transactions SET transaction_date = '2024-06-01 12:00:00'")
+    conn.commit()
+    counts = db.compute_rfm_segments(as_of="2024-06-01 18:00:00")
+    rows = {customer_id: (r, f, segment) for customer_id, r, f, segment in conn.execute(
+        "SELECT customer_id, recency_score, frequency_score, segment FROM customer_segments"
+    )}
+    conn.close()
+
+    assert "At Risk" not in counts
+    assert counts["No Purchases"] == 1 and rows[idle] == (0, 0, "No Purchases")
+    assert {rows[customer_id][:2] for customer_id in one_time} == {(3, 2)}
+    assert {rows[customer_id][:2] for customer_id in frequent} == {(3, BINS)}
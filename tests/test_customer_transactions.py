@@ -0,0 +1,96 @@
+"""DatabaseManager.add_transactions_bulk must leave the database exactly as add_transaction does."""
+
+import importlib.util
+import os
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "customer_final", os.path.join(os.path.dirname(__file__), os.pardir, "Customer Final.py")
+)
+customer_final = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(customer_final)
+
+CUSTOMERS = [
+    ("Carol", "555-0101", "1 Main St", "Regular"),
+    ("Dev", "555-0102", "2 Main St", "Student"),
+    ("Erin", "555-0103", "3 Main St", "VIP"),
+]
+
+# (customer index or None, amount, description); Carol crosses 1000 points mid-batch and
+# then takes a refund, the orphan sale has no customer at all
+BATCH = [
+    (0, 4999.0, "tv"),
+    (1, 35.5, "books"),
+    (None, 500.0, "orphan"),
+    (0, 5019.0, "fridge"),
+    (2, 12.0, "socks"),
+    (0, -250.0, "refund"),
+    (1, 9.99, "pen"),
+    (1, 10.0, "pencils"),
+]
+
+
+def make_db(path):
+    db = customer_final.DatabaseManager(str(path))
+    ids = [db.add_customer(*customer) for customer in CUSTOMERS]
+    batch = [(None if index is None else ids[index], amount, description)
+             for index, amount, description in BATCH]
+    return db, batch
+
+
+def snapshot(db):
+    conn = db.get_connection()
+    try:
+        customers = conn.execute(
+            "SELECT customer_id, name, category, loyalty_points FROM customers ORDER BY customer_id"
+        ).fetchall()
+        transactions = conn.execute(
+            "SELECT transaction_id, customer_id, amount, description FROM transactions ORDER BY transaction_id"
+        ).fetchall()
+        promotions = conn.execute(
+            "SELECT customer_id, previous_category FROM loyalty_promotions ORDER BY customer_id"
+        ).fetchall()
+    finally:
+        conn.close()
+    return customers, transactions, promotions
+
+
+def test_bulk_matches_one_by_one(tmp_path):
+    single, batch = make_db(tmp_path / "single.db")
+    for customer_id, amount, description in batch:
+        single.add_transaction(customer_id, amount, description)
+
+    bulk, batch = make_db(tmp_path / "bulk.db")
+    assert bulk.add_transactions_bulk(batch) == len(batch)
+
+    assert snapshot(bulk) == snapshot(single)
+
+
+def test_bulk_promotes_to_vip_mid_batch(tmp_path):
+    bulk, batch = make_db(tmp_path / "bulk.db")
+    bulk.add_transactions_bulk(batch)
+
+    customers, _, promotions = snapshot(bulk)
+    assert [(name, category, points) for _, name, category, points in customers] == [
+        ("Carol", "VIP", 975),
+        ("Dev", "Student", 4),
+        ("Erin", "VIP", 1),
+    ]
+    assert promotions == [(customers[0][0], "Regular")]
+
+
+@pytest.mark.parametrize("batch", [
+    [(None, 500.0, "orphan")],
+    [(None, 500.0, "orphan"), (None, 20000.0, "orphan")],
+])
+def test_bulk_orphan_sales_earn_no_points(tmp_path, batch):
+    bulk, _ = make_db(tmp_path / "bulk.db")
+    bulk.add_transactions_bulk(batch)
+
+    customers, transactions, promotions = snapshot(bulk)
+    assert [(category, points) for _, _, category, points in customers] == [
+        ("Regular", 0), ("Student", 0), ("VIP", 0)
+    ]
+    assert [customer_id for _, customer_id, _, _ in transactions] == [None] * len(batch)
+    assert promotions == []
@@ -0,0 +1,72 @@
+"""SQLiteBackend.filter_items must return what ItemStore.filter (MemoryBackend) returns."""
+
+import importlib.util
+import os
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "inventory_core", os.path.join(os.path.dirname(__file__), os.pardir, "inventory_core.py")
+)
+inventory_core = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(inventory_core)
+
+CATALOGUE = [
+    ("Steel Bolt M8", "BLT-008", "Hardware", 3, 10, False),
+    ("Boltcutter", "TL-100", "Tools", 40, 10, False),
+    ("Wood Screw", "SCR-4X40", "Hardware", 4, 10, False),
+    ("Screwdriver Set", "TL-SD-6", "Tools", 12, 10, False),
+    ("ÅNGSTRÖM Desk Lamp", "LMP-ÅNG", "Lighting", 2, 5, False),
+    ("Étagère Shelf", "SHF-1", "Furniture", 0, 2, False),
+    ("Installation", "SRV-INST", "Services", None, None, True),
+    ("Cable tie", "CT-200", "", 9, 10, False),
+    ("Mini LED", "LED-MINI", "Lighting", 100, 20, False),
+]
+QUERIES = ["", "bolt", "BOLT", "ol", "s", "sc", "tl", "-", "led", "ång", "ån", "éta", "é", "shelf", "tie",
+           "hardware", "ing", "li", "t-", "  Screw  ", "x4", "m8", "zzz"]
+
+
+def make_item(name, sku, category, quantity, min_level, is_service):
+    return {
+        "name": name, "sku": sku, "quantity": quantity, "min_level": min_level,
+        "category": category, "subcategory": "", "unit": "pcs", "price": 9.5,
+        "description": "", "is_service": is_service, "duration": "", "service_cost": 0.0,
+    }
+
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    sqlite = inventory_core.SQLiteBackend(str(tmp_path_factory.mktemp("db") / "stock.db"))
+    sqlite.init_db()
+    memory = inventory_core.MemoryBackend()
+    for row in CATALOGUE:
+        sqlite.save_item(make_item(*row))
+        memory.save_item(make_item(*row))
+    return sqlite, memory
+
+
+@pytest.mark.parametrize("text", QUERIES)
+@pytest.mark.parametrize("category, level", [(None, "all"), (None, "low"), ("Hardware", "critical"), ("Lighting", "all")])
+def test_filter_items_matches_the_item_store(backends, text, category, level):
+    sqlite, memory = backends
+
+    expected = sorted(item["sku"] for item in memory.filter_items(category, level, text))
+    assert sorted(item["sku"] for item in sqlite.filter_items(category, level, text)) == expected
+
+
+def test_short_text_matches_the_start_of_a_field_or_word(backends):
+    sqlite, _ = backends
+
+    assert [item["sku"] for item in sqlite.filter_items(text="sc")] == ["SCR-4X40", "TL-SD-6"]
+    assert [item["sku"] for item in sqlite.filter_items(text="ång")] == ["LMP-ÅNG"]
+    assert [item["sku"] for item in sqlite.filter_items(text="ol")] == []
+
+
+@pytest.mark.parametrize("text", [q for q in QUERIES if q.isascii()])
+def test_portable_search_clause_matches_on_ascii_text(backends, text):
+    # the INSTR/LOWER rule MySQL gets, run over the same file without the Python function
+    sqlite, memory = backends
+    portable = inventory_core.SQLBackend(lambda: inventory_core.sqlite3.connect(sqlite.db_name))
+
+    expected = sorted(item["sku"] for item in memory.filter_items(text=text))
+    assert sorted(item["sku"] for item in portable.filter_items(text=text)) == expected
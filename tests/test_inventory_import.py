@@ -0,0 +1,134 @@
+"""import_items / export_items on the memory and SQLite backends."""
+
+import csv
+import gzip
+import importlib.util
+import os
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "inventory_core", os.path.join(os.path.dirname(__file__), os.pardir, "inventory_core.py")
+)
+inventory_core = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(inventory_core)
+
+HEADER = [header for header, _ in inventory_core.CSV_COLUMNS]
+
+
+def make_item(sku, quantity, name=None, **fields):
+    item = {
+        "name": name or f"Item {sku}", "sku": sku, "quantity": quantity, "min_level": 5,
+        "category": "Hardware", "subcategory": "", "unit": "pcs", "price": 9.5,
+        "description": "", "is_service": False, "duration": "", "service_cost": 0.0,
+    }
+    item.update(fields)
+    return item
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return str(path)
+
+
+def row(sku, quantity, name=None, price="9.5"):
+    return [name or f"Item {sku}", sku, "Hardware", "", quantity, "5", "pcs", price, "", "0", "", "0"]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        backend = inventory_core.MemoryBackend()
+    else:
+        backend = inventory_core.SQLiteBackend(str(tmp_path / "stock.db"))
+    backend.init_db()
+    return backend
+
+
+def test_bad_rows_go_to_the_error_file(backend, tmp_path):
+    backend.save_item(make_item("OLD-1", 3))
+    path = write_csv(tmp_path / "in.csv", [
+        row("A-1", "10"),
+        row("", "4", name="No SKU"),
+        row("A-2", "lots"),
+        row("A-3", "2", price="€5"),
+        row("A-1", "11"),
+        row("OLD-1", "99"),
+        row("A-4", ""),
+    ])
+    error_path = str(tmp_path / "errors.csv")
+
+    stats = backend.import_items(path, chunk_size=2, error_path=error_path)
+
+    assert stats == {"rows": 7, "imported": 2, "updated": 0, "duplicates": 2, "invalid": 3,
+                     "error_report": error_path}
+    with open(error_path, newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == [
+            ["line", "sku", "error"],
+            ["3", "", "SKU: missing"],
+            ["4", "A-2", "Quantity: not a number ('lots')"],
+            ["5", "A-3", "Price: not a number ('€5')"],
+            ["6", "A-1", "duplicate SKU earlier in the file"],
+            ["7", "OLD-1", "SKU already exists"],
+        ]
+    assert {item["sku"]: item["quantity"] for item in backend.load_items()} == {"OLD-1": 3, "A-1": 10, "A-4": 0}
+
+
+def test_clean_import_writes_no_error_file(backend, tmp_path):
+    path = write_csv(tmp_path / "in.csv", [row("A-1", "1"), row("A-2", "2")])
+    error_path = tmp_path / "errors.csv"
+
+    stats = backend.import_items(path, error_path=str(error_path))
+
+    assert stats["imported"] == 2 and stats["error_report"] is None
+    assert not error_path.exists()
+
+
+def test_upsert_overwrites_instead_of_duplicating(backend, tmp_path):
+    backend.save_item(make_item("A-1", 3, name="Old name"))
+    backend.save_item(make_item("A-2", 8))
+    path = write_csv(tmp_path / "in.csv", [row("A-1", "12", name="New name", price="4.25"), row("B-1", "6")])
+
+    stats = backend.import_items(path, upsert=True, chunk_size=1)
+
+    assert (stats["imported"], stats["updated"], stats["duplicates"]) == (1, 1, 0)
+    items = {item["sku"]: item for item in backend.load_items()}
+    assert len(backend.load_items()) == 3
+    assert (items["A-1"]["name"], items["A-1"]["quantity"], items["A-1"]["price"]) == ("New name", 12, 4.25)
+    assert items["A-2"]["quantity"] == 8
+    if backend.ledger is not None:
+        assert [(reason, delta) for _, reason, delta, _, _ in backend.ledger.history("A-1")] == [
+            ("import", 9), ("initial", 3)
+        ]
+
+
+@pytest.mark.parametrize("name", ["out.csv", "out.csv.gz"])
+def test_export_then_import_round_trips_every_item(backend, tmp_path, name):
+    items = [
+        make_item("A-1", 10, name="Zoë's bolts, \"large\"", description="two\nlines"),
+        make_item("A-2", 0, category="Tools", subcategory="Hand", price=0.1),
+        make_item("SRV-1", None, name="Fitting", min_level=None, is_service=True, duration="1h", service_cost=45.0),
+    ]
+    for item in items:
+        backend.save_item(item)
+    path = str(tmp_path / name)
+
+    stats = backend.export_items(path, chunk_size=2)
+    opener = gzip.open if name.endswith(".gz") else open
+    with opener(path, "rt", newline="", encoding="utf-8") as f:
+        exported = list(csv.reader(f))
+    if name.endswith(".gz"):
+        plain = str(tmp_path / "out.csv")
+        with open(plain, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(exported)
+        path = plain
+    fresh = inventory_core.MemoryBackend()
+    imported = fresh.import_items(path)
+
+    assert stats["rows"] == 3 and not stats["cancelled"]
+    assert exported[0] == HEADER
+    assert imported["imported"] == 3 and imported["invalid"] == 0
+    assert fresh.load_items() == backend.load_items() == items
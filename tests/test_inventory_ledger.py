@@ -0,0 +1,175 @@
+"""StockLedger point-in-time stock through SQLiteBackend."""
+
+import importlib.util
+import os
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "inventory_core", os.path.join(os.path.dirname(__file__), os.pardir, "inventory_core.py")
+)
+inventory_core = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(inventory_core)
+
+LATER = "9999-12-31 23:59:59"
+
+
+def make_item(sku, quantity, name=None):
+    return {
+        "name": name or f"Item {sku}", "sku": sku, "quantity": quantity, "min_level": 5,
+        "category": "Hardware", "subcategory": "", "unit": "pcs", "price": 9.5,
+        "description": "", "is_service": False, "duration": "", "service_cost": 0.0,
+    }
+
+
+@pytest.fixture
+def backend(tmp_path):
+    backend = inventory_core.SQLiteBackend(str(tmp_path / "stock.db"))
+    backend.init_db()
+    return backend
+
+
+@pytest.mark.parametrize("new_quantity", [40, 25, 0])
+def test_rename_moves_the_whole_balance(backend, new_quantity):
+    backend.save_item(make_item("OLD-1", 40))
+    backend.save_item(make_item("NEW-1", new_quantity), update=True, original_sku="OLD-1", reason="count")
+
+    ledger = backend.ledger
+    assert ledger.stock_at("OLD-1", LATER) == 0
+    assert ledger.stock_at("NEW-1", LATER) == new_quantity
+    assert "OLD-1" not in ledger.stock_levels_at(LATER)
+    assert ledger.stock_levels_at(LATER).get("NEW-1", 0) == new_quantity
+    assert [(reason, delta) for _, reason, delta, _, _ in ledger.history("OLD-1")] == [
+        ("rename", -40), ("initial", 40)
+    ]
+    expected = [("rename", 40)] + ([("count", new_quantity - 40)] if new_quantity != 40 else [])
+    assert [(reason, delta) for _, reason, delta, _, _ in reversed(ledger.history("NEW-1"))] == expected
+
+
+def test_rename_is_not_consumption(backend):
+    backend.save_item(make_item("OLD-1", 40))
+    backend.save_item(make_item("NEW-1", 40), update=True, original_sku="OLD-1")
+
+    assert backend.ledger.daily_consumption("2000-01-01") == []
+
+
+def test_rename_matches_the_memory_backend(backend):
+    memory = inventory_core.MemoryBackend()
+    for store in (backend, memory):
+        store.save_item(make_item("OLD-1", 40))
+        store.save_item(make_item("NEW-1", 30), update=True, original_sku="OLD-1", reason="count")
+
+    logged = [(sku, delta, after, reason) for sku in ("OLD-1", "NEW-1")
+              for _, reason, delta, after, _ in backend.ledger.history(sku)]
+    assert sorted(logged) == sorted((sku, delta, after, reason) for sku, delta, after, reason, _, _ in memory.movements)
+    assert len(logged) == 4
+
+
+def test_stock_at_combines_snapshots_and_movements(tmp_path):
+    backend = inventory_core.SQLiteBackend(str(tmp_path / "stock.db"), snapshot_every=3)
+    backend.init_db()
+    backend.save_item(make_item("A", 10))
+    backend.save_item(make_item("B", 5))
+    for quantity in (12, 7, 0, 3):
+        backend.save_item(make_item("A", quantity), update=True)
+    backend.delete_item("B")
+
+    assert backend.ledger.stock_at("A", LATER) == 3
+    assert backend.ledger.stock_at("B", LATER) == 0
+    assert backend.ledger.stock_levels_at(LATER) == {"A": 3}
+
+
+def snapshot_levels(conn, snapshot_id):
+    """Non-zero quantities at a snapshot: the newest row per SKU since the last full copy."""
+    full_id = conn.execute(
+        "SELECT MAX(id) FROM stock_snapshots WHERE is_full = 1 AND id <= ?", (snapshot_id,)
+    ).fetchone()[0]
+    levels = dict(conn.execute(
+        "SELECT sku, quantity FROM stock_snapshot_items WHERE snapshot_id BETWEEN ? AND ? ORDER BY snapshot_id",
+        (full_id, snapshot_id),
+    ).fetchall())
+    return {sku: quantity for sku, quantity in levels.items() if quantity}
+
+
+def test_incremental_snapshots_hold_only_moved_skus(tmp_path):
+    backend = inventory_core.SQLiteBackend(str(tmp_path / "stock.db"), snapshot_every=2)
+    backend.init_db()
+    for n in range(20):
+        backend.save_item(make_item(f"S{n}", 10 + n))
+    conn = backend.connect()
+    backend.ledger.take_snapshot(conn, full=True)
+    conn.commit()
+    conn.close()
+    backend.save_item(make_item("S3", 1), update=True)
+    backend.save_item(make_item("S7", 0), update=True)
+
+    conn = backend.connect()
+    snapshot_id, is_full = conn.execute("SELECT id, is_full FROM stock_snapshots ORDER BY id DESC LIMIT 1").fetchone()
+    rows = conn.execute("SELECT sku, quantity FROM stock_snapshot_items WHERE snapshot_id = ? ORDER BY sku",
+                        (snapshot_id,)).fetchall()
+    levels = snapshot_levels(conn, snapshot_id)
+    conn.close()
+
+    assert is_full == 0
+    assert rows == [("S3", 1), ("S7", 0)]
+    assert levels == {f"S{n}": 10 + n for n in range(20) if n not in (3, 7)} | {"S3": 1}
+    assert backend.ledger.stock_levels_at(LATER) == levels
+
+
+def test_every_snapshot_matches_the_movement_log(tmp_path):
+    backend = inventory_core.SQLiteBackend(str(tmp_path / "stock.db"), snapshot_every=4)
+    backend.init_db()
+    stock = {}
+    for n in range(12):
+        stock[f"S{n}"] = n
+        backend.save_item(make_item(f"S{n}", n))
+    for step in range(120):
+        sku = sorted(stock)[step * 7 % len(stock)]
+        if step % 17 == 0:
+            backend.delete_item(sku)
+            del stock[sku]
+        elif step % 11 == 0:
+            quantity = stock.pop(sku) + 1
+            stock[f"R{step}"] = quantity
+            backend.save_item(make_item(f"R{step}", quantity), update=True, original_sku=sku)
+        else:
+            stock[sku] = (stock[sku] + step) % 9
+            backend.save_item(make_item(sku, stock[sku]), update=True)
+
+    conn = backend.connect()
+    snapshots = conn.execute("SELECT id, last_movement_id FROM stock_snapshots ORDER BY id").fetchall()
+    for snapshot_id, last_movement_id in snapshots:
+        replayed = conn.execute(
+            "SELECT sku, SUM(delta) FROM stock_movements WHERE id <= ? GROUP BY sku HAVING SUM(delta) <> 0",
+            (last_movement_id,),
+        ).fetchall()
+        assert snapshot_levels(conn, snapshot_id) == dict(replayed)
+    snapshot_rows = conn.execute("SELECT COUNT(*) FROM stock_snapshot_items").fetchone()[0]
+    movements = conn.execute("SELECT COUNT(*) FROM stock_movements").fetchone()[0]
+    full_copies = conn.execute("SELECT SUM(is_full) FROM stock_snapshots").fetchone()[0]
+    conn.close()
+
+    assert 1 < full_copies < len(snapshots)
+    assert snapshot_rows <= 2 * movements
+    assert backend.ledger.stock_levels_at(LATER) == {sku: quantity for sku, quantity in stock.items() if quantity}
+
+
+def test_ledger_without_is_full_is_upgraded(tmp_path):
+    path = str(tmp_path / "stock.db")
+    conn = inventory_core.sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE stock_snapshots (id INTEGER PRIMARY KEY AUTOINCREMENT, taken_at TEXT NOT NULL,
+                                      last_movement_id INTEGER NOT NULL);
+        CREATE TABLE stock_snapshot_items (snapshot_id INTEGER NOT NULL, sku TEXT NOT NULL,
+                                           quantity INTEGER NOT NULL, PRIMARY KEY (snapshot_id, sku));
+        INSERT INTO stock_snapshots (taken_at, last_movement_id) VALUES ('2024-01-01 00:00:00', 0);
+    """)
+    conn.close()
+
+    backend = inventory_core.SQLiteBackend(path, snapshot_every=2)
+    backend.init_db()
+    for quantity in (4, 5, 6, 7):
+        backend.save_item(make_item("A", quantity), update=quantity > 4)
+
+    assert backend.ledger.stock_at("A", LATER) == 7
+    assert backend.ledger.stock_levels_at(LATER) == {"A": 7}
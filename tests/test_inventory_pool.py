@@ -0,0 +1,197 @@
+"""ConnectionPool / PooledConnection over SQLite connections."""
+
+import importlib.util
+import os
+import sqlite3
+import threading
+import time
+
+import pytest
+
+_spec = importlib.util.spec_from_file_location(
+    "inventory_core", os.path.join(os.path.dirname(__file__), os.pardir, "inventory_core.py")
+)
+inventory_core = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(inventory_core)
+
+
+class Connection:
+    """sqlite3 connection that can be killed, like a server dropping an idle client."""
+
+    def __init__(self, path):
+        self.raw = sqlite3.connect(path, check_same_thread=False)
+        self.dead = False
+        self.closed = False
+
+    def _check(self):
+        if self.dead:
+            raise sqlite3.OperationalError("server has gone away")
+
+    def cursor(self):
+        self._check()
+        return self.raw.cursor()
+
+    def commit(self):
+        self._check()
+        self.raw.commit()
+
+    def rollback(self):
+        self._check()
+        self.raw.rollback()
+
+    def close(self):
+        self.closed = True
+        self.raw.close()
+
+
+@pytest.fixture
+def connections(tmp_path):
+    path = str(tmp_path / "pool.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE t (n INTEGER)")
+    conn.close()
+    made = []
+
+    def connect():
+        made.append(Connection(path))
+        return made[-1]
+
+    connect.made = made
+    return connect
+
+
+def count_rows(conn):
+    return inventory_core.execute(conn, "SELECT COUNT(*) FROM t").fetchone()[0]
+
+
+def test_connections_are_reused_newest_first(connections):
+    pool = inventory_core.ConnectionPool(connections, size=3)
+    first, second = pool.connect(), pool.connect()
+    first_raw, second_raw = first._raw, second._raw
+    first.close()
+    second.close()
+
+    again = pool.connect()
+
+    assert again._raw is second_raw is not first_raw
+    assert len(connections.made) == 2
+    assert pool.stats() == dict(pool.counters, size=3, open=2, idle=1, in_use=1)
+    assert pool.counters["created"] == 2 and pool.counters["reused"] == 1
+
+
+def test_checkout_times_out_when_every_connection_is_in_use(connections):
+    pool = inventory_core.ConnectionPool(connections, size=1, timeout=0.05)
+    held = pool.connect()
+
+    with pytest.raises(TimeoutError):
+        pool.connect()
+    assert pool.counters["timeouts"] == 1 and pool.counters["waits"] >= 1
+
+    held.close()
+    pool.connect().close()
+    assert len(connections.made) == 1
+
+
+def test_waiting_checkout_gets_the_returned_connection(connections):
+    pool = inventory_core.ConnectionPool(connections, size=1, timeout=5)
+    held = pool.connect()
+    raw = held._raw
+    threading.Timer(0.05, held.close).start()
+
+    conn = pool.connect()
+
+    assert conn._raw is raw
+    assert pool.counters["waits"] >= 1 and pool.counters["timeouts"] == 0
+
+
+def test_dead_connection_is_replaced_after_ping_after(connections):
+    pool = inventory_core.ConnectionPool(connections, size=2, ping_after=0)
+    conn = pool.connect()
+    count_rows(conn)
+    conn.close()
+    connections.made[0].dead = True
+    time.sleep(0.01)
+
+    conn = pool.connect()
+
+    assert count_rows(conn) == 0
+    assert conn._raw is connections.made[1]
+    assert connections.made[0].closed
+    assert pool.counters["pings"] == 1 and pool.counters["dropped"] == 1
+    assert pool.stats()["open"] == 1
+
+
+def test_recently_used_connection_is_not_pinged(connections):
+    pool = inventory_core.ConnectionPool(connections, size=2, ping_after=60)
+    pool.connect().close()
+    pool.connect().close()
+
+    assert pool.counters["pings"] == 0 and pool.counters["reused"] == 1
+
+
+def test_close_rolls_back_and_returns_the_connection(connections):
+    pool = inventory_core.ConnectionPool(connections, size=1)
+    conn = pool.connect()
+    inventory_core.execute(conn, "INSERT INTO t VALUES (1)")
+    conn.close()
+    conn.close()   # a second close is a no-op
+
+    conn = pool.connect()
+    assert count_rows(conn) == 0
+    assert pool.stats()["in_use"] == 1 and pool.stats()["open"] == 1
+
+
+def test_connection_is_returned_when_the_caller_raises(tmp_path):
+    backend = inventory_core.SQLiteBackend(str(tmp_path / "stock.db"), pool_size=2)
+    backend.init_db()
+    item = {
+        "name": "Bolt", "sku": "B-1", "quantity": 5, "min_level": 1, "category": "Hardware",
+        "subcategory": "", "unit": "pcs", "price": 1.0, "description": "", "is_service": False,
+        "duration": "", "service_cost": 0.0,
+    }
+    backend.save_item(item)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        backend.save_item(item)
+
+    stats = backend.pool_stats()
+    assert stats["in_use"] == 0 and stats["open"] == 1
+    assert [row["sku"] for row in backend.load_items()] == ["B-1"]
+    backend.close()
+
+
+def test_dead_connection_is_dropped_when_returned(connections):
+    pool = inventory_core.ConnectionPool(connections, size=1)
+    conn = pool.connect()
+    connections.made[0].dead = True
+    conn.close()
+
+    assert pool.counters["dropped"] == 1 and pool.stats()["open"] == 0
+    assert pool.connect()._raw is connections.made[1]
+
+
+def test_statements_are_reused_per_connection(connections):
+    pool = inventory_core.ConnectionPool(connections, size=1)
+    conn = pool.connect()
+    cursor = conn.statement("SELECT COUNT(*) FROM t")
+    count_rows(conn)
+    conn.close()
+
+    conn = pool.connect()
+    assert conn.statement("SELECT COUNT(*) FROM t") is cursor
+    assert pool.counters["statements_prepared"] == 1 and pool.counters["statements_reused"] == 2
+
+
+def test_closed_pool_refuses_checkouts_and_closes_returned_connections(connections):
+    pool = inventory_core.ConnectionPool(connections, size=2)
+    idle, held = pool.connect(), pool.connect()
+    idle.close()
+
+    pool.close()
+
+    assert connections.made[0].closed and not connections.made[1].closed
+    with pytest.raises(RuntimeError):
+        pool.connect()
+    held.close()
+    assert connections.made[1].closed
+    assert pool.stats()["open"] == 0